@@ -4,24 +4,41 @@ __version__ = "0.0.2"
 =====================================================
 """
 from .create_pysal_logo import create_logo, create_favicon
+from .create_pysal_logo import create_logo_variants
+from .image_set import create_image_set
+from .atlas import build_atlas
+from .animation import create_animation
+from .gallery import create_gallery
+from .submodules import create_submodule_logos, register_submodule
+from .recolor import recolor
+from .theme_pack import export_pack, load_pack, ThemePack
+
+from . import predefined
 
 # main themes ------------------------------------------------------------------
 from .predefined import CHILD_NODES, GRANDCHILD_NODES
 from .predefined import NO_TEXT, GREEK, BULLETS
-from .predefined import WHITE, BLACK, DARKGRAY, TRANSPARENT
-from .predefined import traditional_theme_transparent
-from .predefined import traditional_theme_light, traditional_theme_dark
-from .predefined import canon2020_theme_transparent
-from .predefined import canon2020_theme_light, canon2020_theme_dark
-from .predefined import cb_qual_Paired_n7_theme_transparent
-from .predefined import cb_qual_Paired_n7_theme_light, cb_qual_Paired_n7_theme_dark
-from .predefined import cb_qual_Set1_n7_theme_transparent
-from .predefined import cb_qual_Set1_n7_theme_light, cb_qual_Set1_n7_theme_dark
-from .predefined import latex_color_codes, latex_color_names
-
-# submodule themes -------------------------------------------------------------
-from .predefined import spaghetti_theme_transparent
+from .predefined import WHITE, BLACK, DARKGRAY, TRANSPARENT, BACKGROUNDS
 
 # navigation (text outside concept) logo text / syntax -------------------------
 from .predefined import psnav_1line, psnav_2line
-from .predefined import spgh_long
\ No newline at end of file
+from .predefined import spgh_long
+from .layout import nav_logo
+
+# theme registries -------------------------------------------------------------
+from .predefined import NAV_LOGOS, NODE_TEXT
+
+# the themes (e.g. `canon2020_theme_light`, `spaghetti_theme_transparent`),
+# `THEMES`, and `latex_color_codes` / `latex_color_names` are built on first
+# use, see `logo.predefined`
+_LAZY = ("THEMES", "latex_color_codes", "latex_color_names") + tuple(predefined._CATALOG)
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(predefined, name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
@@ -0,0 +1,119 @@
+"""Command line interface for batch logo creation.
+
+    $ python -m logo manifest.toml --workers 4
+    $ python -m logo manifest.json --dry-run
+    $ python -m logo manifest.toml --font-cache /cache/fonts --warm-fonts
+    $ python -m logo manifest.toml --stages compile=4,convert=2,optimize=2
+    $ python -m logo manifest.toml --skip-unchanged
+
+See `logo.batch` for the manifest format.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from . import batch
+from . import fonts
+from . import validate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m logo",
+        description="Create the logos, favicons, and nav logos in a manifest.",
+    )
+    parser.add_argument("manifest", help="TOML or JSON manifest of targets")
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=1,
+        help="number of parallel workers (default: 1)",
+    )
+    parser.add_argument(
+        "--threads",
+        action="store_true",
+        help="use worker threads instead of worker processes",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only write the .tex files, do not compile them",
+    )
+    parser.add_argument(
+        "--skip-unchanged",
+        action="store_true",
+        help="leave published files that look the same untouched (see logo.changes)",
+    )
+    parser.add_argument(
+        "--deterministic",
+        action="store_true",
+        help="create byte-identical files for identical inputs (see logo.reproducible)",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only validate the themes in the manifest",
+    )
+    parser.add_argument(
+        "--stages",
+        default=None,
+        help="run the staged pipeline with workers per stage, e.g. compile=4,convert=2 "
+        "(see logo.pipeline)",
+    )
+    parser.add_argument(
+        "--font-cache",
+        default=None,
+        help="shared font cache directory reused by every worker (see logo.fonts)",
+    )
+    parser.add_argument(
+        "--warm-fonts",
+        action="store_true",
+        help="fill the font cache before rendering and report startup times",
+    )
+    args = parser.parse_args(argv)
+    if args.font_cache:
+        # inherited by the worker processes
+        os.environ["LOGO_FONT_CACHE"] = args.font_cache
+
+    jobs = batch.load_manifest(args.manifest)
+    for option in ("skip_unchanged", "deterministic"):
+        if getattr(args, option):
+            for job in jobs:
+                job["kwargs"][option] = True
+    if args.check:
+        problems = 0
+        for job, errors in validate.validate_jobs(jobs):
+            for error in errors:
+                print("%s %s: %s" % (job["kind"], job["name"], error))
+            problems += len(errors)
+        print("%d targets checked, %d problems found." % (len(jobs), problems))
+        return int(problems > 0)
+
+    if args.warm_fonts and not args.dry_run:
+        used = sorted({job["kwargs"].get("font", fonts.DEFAULT_FONT) for job in jobs})
+        print(fonts.format_report(fonts.warm_font_cache(used)))
+
+    stages = None
+    if args.stages is not None:
+        stages = {}
+        for entry in filter(None, args.stages.split(",")):
+            name, _, count = entry.partition("=")
+            stages[name.strip()] = int(count or 1)
+
+    start = time.perf_counter()
+    results = batch.run_jobs(
+        jobs,
+        workers=args.workers,
+        dry_run=args.dry_run,
+        threads=args.threads,
+        stages=stages,
+    )
+    print(batch.format_report(results, time.perf_counter() - start))
+    return int(any(r["error"] for r in results))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
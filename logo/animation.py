@@ -0,0 +1,657 @@
+"""Animated logos assembled in-process from rendered frames.
+
+`frame_sequence()` turns a theme into a list of frames for an effect:
+
+    - ``"fade_in"``: the child nodes fade in one after the other
+    - ``"hue_rotation"``: the node colors turn once around the color wheel
+    - ``"rotate"``: the `grow cyclic` mindmap turns once around its concept
+
+Every frame is a `tikzpicture` built with the `logo.build_tex_file`
+generators. `render_frames()` puts all frames in one multi-page document
+(the `standalone` class makes a page of every picture), so a single TeX
+run and a single rasterizer call produce all of them; with several
+workers the frames are split into that many documents compiled in
+parallel. Rendered frames are cached one by one (see `logo.cache`), so
+editing one frame only renders that frame again.
+
+`create_animation()` assembles the frames without any imaging library
+into an animated PNG (APNG), a GIF, or an SVG with SMIL animation::
+
+    >>> import logo
+    >>> theme = logo.canon2020_theme_transparent
+    >>> logo.create_animation("pysal_spin", theme, effect="rotate", formats=("png", "gif"))
+"""
+
+import base64
+import concurrent.futures
+import os
+import re
+import shutil
+import struct
+import tempfile
+import zlib
+
+import numpy
+
+from . import build_tex_file
+from . import colorspace
+from . import convert
+from . import engines
+from . import raster
+from . import validate
+from .cache import RenderCache, cache_key
+from .create_pysal_logo import _destination, _publish, _sandbox
+from .image_set import available_rasterizers
+from . import predefined
+from .predefined import CHILD_NODES, GRANDCHILD_NODES
+
+EFFECTS = ("fade_in", "hue_rotation", "rotate")
+
+# animation formats; "png" is an animated PNG
+FORMATS = ("png", "gif", "svg")
+
+# fixed bounding circle around the concept, so turned frames keep their size
+_BOUNDING_RADIUS = "9cm"
+
+# theme entries holding a single (color name, color code) tuple
+_SINGLE_COLORS = ("background_color", "concept_color", "text_color")
+
+_PAGE = re.compile(r"^page-(\d+)\.png$")
+
+
+def _rgb_theme(theme):
+    """Validated copy of a theme with every color code in "RGB"."""
+    theme, errors = validate.validate_theme(
+        {
+            "node_info": theme.get("node_info"),
+            "color_format": theme.get("color_format"),
+            "background_color": theme.get("background_color"),
+            "concept_color": theme.get("concept_color"),
+            "text_color": theme.get("text_color"),
+        }
+    )
+    if errors:
+        raise RuntimeError("Invalid theme:\n    %s" % "\n    ".join(errors))
+    color_format = theme["color_format"]
+    if color_format not in colorspace.MODELS:
+        raise RuntimeError("'%s' colors cannot be animated." % color_format)
+
+    def _code(color):
+        name, code = color
+        if code is None and name in predefined.latex_color_codes:
+            return name, predefined.latex_color_codes[name]["RGB"]
+        if code is None:
+            raise RuntimeError("'%s' color has no color code." % name)
+        return name, colorspace.convert_codes([code], color_format, "RGB")[0]
+
+    frame = {"node_info": numpy.empty((CHILD_NODES, 2), dtype=object)}
+    for i, (color, text) in enumerate(theme["node_info"]):
+        frame["node_info"][i] = _code(color), text
+    for key in _SINGLE_COLORS:
+        color = theme[key]
+        frame[key] = _code(color) if color and color[0] is not None else (None, None)
+    frame["rotate"] = None
+    frame["opacity"] = None
+    return frame
+
+
+def _rotate_hue(colors, turn, k):
+    """Colors with their hue turned by ``turn`` (0-1), renamed for frame ``k``."""
+    codes = [code for _, code in colors]
+    hsb = colorspace.convert(colorspace.parse_codes(codes, "RGB"), "RGB", "hsb")
+    hsb[:, 0] = (hsb[:, 0] + turn) % 1.0
+    codes = colorspace.format_codes(colorspace.convert(hsb, "hsb", "RGB"), "RGB")
+    # grays have no hue, so they keep their name
+    return [
+        (name if code == old else "%shue%d" % (name, k), code)
+        for (name, old), code in zip(colors, codes)
+    ]
+
+
+def frame_sequence(theme, effect="hue_rotation", frames=12):
+    """Frames of an animation effect.
+
+    Parameters
+    ----------
+
+    theme : dict
+        `create_logo()` keyword arguments, e.g. `logo.canon2020_theme_transparent`.
+
+    effect : str (Optional - Default is "hue_rotation")
+        One of `EFFECTS`.
+
+    frames : int (Optional - Default is 12)
+        Number of frames.
+
+    Returns
+    -------
+
+    frames : list
+        A dict per frame with the theme colors (``node_info``,
+        ``background_color``, ``concept_color``, ``text_color``, all in
+        "RGB"), the ``rotate`` angle of the mindmap, and the ``opacity``
+        of every child node (None for opaque). Frames may be edited before
+        they are rendered.
+
+    """
+    if effect not in EFFECTS:
+        raise RuntimeError("'%s' effect not one of %s." % (effect, ", ".join(EFFECTS)))
+    if frames < 1:
+        raise RuntimeError("An animation needs at least one frame.")
+    base = _rgb_theme(theme)
+    sequence = []
+    for k in range(frames):
+        frame = dict(base, node_info=base["node_info"].copy())
+        if effect == "rotate":
+            frame["rotate"] = round(360.0 * k / frames, 3)
+        elif effect == "fade_in":
+            # each child fades in over 1/7th of the animation, in turn
+            progress = CHILD_NODES * k / max(1, frames - 1)
+            opacity = numpy.clip(progress - numpy.arange(CHILD_NODES), 0.0, 1.0)
+            frame["opacity"] = [round(float(o), 3) for o in opacity]
+        elif k:
+            colors = list(base["node_info"][:, 0])
+            concept = base["concept_color"][0] is not None
+            if concept:
+                colors.append(base["concept_color"])
+            turned = _rotate_hue(colors, float(k) / frames, k)
+            for i in range(CHILD_NODES):
+                frame["node_info"][i, 0] = turned[i]
+            if concept:
+                frame["concept_color"] = turned[-1]
+        sequence.append(frame)
+    return sequence
+
+
+def _picture(frame, concept_text, concept_font_style, concept_font_size):
+    """The `tikzpicture` of a frame and the colors it defines."""
+    text_color = frame["text_color"]
+    picture = build_tex_file.initialize_tikz(
+        None,
+        frame["background_color"][0],
+        frame["concept_color"][0],
+        text_color[0],
+        *build_tex_file.level_distances_and_sibling_angles(CHILD_NODES, GRANDCHILD_NODES),
+        rotate=frame["rotate"]
+    )
+    if frame["rotate"] is not None:
+        picture += r"""
+        \path[use as bounding box] (0,0) circle (%s);""" % _BOUNDING_RADIUS
+    picture += build_tex_file.create_concept(
+        frame["concept_color"][0], concept_text, concept_font_style, concept_font_size
+    )
+    opacity = frame["opacity"] or [None] * len(frame["node_info"])
+    for (color, text), alpha in zip(frame["node_info"], opacity):
+        picture += build_tex_file.create_child(color[0], GRANDCHILD_NODES, text, alpha)
+    picture += build_tex_file.finalize_tikz(None)
+    colors = list(frame["node_info"][:, 0]) + [frame[key] for key in _SINGLE_COLORS]
+    colors = [tuple(c) for c in colors if c[0] is not None and c[1] is not None]
+    return picture, colors
+
+
+def _document(pictures, font):
+    """Multi-page .tex document with a page per picture."""
+    colors = [color for _, frame_colors in pictures for color in frame_colors]
+    header, footer = build_tex_file.set_header_and_footer(font, "", colors, "RGB")
+    return header + "".join(picture for picture, _ in pictures) + footer
+
+
+def _rasterize_pages(rasterizer, sandbox, jobname, width, count):
+    """Rasterize every page of ``<jobname>.pdf`` and return the .png bytes."""
+    pdf = "%s.pdf" % jobname
+    if rasterizer == "pdftocairo":
+        command = ["pdftocairo", "-png", "-transp", "-scale-to-x", str(width)]
+        command += ["-scale-to-y", "-1", pdf, "page"]
+    else:
+        command = ["convert", "-density", "600", "-background", "none", pdf]
+        command += ["-resize", "%dx" % width, "page-%d.png"]
+    convert._run(command, cwd=sandbox)
+    pages = sorted(
+        (f for f in os.listdir(sandbox) if _PAGE.match(f)),
+        key=lambda f: int(_PAGE.match(f).group(1)),
+    )
+    if len(pages) != count:
+        err_msg = "Expected %d frames from '%s', found %d."
+        raise RuntimeError(err_msg % (count, rasterizer, len(pages)))
+    rendered = []
+    for page in pages:
+        with open(os.path.join(sandbox, page), "rb") as f:
+            rendered.append(f.read())
+    return rendered
+
+
+def _render_document(pictures, font, engine, rasterizer, width, directory):
+    """Compile pictures as one multi-page document and rasterize the pages."""
+    sandbox = tempfile.mkdtemp(prefix=".logo-frames-", dir=directory)
+    try:
+        with open(os.path.join(sandbox, "frames.tex"), "w") as f:
+            f.write(_document(pictures, font))
+        # Python backends render a single picture, not a multi-page document
+        tried = [
+            e for e in engines.candidates(font, "pdf", engine)
+            if engines.ENGINES[e]["kind"] == "tex"
+        ]
+        for candidate in tried:
+            if engines.compile_tex(candidate, "frames", sandbox, "pdf") is not None:
+                break
+        else:
+            err_msg = "Animation frames could not be compiled with %s."
+            raise RuntimeError(err_msg % (", ".join(tried) or "any TeX engine"))
+        return _rasterize_pages(rasterizer, sandbox, "frames", width, len(pictures))
+    finally:
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+
+def _same_size(images):
+    """Center frames of different sizes on a common transparent canvas."""
+    height = max(image.shape[0] for image in images)
+    width = max(image.shape[1] for image in images)
+    sized = []
+    for image in images:
+        h, w = image.shape[:2]
+        if (h, w) == (height, width):
+            sized.append(image)
+            continue
+        canvas = numpy.zeros((height, width, 4), dtype=numpy.uint8)
+        top, left = (height - h) // 2, (width - w) // 2
+        canvas[top : top + h, left : left + w] = image
+        sized.append(canvas)
+    return sized
+
+
+def render_frames(
+    frames,
+    width=256,
+    concept_text="PySAL",
+    concept_font_style="bfseries",
+    concept_font_size="large",
+    font="M+ 1mn",
+    engine="auto",
+    rasterizer="auto",
+    workers=1,
+    cache=True,
+    directory=None,
+):
+    """Render frames to RGBA arrays, reusing cached frames.
+
+    Parameters
+    ----------
+
+    frames : list
+        See `frame_sequence()`.
+
+    width : int (Optional - Default is 256)
+        Frame width in pixels.
+
+    concept_text, concept_font_style, concept_font_size, font, engine :
+        See `create_logo()`. Only TeX engines are used.
+
+    rasterizer : str (Optional - Default is "auto")
+        One of `logo.image_set.RASTERIZERS`, or "auto" for the first one
+        installed.
+
+    workers : int (Optional - Default is 1)
+        Number of multi-page documents compiled in parallel.
+
+    cache : bool or logo.cache.RenderCache (Optional - Default is True)
+        Cache rendered frames, by default in `logo.cache.default_cache_dir()`.
+
+    directory : str (Optional - Default is None)
+        Where to compile. Defaults to the system temporary directory.
+
+    Returns
+    -------
+
+    images : list
+        ``(height, width, 4)`` arrays of ``uint8``, all of the same size.
+
+    """
+    if rasterizer == "auto":
+        available = available_rasterizers()
+        if not available:
+            raise RuntimeError("Rendering frames needs pdftocairo or ImageMagick.")
+        rasterizer = available[0]
+    store = RenderCache() if cache is True else cache or None
+    pictures = [
+        _picture(frame, concept_text, concept_font_style, concept_font_size)
+        for frame in frames
+    ]
+    keys = [cache_key("frame", picture, colors, font, width) for picture, colors in pictures]
+
+    images = [None] * len(frames)
+    if store is not None:
+        for i, key in enumerate(keys):
+            cached = store.get(key, "png")
+            if cached is not None:
+                images[i] = raster.read_png(cached)
+    missing = [i for i, image in enumerate(images) if image is None]
+    if missing:
+        chunks = numpy.array_split(missing, max(1, min(workers, len(missing))))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+            futures = [
+                pool.submit(
+                    _render_document,
+                    [pictures[i] for i in chunk],
+                    font,
+                    engine,
+                    rasterizer,
+                    width,
+                    directory,
+                )
+                for chunk in chunks
+            ]
+            for chunk, future in zip(chunks, futures):
+                for i, png in zip(chunk, future.result()):
+                    images[i] = raster.read_png(png)
+                    if store is not None:
+                        store.put(keys[i], "png", png)
+    return _same_size(images)
+
+
+def _encode(image):
+    """zlib stream of filtered RGBA scanlines."""
+    h, w = image.shape[:2]
+    lines = raster._filter(numpy.ascontiguousarray(image).reshape(h, w * 4), 4, "adaptive")
+    return zlib.compress(lines.tobytes(), 9)
+
+
+def _changed_box(previous, image):
+    """``(top, left, bottom, right)`` of the pixels that differ, at least 1x1."""
+    changed = (previous != image).any(axis=2)
+    rows, cols = numpy.flatnonzero(changed.any(axis=1)), numpy.flatnonzero(changed.any(axis=0))
+    if not rows.size:
+        return 0, 0, 1, 1
+    return rows[0], cols[0], rows[-1] + 1, cols[-1] + 1
+
+
+def apng_bytes(images, delay=100, loops=0):
+    """Assemble frames into an animated PNG.
+
+    Every frame after the first only stores the region that changed.
+
+    Parameters
+    ----------
+
+    images : list
+        ``(height, width, 4)`` RGBA arrays of ``uint8``, all of the same size.
+
+    delay : int (Optional - Default is 100)
+        Frame duration in milliseconds.
+
+    loops : int (Optional - Default is 0)
+        Number of times to play the animation, 0 for forever.
+
+    Returns
+    -------
+
+    png : bytes
+
+    """
+    h, w = images[0].shape[:2]
+    png = raster.PNG_SIGNATURE
+    png += raster._chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0))
+    png += raster._chunk(b"acTL", struct.pack(">II", len(images), loops))
+    sequence = 0
+    previous = None
+    for image in images:
+        top, left, bottom, right = 0, 0, h, w
+        if previous is not None:
+            top, left, bottom, right = _changed_box(previous, image)
+        # replace the region (blend "source"), keep the rest (dispose "none")
+        control = struct.pack(
+            ">IIIIIHHBB", sequence, right - left, bottom - top, left, top, delay, 1000, 0, 0
+        )
+        png += raster._chunk(b"fcTL", control)
+        sequence += 1
+        data = _encode(image[top:bottom, left:right])
+        if previous is None:
+            png += raster._chunk(b"IDAT", data)
+        else:
+            png += raster._chunk(b"fdAT", struct.pack(">I", sequence) + data)
+            sequence += 1
+        previous = image
+    return png + raster._chunk(b"IEND", b"")
+
+
+def _palette(images):
+    """A shared GIF palette and the index image of every frame.
+
+    Opaque colors are binned to 5 bits per channel and the 255 most common
+    bins (by their mean color) form the palette. Index 0 is transparent.
+    """
+    pixels = numpy.stack(images).reshape(-1, 4)
+    opaque = pixels[:, 3] >= 128
+    rgb = pixels[:, :3].astype(numpy.int64)
+    bins = (rgb[:, 0] >> 3) << 10 | (rgb[:, 1] >> 3) << 5 | rgb[:, 2] >> 3
+    counts = numpy.bincount(bins[opaque], minlength=32768)
+    sums = numpy.stack(
+        [numpy.bincount(bins[opaque], rgb[opaque, c], minlength=32768) for c in range(3)], axis=1
+    )
+    used = numpy.flatnonzero(counts)
+    means = sums[used] / counts[used, None]
+    top = numpy.argsort(counts[used], kind="stable")[::-1][:255]
+    palette = means[top]
+    # map every used bin to its nearest palette color
+    lookup = numpy.zeros(32768, dtype=numpy.uint8)
+    for start in range(0, len(used), 4096):
+        block = means[start : start + 4096]
+        distance = ((block[:, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+        lookup[used[start : start + 4096]] = distance.argmin(axis=1) + 1
+    indices = numpy.where(opaque, lookup[bins], 0).astype(numpy.uint8)
+    table = numpy.zeros((256, 3), dtype=numpy.uint8)
+    table[1 : len(palette) + 1] = numpy.clip(numpy.rint(palette), 0, 255)
+    return table, indices.reshape(len(images), *images[0].shape[:2])
+
+
+def _lzw(indices, min_size=8):
+    """GIF LZW compression of 8-bit color indices."""
+    clear, end = 1 << min_size, (1 << min_size) + 1
+    out, bits, count = bytearray(), 0, 0
+
+    def emit(code, size):
+        nonlocal bits, count
+        bits |= code << count
+        count += size
+        while count >= 8:
+            out.append(bits & 0xFF)
+            bits >>= 8
+            count -= 8
+
+    size, next_code, table = min_size + 1, end + 1, {}
+    emit(clear, size)
+    data = indices.tobytes()
+    prefix = data[0]
+    for k in data[1:]:
+        key = prefix << 8 | k
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        emit(prefix, size)
+        if next_code < 4096:
+            table[key] = next_code
+            next_code += 1
+            # the decoder widens its codes one code later than the encoder adds them
+            if next_code > 1 << size and size < 12:
+                size += 1
+        else:
+            emit(clear, size)
+            size, next_code, table = min_size + 1, end + 1, {}
+        prefix = k
+    emit(prefix, size)
+    emit(end, size)
+    if count:
+        out.append(bits & 0xFF)
+    return bytes(out)
+
+
+def gif_bytes(images, delay=100, loops=0):
+    """Assemble frames into an animated GIF with a shared 255 color palette.
+
+    Pixels less than half opaque become transparent. See `apng_bytes()`
+    for the parameters.
+    """
+    table, indices = _palette(images)
+    h, w = images[0].shape[:2]
+    gif = b"GIF89a" + struct.pack("<HHBBB", w, h, 0xF7, 0, 0) + table.tobytes()
+    gif += b"\x21\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", loops) + b"\x00"
+    for frame in indices:
+        # restore to the (transparent) background before the next frame
+        gif += b"\x21\xf9\x04\x09" + struct.pack("<H", int(round(delay / 10.0))) + b"\x00\x00"
+        gif += b"\x2c" + struct.pack("<HHHHB", 0, 0, w, h, 0) + b"\x08"
+        data = _lzw(frame)
+        for start in range(0, len(data), 255):
+            block = data[start : start + 255]
+            gif += bytes([len(block)]) + block
+        gif += b"\x00"
+    return gif + b"\x3b"
+
+
+def svg_bytes(images, delay=100, loops=0):
+    """Assemble frames into an SVG showing them in turn with SMIL.
+
+    See `apng_bytes()` for the parameters.
+    """
+    h, w = images[0].shape[:2]
+    n = len(images)
+    key_times = ";".join("%g" % round(float(i) / n, 6) for i in range(n))
+    repeat = "indefinite" if loops == 0 else str(loops)
+    parts = [
+        '<svg xmlns="http://www.w3.org/2000/svg" '
+        'xmlns:xlink="http://www.w3.org/1999/xlink" '
+        'width="%d" height="%d" viewBox="0 0 %d %d">' % (w, h, w, h)
+    ]
+    for i, image in enumerate(images):
+        values = ";".join("inline" if j == i else "none" for j in range(n))
+        uri = base64.b64encode(raster.write_png(image)).decode("ascii")
+        parts.append(
+            '<image width="%d" height="%d" display="none" '
+            'xlink:href="data:image/png;base64,%s">'
+            '<animate attributeName="display" values="%s" keyTimes="%s" '
+            'dur="%gms" calcMode="discrete" repeatCount="%s" fill="freeze"/>'
+            "</image>" % (w, h, uri, values, key_times, n * delay, repeat)
+        )
+    parts.append("</svg>")
+    return "\n".join(parts).encode("utf-8")
+
+
+_ASSEMBLERS = {"png": apng_bytes, "gif": gif_bytes, "svg": svg_bytes}
+
+
+def create_animation(
+    fname,
+    theme,
+    effect="hue_rotation",
+    frames=12,
+    width=256,
+    delay=100,
+    loops=0,
+    formats=("png",),
+    move_to=None,
+    workers=1,
+    cache=True,
+    concept_text="PySAL",
+    concept_font_style="bfseries",
+    concept_font_size="large",
+    font="M+ 1mn",
+    engine="auto",
+    rasterizer="auto",
+    dry_run=False,
+):
+    """
+
+    Create an animated logo.
+
+    Parameters
+    ----------
+
+    fname : str
+        Animation file name. Each format is saved as `<fname>.<format>`.
+
+    theme : dict
+        `create_logo()` keyword arguments, e.g. `logo.canon2020_theme_transparent`.
+
+    effect : str (Optional - Default is "hue_rotation")
+        One of `EFFECTS`.
+
+    frames : int or list (Optional - Default is 12)
+        Number of frames, or frames from `frame_sequence()` (possibly
+        edited), in which case `effect` is ignored.
+
+    width : int (Optional - Default is 256)
+        Width in pixels.
+
+    delay : int (Optional - Default is 100)
+        Frame duration in milliseconds.
+
+    loops : int (Optional - Default is 0)
+        Number of times to play the animation, 0 for forever.
+
+    formats : iterable (Optional - Default is ("png",))
+        Any of `FORMATS`: "png" (animated PNG), "gif", and "svg" (frames
+        shown in turn with SMIL).
+
+    move_to : see `create_logo()`
+
+    workers : int (Optional - Default is 1)
+        See `render_frames()`.
+
+    cache : bool or logo.cache.RenderCache (Optional - Default is True)
+        See `render_frames()`.
+
+    concept_text, concept_font_style, concept_font_size, font, engine :
+        See `create_logo()`.
+
+    rasterizer : str (Optional - Default is "auto")
+        See `render_frames()`.
+
+    dry_run : bool (Optional - Default is False)
+        Only write the multi-page .tex file of all frames.
+
+    Returns
+    -------
+
+    published : list
+        Paths of the files written to the output directory.
+
+    Examples
+    --------
+
+    >>> import logo
+    >>> theme = logo.canon2020_theme_transparent
+    >>> logo.create_animation("pysal_fade", theme, effect="fade_in", formats=("gif",))
+
+    """
+
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise RuntimeError("Unknown animation formats: %s" % ", ".join(sorted(unknown)))
+    if isinstance(frames, int):
+        frames = frame_sequence(theme, effect, frames)
+    destination, jobname = _destination(fname, move_to)
+    with _sandbox(destination) as sandbox:
+        if dry_run:
+            pictures = [
+                _picture(frame, concept_text, concept_font_style, concept_font_size)
+                for frame in frames
+            ]
+            with open(os.path.join(sandbox, "%s.tex" % jobname), "w") as f:
+                f.write(_document(pictures, font))
+        else:
+            images = render_frames(
+                frames,
+                width,
+                concept_text,
+                concept_font_style,
+                concept_font_size,
+                font,
+                engine,
+                rasterizer,
+                workers,
+                cache,
+                sandbox,
+            )
+            for fmat in formats:
+                with open(os.path.join(sandbox, "%s.%s" % (jobname, fmat)), "wb") as f:
+                    f.write(_ASSEMBLERS[fmat](images, delay, loops))
+        return _publish(sandbox, destination)
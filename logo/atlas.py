@@ -0,0 +1,161 @@
+"""Sprite sheet (atlas) of the theme catalog.
+
+`build_atlas()` compiles every theme with the batch renderer, rasterizes
+the renders at sprite size in the workers, and packs them into a single
+PNG (see `logo.batch.render_sheet()`), so a gallery page loads one image
+instead of one per theme. The position of each theme is written to a
+JSON map and a CSS file::
+
+    <link rel="stylesheet" href="theme_atlas.css">
+    <div class="logo-sprite logo-canon2020_theme_transparent"></div>
+"""
+
+import re
+
+import numpy
+
+from . import batch
+from . import predefined
+
+
+def shelf_pack(sizes, max_width, padding=0):
+    """Pack rectangles in rows ("shelves"), tallest first.
+
+    Parameters
+    ----------
+
+    sizes : list
+        ``(width, height)`` of each rectangle.
+
+    max_width : int
+        Maximum width of the packed area. Wider rectangles get a shelf
+        of their own.
+
+    padding : int (Optional - Default is 0)
+        Gap between rectangles.
+
+    Returns
+    -------
+
+    positions : list
+        ``(x, y)`` of each rectangle, in the order of ``sizes``.
+
+    extent : tuple
+        ``(width, height)`` of the packed area.
+
+    """
+    positions = [None] * len(sizes)
+    x = y = shelf_height = width = 0
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i][1]):
+        w, h = sizes[i]
+        if x and x + w > max_width:
+            x, y = 0, y + shelf_height + padding
+            shelf_height = 0
+        positions[i] = x, y
+        width = max(width, x + w)
+        shelf_height = max(shelf_height, h)
+        x += w + padding
+    return positions, (width, y + shelf_height)
+
+
+def _css_class(name):
+    return "logo-%s" % re.sub(r"[^A-Za-z0-9_-]", "-", name)
+
+
+def build_atlas(
+    fname="theme_atlas",
+    themes=None,
+    sprite_width=256,
+    max_width=2048,
+    padding=2,
+    move_to=None,
+    workers=1,
+    threads=False,
+    optimize_png=False,
+):
+    """
+
+    Render themes into a single sprite sheet with a JSON and CSS map.
+
+    Parameters
+    ----------
+
+    fname : str (Optional - Default is "theme_atlas")
+        Base file name of the `<fname>.png`, `<fname>.json`, and
+        `<fname>.css` outputs.
+
+    themes : list or dict (Optional - Default is None)
+        Names of themes in `logo.THEMES`, or a dict of name to theme
+        (`create_logo()` keyword arguments). Defaults to every theme in
+        `logo.THEMES`.
+
+    sprite_width : int (Optional - Default is 256)
+        Width of each sprite in pixels. None rasterizes at the size of a
+        .png render.
+
+    max_width : int (Optional - Default is 2048)
+        Maximum width of the sprite sheet in pixels.
+
+    padding : int (Optional - Default is 2)
+        Transparent gap between sprites in pixels.
+
+    move_to : see `create_logo()`
+
+    workers : see `logo.batch.run_jobs()`
+
+    threads : see `logo.batch.run_jobs()`
+
+    optimize_png : bool or dict (Optional - Default is False)
+        Optimize the sprite sheet (see `logo.raster.optimize_png()`).
+
+    Returns
+    -------
+
+    atlas : dict
+        The JSON map: sprite sheet `image`, `width`, and `height`, and
+        `sprites` mapping each theme name to its `x`, `y`, `width`, and
+        `height`.
+
+    Examples
+    --------
+
+    >>> import logo
+    >>> logo.build_atlas("theme_atlas", workers=4)
+
+    """
+
+    if themes is None:
+        themes = list(predefined.THEMES)
+    if not isinstance(themes, dict):
+        themes = {name: batch.resolve_theme(name) for name in themes}
+
+    def _compose(sprites, image_name):
+        sizes = [(s.shape[1], s.shape[0]) for s in sprites]
+        positions, (width, height) = shelf_pack(sizes, max_width, padding)
+        sheet = numpy.zeros((height, width, 4), dtype=numpy.uint8)
+        for sprite, (x, y) in zip(sprites, positions):
+            sheet[y : y + sprite.shape[0], x : x + sprite.shape[1]] = sprite
+
+        atlas = {"image": image_name, "width": width, "height": height, "sprites": {}}
+        css = [
+            ".logo-sprite { background-image: url(%s); background-repeat: no-repeat; }"
+            % image_name
+        ]
+        for name, (w, h), (x, y) in zip(themes, sizes, positions):
+            atlas["sprites"][name] = {"x": x, "y": y, "width": w, "height": h}
+            css.append(
+                ".%s { width: %dpx; height: %dpx; background-position: -%dpx -%dpx; }"
+                % (_css_class(name), w, h, x, y)
+            )
+        return sheet, atlas, {"css": "\n".join(css) + "\n"}
+
+    return batch.render_sheet(
+        fname,
+        themes,
+        _compose,
+        sprite_width,
+        move_to=move_to,
+        workers=workers,
+        threads=threads,
+        optimize_png=optimize_png,
+    )
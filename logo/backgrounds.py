@@ -0,0 +1,209 @@
+"""Derive solid background variants from a single transparent render.
+
+The only difference between the ``*_transparent``, ``*_light`` and
+``*_dark`` themes is the TikZ ``background rectangle`` added by
+`build_tex_file.initialize_tikz()`. Instead of compiling each variant, the
+transparent logo is rendered once and the background is added afterwards:
+raster outputs are alpha composited in-process and SVG outputs receive a
+background ``<rect>``.
+"""
+
+import math
+import re
+import zlib
+
+from . import raster
+from .colors import color_to_rgb, rgb_to_hex
+
+# TikZ `show background rectangle` pads the picture by `inner frame sep`
+# (1ex of the scaled main font), in PDF points, measured from the checked-in
+# examples (2020x2060 transparent, 2149x2190 light and dark pixels)
+FRAME_SEP_PT = 15.54
+
+# resolution used by the `standalone` class `convert` option
+DENSITY = 300
+
+_SVG_TAG = re.compile(r"<svg\b[^>]*>", re.S)
+_LENGTH = re.compile(r"^\s*([0-9.eE+-]+)\s*([a-z%]*)\s*$")
+
+_MEDIABOX = re.compile(rb"/MediaBox\s*\[\s*([-+0-9.\s]+?)\s*\]")
+_STREAM = re.compile(rb"stream\r?\n(.*?)endstream", re.S)
+
+
+def page_pixels(length, density=DENSITY):
+    """Pixels ImageMagick renders a PDF page length (in points) with."""
+    return int(math.ceil(length * density / 72.0 - 0.5))
+
+
+def pdf_page_size(pdf):
+    """``(width, height)`` in points of the (first) page of a PDF file."""
+    with open(pdf, "rb") as f:
+        data = f.read()
+    match = _MEDIABOX.search(data)
+    if match is None:
+        # LuaTeX keeps the page objects in compressed object streams
+        for stream in _STREAM.finditer(data):
+            try:
+                match = _MEDIABOX.search(zlib.decompressobj().decompress(stream.group(1)))
+            except zlib.error:
+                continue
+            if match:
+                break
+    if match is None:
+        raise RuntimeError("No page size found in '%s'." % pdf)
+    x0, y0, x1, y1 = [float(v) for v in match.group(1).split()]
+    return x1 - x0, y1 - y0
+
+
+def _split_padding(padding_pt, density, pixels, length=None):
+    """``(before, after)`` pixels padding an axis of ``pixels`` on both sides.
+
+    The padded page is rounded to pixels as a whole, like a logo compiled
+    with the background rectangle, so the total depends on the unrounded
+    page ``length`` in points (estimated from ``pixels`` if not given).
+    """
+    if length is None:
+        length = pixels * 72.0 / density
+    total = page_pixels(length + 2.0 * padding_pt, density) - pixels
+    before = total // 2
+    return before, total - before
+
+
+def composite_png(
+    source, background_color, fname, color_format="RGB", padding=None, page_size=None
+):
+    """Flatten a transparent PNG logo onto a solid background.
+
+    Parameters
+    ----------
+
+    source : str or bytes
+        File name (or bytes) of the transparent PNG.
+
+    background_color : tuple
+        Background color. Tuple of (color name, color code).
+
+    fname : str
+        Output file name.
+
+    color_format : see `create_logo()`
+
+    padding : float (Optional - Default is None)
+        Background margin in points. Defaults to `FRAME_SEP_PT` so the
+        result matches a logo compiled with a background rectangle.
+
+    page_size : tuple (Optional - Default is None)
+        ``(width, height)`` in points of the PDF page the PNG was rendered
+        from (`pdf_page_size()`). Without it the pixel size of a compiled
+        logo may be off by one.
+
+    """
+    if padding is None:
+        padding = FRAME_SEP_PT
+    image = raster.read_png(source)
+    rgb = color_to_rgb(background_color, color_format)
+    lengths = page_size[::-1] if page_size else (None, None)
+    axes = [
+        _split_padding(padding, DENSITY, pixels, length)
+        for pixels, length in zip(image.shape[:2], lengths)
+    ]
+    flat = raster.composite(image, rgb, tuple(axes))
+    raster.write_png(flat, fname)
+
+
+def _svg_units_per_pt(tag):
+    """User units per point of an SVG, based on its `width` attribute.
+
+    TeX based converters (`dvisvgm`, `pdftocairo`) write points, while
+    ImageMagick writes pixels at the conversion density.
+    """
+    width = re.search(r'\swidth="([^"]*)"', tag)
+    if width and width.group(1).strip().endswith("pt"):
+        return 1.0
+    return DENSITY / 72.0
+
+
+def add_svg_background(svg, background_color, color_format="RGB", padding=None):
+    """Return SVG text with a solid background ``<rect>`` inserted.
+
+    Parameters
+    ----------
+
+    svg : str
+        SVG document text.
+
+    background_color : see `composite_png()`
+
+    color_format : see `create_logo()`
+
+    padding : see `composite_png()`
+
+    Returns
+    -------
+
+    svg : str
+        SVG document text with the background behind all other content.
+
+    """
+    if padding is None:
+        padding = FRAME_SEP_PT
+    match = _SVG_TAG.search(svg)
+    if not match:
+        raise RuntimeError("No <svg> element found.")
+    tag = match.group(0)
+
+    viewbox = re.search(r'viewBox="([^"]*)"', tag)
+    if viewbox:
+        x, y, w, h = [float(v) for v in viewbox.group(1).replace(",", " ").split()]
+    else:
+        x, y = 0.0, 0.0
+        w, h = [
+            float(_LENGTH.match(re.search(r'\s%s="([^"]*)"' % a, tag).group(1)).group(1))
+            for a in ("width", "height")
+        ]
+    pad = padding * _svg_units_per_pt(tag)
+    new_box = x - pad, y - pad, w + 2 * pad, h + 2 * pad
+    new_box_attr = 'viewBox="%g %g %g %g"' % new_box
+
+    # grow the viewport with the view box so the scale is unchanged
+    new_tag = tag
+    for attr, old, new in (("width", w, new_box[2]), ("height", h, new_box[3])):
+        length = re.search(r'(\s%s=")([^"]*)(")' % attr, new_tag)
+        if length:
+            value, unit = _LENGTH.match(length.group(2)).groups()
+            scaled = "%g%s" % (float(value) * new / old, unit)
+            new_tag = new_tag.replace(length.group(0), length.group(1) + scaled + '"')
+    if viewbox:
+        new_tag = new_tag.replace(viewbox.group(0), new_box_attr)
+    else:
+        new_tag = new_tag[:-1].rstrip("/") + " %s>" % new_box_attr
+
+    rect = '<rect x="%g" y="%g" width="%g" height="%g" fill="%s"/>' % (
+        new_box + (rgb_to_hex(color_to_rgb(background_color, color_format)),)
+    )
+    return svg[: match.start()] + new_tag + rect + svg[match.end() :]
+
+
+def inject_svg_background(source, background_color, fname, color_format="RGB", padding=None):
+    """Write a copy of an SVG logo with a solid background.
+
+    Parameters
+    ----------
+
+    source : str
+        File name of the transparent SVG.
+
+    background_color : see `composite_png()`
+
+    fname : str
+        Output file name.
+
+    color_format : see `create_logo()`
+
+    padding : see `composite_png()`
+
+    """
+    with open(source) as f:
+        svg = f.read()
+    with open(fname, "w") as f:
+        f.write(add_svg_background(svg, background_color, color_format, padding))
@@ -0,0 +1,542 @@
+"""Batch creation of logos, favicons, and navigation logos from a manifest.
+
+A manifest is a TOML or JSON document with optional ``defaults`` and lists
+of ``logo``, ``favicon``, and ``nav_logo`` targets::
+
+    [defaults]
+    fmat = "svg"
+
+    [[logo]]
+    name = "pysal_logo"
+    theme = "canon2020_theme_transparent"
+
+    [[favicon]]
+    name = "pysal_logo"
+    theme = "canon2020_theme_transparent"
+
+    [[nav_logo]]
+    name = "pysal_nav_logo_1line"
+    theme = "canon2020_theme_transparent"
+    nav = "psnav_1line"
+
+``theme`` is either the name of a theme in `logo.THEMES` or an inline table
+with ``colors`` (a theme name such as ``"canon2020"`` or a list of LaTeX
+color names), and optionally ``background``, ``concept_color``, and
+``text_color``. ``nav`` is a key of `logo.NAV_LOGOS` or raw TikZ, and
+``node_text`` a key of `logo.NODE_TEXT`. All other keys are passed on to
+`create_logo()`/`create_favicon()`.
+"""
+
+import concurrent.futures
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy
+
+from . import colorspace
+from . import convert
+from . import pipeline
+from . import predefined
+from . import raster
+from . import reproducible
+from . import svg_optimize
+from . import image_set
+from . import theme_pack
+from . import validate
+from .create_pysal_logo import _destination, _publish, _sandbox
+from .create_pysal_logo import create_logo, create_favicon
+from .predefined import NAV_LOGOS, NODE_TEXT, _theme_builder
+
+KINDS = ("logo", "favicon", "nav_logo")
+
+# theme pack attached by process pool workers, see `_attach_themes()`
+_SHARED_THEMES = None
+
+
+def _load_toml(path):
+    """Read a TOML file with `tomllib` (Python 3.11+) or `tomli`."""
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise RuntimeError("TOML manifests require Python 3.11+ or `tomli`.")
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def load_manifest(path):
+    """Read a batch manifest and resolve it into a list of jobs.
+
+    Parameters
+    ----------
+
+    path : str
+        Manifest file name ending in ``.toml`` or ``.json``.
+
+    Returns
+    -------
+
+    jobs : list
+        See `build_jobs()`.
+
+    """
+    if path.endswith(".toml"):
+        manifest = _load_toml(path)
+    elif path.endswith(".json"):
+        with open(path) as f:
+            manifest = json.load(f)
+    else:
+        raise RuntimeError("'%s' is not a .toml or .json manifest." % path)
+    return build_jobs(manifest)
+
+
+def _named_color(name):
+    """(color name, color code) tuple for a LaTeX color name."""
+    if name not in predefined.latex_color_codes:
+        raise RuntimeError("'%s' color not found." % name)
+    return name, predefined.latex_color_codes[name]["RGB"]
+
+
+def resolve_theme(theme):
+    """Return a fresh copy of a theme from a name or an inline definition."""
+    if isinstance(theme, str):
+        if theme not in predefined.THEMES:
+            raise RuntimeError("'%s' theme not found." % theme)
+        return {
+            k: v.copy() if isinstance(v, numpy.ndarray) else v
+            for k, v in predefined.THEMES[theme].items()
+        }
+    colors = theme["colors"]
+    theme_info = colors if isinstance(colors, str) else dict(enumerate(colors))
+    concept_color, text_color = theme.get("concept_color"), theme.get("text_color")
+    return _theme_builder(
+        theme_info,
+        theme.get("background", "transparent"),
+        concept_color=_named_color(concept_color) if concept_color else None,
+        text_color=_named_color(text_color) if text_color else None,
+    )
+
+
+def build_jobs(manifest):
+    """Resolve a parsed manifest into jobs.
+
+    Returns
+    -------
+
+    jobs : list
+        Dictionaries with the target ``kind``, ``name``, and the keyword
+        arguments (``kwargs``) for `create_logo()`/`create_favicon()`.
+
+    """
+    defaults = manifest.get("defaults", {})
+    unknown = set(manifest) - set(KINDS) - {"defaults"}
+    if unknown:
+        raise RuntimeError("Unknown manifest sections: %s" % ", ".join(sorted(unknown)))
+
+    jobs = []
+    for kind in KINDS:
+        for entry in manifest.get(kind, []):
+            entry = dict(defaults, **entry)
+            if "name" not in entry or "theme" not in entry:
+                raise RuntimeError("Every %s needs a `name` and a `theme`." % kind)
+            name = entry.pop("name")
+            kwargs = resolve_theme(entry.pop("theme"))
+            node_text = entry.pop("node_text", None)
+            if node_text:
+                text = NODE_TEXT.get(node_text, node_text)
+                colors = list(kwargs["node_info"][:, 0])
+                kwargs["node_info"] = numpy.array(list(zip(colors, text)))
+            nav = entry.pop("nav", None)
+            if kind == "nav_logo":
+                if not nav:
+                    raise RuntimeError("nav_logo '%s' needs a `nav` entry." % name)
+                kwargs["nav_logo"] = NAV_LOGOS.get(nav, nav)
+            if kind != "logo":
+                kwargs["concept_text"] = ""
+            kwargs.update(entry)
+            jobs.append({"kind": kind, "name": name, "kwargs": kwargs})
+    return jobs
+
+
+def product_name(job, dry_run=False):
+    """File name a successful job must produce."""
+    name, kwargs = job["name"], job["kwargs"]
+    if job["kind"] == "favicon":
+        name = "%s_favicon" % name
+        ext = "ico"
+    else:
+        ext = kwargs.get("fmat", "png")
+    return "%s.%s" % (name, "tex" if dry_run else ext)
+
+
+def run_job(job, dry_run=False):
+    """Create a single target and time it.
+
+    A logo job with a ``thumbnail`` entry is compiled to .pdf only, and
+    also returns an RGBA array rasterized from the .pdf at that width
+    (None for the size of a .png render) in memory, so no full-size
+    raster is written or decoded.
+
+    Returns
+    -------
+
+    result : dict
+        The job ``kind`` and ``name``, the wall time in ``seconds``, and
+        an ``error`` message (``None`` on success), plus the RGBA
+        ``thumbnail`` array if requested.
+
+    """
+    kwargs = dict(job["kwargs"])
+    if "theme_ref" in job:
+        kwargs.update(_SHARED_THEMES[job["theme_ref"]])
+    thumbnail_width = job.get("thumbnail")
+    with_thumbnail = "thumbnail" in job and job["kind"] == "logo" and not dry_run
+    if with_thumbnail:
+        kwargs["fmat"] = "pdf"
+    destination = os.path.abspath(kwargs.pop("move_to", None) or os.curdir)
+    render = create_favicon if job["kind"] == "favicon" else create_logo
+    error = thumbnail = None
+    start = time.perf_counter()
+    try:
+        render(job["name"], move_to=destination, dry_run=dry_run, **kwargs)
+        product = product_name(dict(job, kwargs=kwargs), dry_run)
+        product = os.path.join(destination, product)
+        if not os.path.exists(product):
+            raise RuntimeError("%s was not created." % product)
+        if with_thumbnail:
+            thumbnail = raster.read_png(image_set.rasterize_png(product, thumbnail_width))
+    except Exception as e:
+        error = "%s: %s" % (type(e).__name__, e)
+    seconds = time.perf_counter() - start
+    result = {"kind": job["kind"], "name": job["name"], "seconds": seconds, "error": error}
+    if thumbnail is not None:
+        result["thumbnail"] = thumbnail
+    return result
+
+
+def render_sheet(
+    fname,
+    themes,
+    compose,
+    thumbnail_width=None,
+    move_to=None,
+    workers=1,
+    threads=False,
+    optimize_png=False,
+    **kwargs
+):
+    """Render themes and publish one image composed of their thumbnails.
+
+    The flow of `logo.gallery.create_gallery()` and
+    `logo.atlas.build_atlas()`: every theme is compiled to .pdf with
+    `run_jobs()`, and each worker rasterizes its .pdf at thumbnail size in
+    memory (see `run_job()`). ``compose`` lays out the thumbnails. The
+    image is written (and optionally optimized) with its JSON map and any
+    other files. All of them are published to the output directory
+    together.
+
+    Parameters
+    ----------
+
+    fname : str
+        Base file name of the `<fname>.png` image and `<fname>.json` map.
+
+    themes : dict
+        Theme name to theme (`create_logo()` keyword arguments).
+
+    compose : callable
+        ``compose(thumbnails, image_name)`` returns the image (an RGBA or
+        RGB array of ``uint8``), the JSON map (a dict), and a dict of file
+        extension to the text of any other output, e.g. ``{"css": css}``.
+
+    thumbnail_width : int (Optional - Default is None)
+        Width of each thumbnail in pixels. None rasterizes at the size of
+        a .png render.
+
+    move_to : see `create_logo()`
+
+    workers, threads : see `run_jobs()`
+
+    optimize_png : bool or dict (Optional - Default is False)
+        Optimize the image (see `logo.raster.optimize_png()`).
+
+    **kwargs : see `create_logo()`
+        Passed on for every theme.
+
+    Returns
+    -------
+
+    sheet_map : dict
+        The JSON map returned by ``compose``.
+
+    """
+    destination, jobname = _destination(fname, move_to)
+    with _sandbox(destination) as sandbox:
+        renders = os.path.join(sandbox, "renders")
+        jobs = []
+        for i, theme in enumerate(themes.values()):
+            job_kwargs = dict(theme, **kwargs)
+            job_kwargs.update(fmat="png", move_to=renders)
+            # theme names may not be valid file names
+            jobs.append(
+                {
+                    "kind": "logo",
+                    "name": "theme_%d" % i,
+                    "kwargs": job_kwargs,
+                    "thumbnail": thumbnail_width,
+                }
+            )
+        results = run_jobs(jobs, workers=workers, threads=threads)
+        errors = [
+            "%s: %s" % (name, r["error"]) for name, r in zip(themes, results) if r["error"]
+        ]
+        if errors:
+            raise RuntimeError("Renders failed:\n    %s" % "\n    ".join(errors))
+
+        image_name = "%s.png" % jobname
+        image, sheet_map, others = compose([r["thumbnail"] for r in results], image_name)
+        raster.write_png(image, os.path.join(sandbox, image_name))
+        if optimize_png:
+            options = optimize_png if isinstance(optimize_png, dict) else {}
+            raster.optimize_png_file(os.path.join(sandbox, image_name), **options)
+        keep = {image_name, "%s.json" % jobname}
+        with open(os.path.join(sandbox, "%s.json" % jobname), "w") as f:
+            json.dump(sheet_map, f, indent=2)
+        for ext, text in others.items():
+            with open(os.path.join(sandbox, "%s.%s" % (jobname, ext)), "w") as f:
+                f.write(text)
+            keep.add("%s.%s" % (jobname, ext))
+        _publish(sandbox, destination, keep=keep)
+    return sheet_map
+
+
+def run_jobs(jobs, workers=1, dry_run=False, threads=False, stages=None):
+    """Run jobs, optionally in parallel.
+
+    Themes are validated first (see `logo.validate`), and invalid jobs are
+    reported without launching any subprocess. Every render works in a
+    private temporary directory (see `create_logo()`), so jobs can share
+    an output directory. Vector .svg targets are compiled to .pdf in
+    parallel and then converted together (see `logo.convert.pdf_to_svg()`),
+    so a batch converter such as ``mutool`` handles all of them in a
+    single process.
+
+    Parameters
+    ----------
+
+    jobs : list
+        See `build_jobs()`.
+
+    workers : int (Optional - Default is 1)
+        Number of parallel workers. ``1`` runs the jobs in this process.
+        Process workers attach the job themes from shared memory (see
+        `logo.theme_pack.SharedPack`) instead of receiving a copy per job.
+
+    dry_run : bool (Optional - Default is False)
+        Only write the .tex files.
+
+    threads : bool (Optional - Default is False)
+        Use a thread pool instead of a process pool. The heavy lifting
+        happens in TeX subprocesses, so threads are usually sufficient.
+
+    stages : dict (Optional - Default is None)
+        Run the jobs through the staged pipeline instead, with this number
+        of workers per stage (see `logo.pipeline.run_pipeline()`), so the
+        compilation of a job overlaps with the conversion and optimization
+        of others. ``workers`` and ``threads`` are then ignored.
+
+    Returns
+    -------
+
+    results : list
+        One `run_job()` result per job, in the order of ``jobs``.
+
+    """
+    # reject invalid themes before any subprocess is launched
+    results = [None] * len(jobs)
+    valid = []
+    for i, (job, errors) in enumerate(validate.validate_jobs(jobs)):
+        if errors:
+            error = "RuntimeError: Invalid theme: %s" % "; ".join(errors)
+            results[i] = {
+                "kind": job["kind"],
+                "name": job["name"],
+                "seconds": 0.0,
+                "error": error,
+            }
+        else:
+            valid.append((i, job))
+    valid_jobs = [job for _, job in valid]
+    # convert models xcolor cannot read for the whole batch at once
+    colorspace.themes_to_xcolor([job["kwargs"] for job in valid_jobs])
+    if stages is not None:
+        ran = pipeline.run_pipeline(valid_jobs, stages, dry_run)
+    else:
+        ran = _run_valid(valid_jobs, workers, dry_run, threads)
+    for (i, _), result in zip(valid, ran):
+        results[i] = result
+    return results
+
+
+def _run_valid(jobs, workers, dry_run, threads):
+    """Run validated jobs. See `run_jobs()`."""
+    # vector .svg jobs are compiled to .pdf and converted in one batch,
+    # each in a scratch directory inside its output directory (see
+    # `logo.create_pysal_logo._sandbox()`), so the .svg is published with
+    # an atomic `os.replace()`
+    vector = [i for i, job in enumerate(jobs) if _converts_svg(job, dry_run)]
+    scratch = {}
+    tasks = list(jobs)
+    try:
+        for i in vector:
+            destination = _job_destination(jobs[i])
+            os.makedirs(destination, exist_ok=True)
+            scratch[i] = tempfile.mkdtemp(prefix=".logo-svg-", dir=destination)
+            kwargs = dict(jobs[i]["kwargs"], fmat="pdf", move_to=scratch[i])
+            tasks[i] = dict(jobs[i], kwargs=kwargs)
+
+        if workers <= 1:
+            results = [run_job(task, dry_run) for task in tasks]
+        else:
+            if threads:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                    futures = [pool.submit(run_job, task, dry_run) for task in tasks]
+                    results = [f.result() for f in futures]
+            else:
+                results = _run_processes(tasks, workers, dry_run)
+        if vector:
+            _convert_svg_jobs(jobs, tasks, results, vector, workers)
+    finally:
+        for directory in scratch.values():
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def _job_destination(job):
+    """Absolute output directory of a job's products."""
+    destination = os.path.abspath(job["kwargs"].get("move_to") or os.curdir)
+    return os.path.join(destination, os.path.dirname(job["name"]))
+
+
+def _attach_themes(name, path):
+    """Process pool initializer attaching the shared theme pack.
+
+    The worker reads the job themes, the theme catalog, and the LaTeX
+    color table from the pack (see `logo.predefined.use_theme_pack()`).
+    """
+    global _SHARED_THEMES
+    _SHARED_THEMES = theme_pack.attach_pack(name, path)
+    predefined.use_theme_pack(_SHARED_THEMES)
+
+
+def _run_processes(tasks, workers, dry_run):
+    """Run tasks in a process pool sharing their themes.
+
+    The themes of all tasks, the theme catalog, and the LaTeX color table
+    are placed once in a shared theme pack (see
+    `logo.theme_pack.SharedPack`) that every worker attaches on startup,
+    so tasks are sent to the workers without their themes and no worker
+    builds the catalog itself.
+    """
+    themes = dict(predefined.THEMES)
+    for i, task in enumerate(tasks):
+        kwargs = task["kwargs"]
+        themes["job:%d" % i] = {k: kwargs[k] for k in theme_pack.THEME_KEYS if k in kwargs}
+    try:
+        shared = theme_pack.SharedPack(themes)
+    except (AttributeError, RuntimeError, TypeError, ValueError):
+        # themes the pack cannot hold are sent along with every task
+        shared = None
+    if shared is not None:
+        tasks = [
+            dict(task, theme_ref="job:%d" % i, kwargs=_without_theme(task["kwargs"]))
+            for i, task in enumerate(tasks)
+        ]
+    initializer, initargs = (_attach_themes, (shared.name, shared.path)) if shared else (None, ())
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=initializer, initargs=initargs
+        ) as pool:
+            futures = [pool.submit(run_job, task, dry_run) for task in tasks]
+            return [f.result() for f in futures]
+    finally:
+        if shared is not None:
+            shared.close()
+
+
+def _without_theme(kwargs):
+    return {k: v for k, v in kwargs.items() if k not in theme_pack.THEME_KEYS}
+
+
+def _converts_svg(job, dry_run):
+    """Whether a job's .svg is converted from its .pdf outside of TeX."""
+    kwargs = job["kwargs"]
+    if dry_run or job["kind"] == "favicon" or kwargs.get("fmat") != "svg":
+        return False
+    return bool(convert.resolve_converter(kwargs.get("svg_converter", "auto")))
+
+
+def _convert_svg_jobs(jobs, tasks, results, vector, workers):
+    """Convert the .pdf of every compiled vector job in a single batch.
+
+    Jobs are converted together per ``svg_converter``, so a job choosing a
+    converter gets the same one as with `create_logo()`. The conversion
+    time is shared evenly among the converted jobs of a batch, the .svg
+    is optimized if the job asks for it (``optimize_svg``), and the .svg
+    (plus anything not in `clean_up`) is published to the job's output
+    directory. Errors are reported in the result of their job only.
+    """
+    compiled = {}
+    for i in vector:
+        if results[i]["error"] is None:
+            converter = jobs[i]["kwargs"].get("svg_converter", "auto")
+            compiled.setdefault(converter, []).append(i)
+
+    for converter, group in compiled.items():
+        pdfs = [os.path.join(tasks[i]["kwargs"]["move_to"], product_name(tasks[i])) for i in group]
+        start = time.perf_counter()
+        try:
+            convert.pdf_to_svg(pdfs, converter=converter, workers=max(1, workers))
+        except (RuntimeError, OSError) as e:
+            for i in group:
+                results[i]["error"] = "%s: %s" % (type(e).__name__, e)
+            continue
+        share = (time.perf_counter() - start) / len(group)
+
+        for i, pdf in zip(group, pdfs):
+            kwargs = jobs[i]["kwargs"]
+            svg = "%s.svg" % os.path.splitext(pdf)[0]
+            try:
+                if kwargs.get("optimize_svg"):
+                    options = kwargs["optimize_svg"]
+                    options = options if isinstance(options, dict) else {}
+                    svg_optimize.optimize_svg_file(svg, **options)
+                if kwargs.get("deterministic"):
+                    reproducible.strip_file(svg)
+                _publish(
+                    os.path.dirname(pdf),
+                    _job_destination(jobs[i]),
+                    clean_up=kwargs.get("clean_up", ["aux", "log", "pdf"]) or (),
+                    skip_unchanged=kwargs.get("skip_unchanged", False),
+                )
+            except (RuntimeError, OSError, ValueError) as e:
+                results[i]["error"] = "%s: %s" % (type(e).__name__, e)
+            results[i]["seconds"] += share
+
+
+def format_report(results, wall_time=None):
+    """Format per-target timings as a plain text table."""
+    lines = ["%-10s %-40s %9s  %s" % ("kind", "name", "seconds", "status")]
+    for r in results:
+        status = "ok" if r["error"] is None else r["error"]
+        lines.append("%-10s %-40s %9.2f  %s" % (r["kind"], r["name"], r["seconds"], status))
+    total = sum(r["seconds"] for r in results)
+    lines.append("%-10s %-40s %9.2f" % ("total", "%d targets" % len(results), total))
+    if wall_time is not None:
+        lines.append("%-10s %-40s %9.2f" % ("wall", "", wall_time))
+    return "\n".join(lines)
@@ -2,9 +2,10 @@
 """
 
 from .predefined import psnav_1line, psnav_2line
+from .validate import normalize_color_code
 
 
-def set_header_and_footer(font, convert_tikz, colors, cformat):
+def set_header_and_footer(font, convert_tikz, colors, cformat, preamble=""):
     header = r"""
     \documentclass[tikz%s]{standalone}
     \usetikzlibrary{mindmap,trees,backgrounds}
@@ -26,10 +27,12 @@ def set_header_and_footer(font, convert_tikz, colors, cformat):
     \definecolor{%s}{%s}{%s}""" % (
                 color,
                 cformat,
-                code,
+                normalize_color_code(code, cformat),
             )
             defined.add(color)
 
+    # extra preamble lines, e.g. `logo.reproducible.pdf_settings()`
+    header += preamble
     header += r"""
     
     \begin{document}"""
@@ -57,10 +60,12 @@ def initialize_tikz(
     level_distance_2,
     sibling_angle_2,
     font_size_l1="Huge",
+    rotate=None,
 ):
     """ see `level_distances_and_sibling_angles()` for adjusting the
     `level distance` and `sibling angle` parameters for the 
-    tikzpicture mindmap/concept.
+    tikzpicture mindmap/concept. `rotate` turns the whole mindmap by
+    an angle in degrees (e.g. for animation frames).
     """
     # pack distance, angle, and font arguments for each level
     args_l1 = level_distance_1, sibling_angle_1, font_size_l1
@@ -81,6 +86,11 @@ def initialize_tikz(
     else:
         background = ""
     
+    # rotate the `grow cyclic` layout if desired
+    if rotate:
+        background += r"""
+        rotate=%s,""" % rotate
+    
     # initialize tikz picture
     main_content = r"""
     \begin{tikzpicture}%s[%s
@@ -137,8 +147,10 @@ def create_grandchild():
     return grandchild
 
 
-def create_child(child_color, grandchildren, child_text):
-    # create a child node
+def create_child(child_color, grandchildren, child_text, opacity=None):
+    # create a child node, optionally (partially) transparent
+    if opacity is not None:
+        child_color = "%s, opacity=%s" % (child_color, opacity)
     child = r"""
         child [concept color=%s]{ node {%s}""" % (
         child_color,
@@ -0,0 +1,76 @@
+"""On-disk cache of rendered logos.
+
+Renders are stored under a key derived from everything that determines
+the output (target kind, theme, and `create_logo()` arguments), so an
+identical request never compiles twice. The cache directory is
+``$LOGO_CACHE_DIR`` or ``~/.cache/pysal-logo``.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy
+
+
+def default_cache_dir():
+    """The cache directory from ``$LOGO_CACHE_DIR`` or the user cache."""
+    return os.environ.get("LOGO_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "pysal-logo"
+    )
+
+
+def _jsonable(value):
+    """Make theme values (numpy arrays, tuples) JSON serializable."""
+    if isinstance(value, numpy.ndarray):
+        return _jsonable(value.tolist())
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    return value
+
+
+def cache_key(*parts):
+    """Stable hex digest of the JSON representation of ``parts``."""
+    blob = json.dumps(_jsonable(parts), sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class RenderCache:
+    """Content store of rendered files keyed by `cache_key()`.
+
+    Parameters
+    ----------
+
+    directory : str (Optional - Default is None)
+        Cache directory. Defaults to `default_cache_dir()`.
+
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_cache_dir()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, key, ext):
+        """File name of a cache entry."""
+        return os.path.join(self.directory, key[:2], "%s.%s" % (key, ext))
+
+    def get(self, key, ext):
+        """Return the cached bytes or ``None``."""
+        try:
+            with open(self.path(key, ext), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, ext, data):
+        """Store bytes atomically, so readers never see partial entries."""
+        path = self.path(key, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return path
@@ -0,0 +1,260 @@
+"""Change detection between a new render and the previously published one.
+
+Regenerated logos rarely have identical bytes even when nothing visible
+changed: PNG and PDF files embed timestamps and IDs, and converters number
+their SVG definitions differently from run to run. `unchanged()` compares
+what is actually shown instead:
+
+    - .png: a difference hash (dHash) of both images as a fast reject,
+      then a per-pixel comparison within `PIXEL_TOLERANCE`
+    - .svg: the markup without metadata and with definitions renumbered
+    - .pdf: the bytes without creation dates and the trailer ID
+    - anything else: the bytes
+
+`create_logo(skip_unchanged=True)` uses it to leave unchanged files in the
+output directory untouched, so a release step only uploads what changed.
+The hashes are computed for whole stacks of images at once, e.g. to
+compare two artifact directories::
+
+    $ python -m logo.changes new_logos/ published_logos/
+"""
+
+import argparse
+import os
+import re
+import xml.etree.ElementTree as ET
+
+import numpy
+
+from . import raster
+from . import svg_optimize
+
+# largest per-channel difference of pixels that count as unchanged
+PIXEL_TOLERANCE = 2
+
+# side of the (grayscale) image a hash is computed from
+HASH_SIZE = 8
+
+_PDF_VOLATILE = re.compile(
+    rb"/(?:CreationDate|ModDate)\s*\([^)]*\)"
+    rb"|/ID\s*\[[^\]]*\]"
+    rb"|<xmp:(?:CreateDate|ModifyDate|MetadataDate)>[^<]*</xmp:\w+>"
+    rb"|<xmpMM:(?:DocumentID|InstanceID)>[^<]*</xmpMM:\w+>"
+)
+
+
+def _gray(image, width, height):
+    """Image flattened onto white and scaled to a small grayscale array."""
+    small = raster.resize(image, width, height).astype(numpy.float32)
+    alpha = small[..., 3] / 255.0
+    luma = small[..., :3] @ numpy.array([0.299, 0.587, 0.114], dtype=numpy.float32)
+    return luma * alpha + 255.0 * (1.0 - alpha)
+
+
+def average_hash(images, size=HASH_SIZE):
+    """Average hashes (aHash) of RGBA images.
+
+    Parameters
+    ----------
+
+    images : list
+        ``(height, width, 4)`` RGBA arrays of ``uint8``, of any sizes.
+
+    size : int (Optional - Default is 8)
+        Hash side, so a hash has ``size ** 2`` bits.
+
+    Returns
+    -------
+
+    hashes : numpy.ndarray
+        ``(n, size ** 2 // 8)`` array of ``uint8``, a hash per row.
+
+    """
+    gray = numpy.stack([_gray(image, size, size) for image in images])
+    bits = gray > gray.mean(axis=(1, 2), keepdims=True)
+    return numpy.packbits(bits.reshape(len(images), -1), axis=1)
+
+
+def difference_hash(images, size=HASH_SIZE):
+    """Difference hashes (dHash) of RGBA images.
+
+    Each bit tells whether a pixel is brighter than its right neighbor in
+    the image scaled to ``size + 1`` by ``size`` pixels. See
+    `average_hash()` for the parameters and return value.
+    """
+    gray = numpy.stack([_gray(image, size + 1, size) for image in images])
+    bits = gray[:, :, 1:] > gray[:, :, :-1]
+    return numpy.packbits(bits.reshape(len(images), -1), axis=1)
+
+
+def hamming(a, b):
+    """Number of differing bits between rows of hashes."""
+    return numpy.unpackbits(numpy.bitwise_xor(a, b), axis=-1).sum(axis=-1)
+
+
+def pixel_difference(a, b):
+    """Largest per-channel difference of two RGBA images (255 if sizes differ)."""
+    if a.shape != b.shape:
+        return 255
+    # fully transparent pixels may carry any color
+    visible = (a[..., 3] > 0) | (b[..., 3] > 0)
+    diff = numpy.abs(a.astype(numpy.int16) - b.astype(numpy.int16))
+    return int(diff[visible].max()) if visible.any() else 0
+
+
+def images_unchanged(new, old, tolerance=PIXEL_TOLERANCE, max_distance=None):
+    """Which pairs of RGBA images look the same.
+
+    Pairs whose difference hashes are further apart than ``max_distance``
+    bits are changed without comparing their pixels; the others are
+    compared pixel by pixel within ``tolerance``.
+
+    Parameters
+    ----------
+
+    new, old : list
+        RGBA arrays, compared pairwise.
+
+    tolerance : int (Optional - Default is `PIXEL_TOLERANCE`)
+        Largest per-channel difference of unchanged pixels.
+
+    max_distance : int (Optional - Default is None)
+        Hash distance that always counts as changed. Defaults to a tenth
+        of the hash bits.
+
+    Returns
+    -------
+
+    unchanged : numpy.ndarray
+        A bool per pair.
+
+    """
+    if not len(new):
+        return numpy.zeros(0, dtype=bool)
+    if max_distance is None:
+        max_distance = HASH_SIZE ** 2 // 10
+    distances = hamming(difference_hash(new), difference_hash(old))
+    unchanged = distances <= max_distance
+    for i in numpy.flatnonzero(unchanged):
+        unchanged[i] = pixel_difference(new[i], old[i]) <= tolerance
+    return unchanged
+
+
+def canonical_svg(svg):
+    """SVG markup without metadata and with ids numbered in document order."""
+    root = ET.fromstring(svg)
+    for parent in list(root.iter()):
+        for child in list(parent):
+            if child.tag.split("}")[-1] in ("metadata", "title", "desc"):
+                parent.remove(child)
+    renamed = {}
+    for elem in root.iter():
+        if "id" in elem.attrib:
+            renamed[elem.get("id")] = "i%d" % len(renamed)
+            elem.set("id", renamed[elem.get("id")])
+    svg_optimize._rename_references(root, renamed)
+    return ET.tostring(root)
+
+
+def canonical_pdf(pdf):
+    """PDF bytes without creation dates, document IDs, and trailer ID."""
+    return _PDF_VOLATILE.sub(b"", pdf)
+
+
+def _read(fname):
+    with open(fname, "rb") as f:
+        return f.read()
+
+
+def unchanged(new, old, tolerance=PIXEL_TOLERANCE):
+    """Whether file `new` shows the same as file `old`.
+
+    Parameters
+    ----------
+
+    new, old : str
+        File names. A missing `old` file counts as changed.
+
+    tolerance : int (Optional - Default is `PIXEL_TOLERANCE`)
+        See `images_unchanged()`.
+
+    Returns
+    -------
+
+    unchanged : bool
+
+    """
+    if not os.path.exists(old):
+        return False
+    new_bytes, old_bytes = _read(new), _read(old)
+    if new_bytes == old_bytes:
+        return True
+    ext = new.rsplit(".", 1)[-1].lower()
+    try:
+        if ext == "png":
+            images = [raster.read_png(new_bytes)], [raster.read_png(old_bytes)]
+            return bool(images_unchanged(*images, tolerance=tolerance)[0])
+        if ext == "svg":
+            return canonical_svg(new_bytes) == canonical_svg(old_bytes)
+        if ext == "pdf":
+            return canonical_pdf(new_bytes) == canonical_pdf(old_bytes)
+    except (RuntimeError, ET.ParseError):
+        # e.g. interlaced PNGs, which are not decoded
+        return False
+    return False
+
+
+def compare_directories(new, old, tolerance=PIXEL_TOLERANCE):
+    """Compare every file in directory `new` with its namesake in `old`.
+
+    The .png files are hashed together, so most changed images are found
+    without a pixel comparison.
+
+    Returns
+    -------
+
+    changed : list
+        File names (relative to `new`) that are new or changed.
+
+    """
+    names = sorted(f for f in os.listdir(new) if os.path.isfile(os.path.join(new, f)))
+    present = [f for f in names if os.path.exists(os.path.join(old, f))]
+    changed = set(names) - set(present)
+    pngs = []
+    for f in present:
+        a, b = os.path.join(new, f), os.path.join(old, f)
+        if f.lower().endswith(".png") and _read(a) != _read(b):
+            pngs.append(f)
+        elif not f.lower().endswith(".png") and not unchanged(a, b, tolerance):
+            changed.add(f)
+    decoded = []
+    for f in pngs:
+        try:
+            pair = raster.read_png(os.path.join(new, f)), raster.read_png(os.path.join(old, f))
+        except RuntimeError:
+            changed.add(f)
+            continue
+        decoded.append((f, pair))
+    if decoded:
+        same = images_unchanged(
+            [pair[0] for _, pair in decoded], [pair[1] for _, pair in decoded], tolerance
+        )
+        changed.update(f for (f, _), s in zip(decoded, same) if not s)
+    return sorted(changed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m logo.changes",
+        description="List the files of a directory that differ visibly from a previous set.",
+    )
+    parser.add_argument("new", help="directory of new renders")
+    parser.add_argument("old", help="directory of the previously published files")
+    parser.add_argument("--tolerance", type=int, default=PIXEL_TOLERANCE)
+    args = parser.parse_args(argv)
+    for f in compare_directories(args.new, args.old, args.tolerance):
+        print(f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Helpers for translating the color codes used in themes.
+
+Themes store colors as ``(name, code)`` tuples where ``code`` is a string
+in the `xcolor` model given by the theme's ``color_format`` -- for example
+``("white", "255.0, 255.0, 255.0")`` in the ``"RGB"`` model. The functions
+here turn those codes into integer RGB triplets for work that happens outside
+of TeX (compositing, recoloring, etc.).
+"""
+
+import numpy
+
+from . import colorspace
+
+
+def color_to_rgb(color, color_format="RGB"):
+    """Convert a theme color to an integer RGB triplet.
+
+    Parameters
+    ----------
+
+    color : tuple or str
+        Either a ``(color name, color code)`` tuple or a bare color code in
+        any model of `logo.colorspace.MODELS`, e.g. ``"r, g, b"`` in the
+        ``"RGB"`` (0-255) model or ``"#rrggbb"``/``"rrggbb"`` in the
+        ``"HTML"`` model.
+
+    color_format : str (Optional - Default is "RGB")
+        Color system of ``color``. A leading ``#`` always implies ``"HTML"``.
+
+    Returns
+    -------
+
+    rgb : tuple
+        ``(r, g, b)`` integers in the range 0-255.
+
+    """
+    if isinstance(color, (tuple, list)):
+        color = color[1]
+    if color is None:
+        raise RuntimeError("Transparent colors have no RGB value.")
+    code = str(color).strip()
+    if code.startswith("#"):
+        color_format = "HTML"
+    try:
+        values = colorspace.parse_codes([code], color_format)
+    except ValueError:
+        raise RuntimeError("'%s' is not a valid %s color." % (color, color_format))
+    rgb = colorspace.to_rgb(values, color_format)[0] * 255.0
+    return tuple(int(v) for v in numpy.rint(rgb))
+
+
+def rgb_to_hex(rgb):
+    """Convert an integer RGB triplet to a ``#rrggbb`` string."""
+    return "#%02x%02x%02x" % tuple(rgb)
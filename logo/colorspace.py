@@ -0,0 +1,268 @@
+"""Vectorized conversion between color models.
+
+Every function works on whole arrays of colors in one NumPy call, e.g. all
+the node colors of every theme in a batch at once. The supported models
+are the `xcolor` models used for ``color_format`` plus CIELAB:
+
+    - ``"RGB"``: red, green, blue in 0-255
+    - ``"rgb"``: red, green, blue in 0-1
+    - ``"HTML"``: ``RRGGBB`` hexadecimal
+    - ``"hsb"``: hue, saturation, brightness in 0-1
+    - ``"HSB"``: hue, saturation, brightness in 0-240 (`xcolor`'s
+      default ``\rangeHSB``)
+    - ``"cmyk"``: cyan, magenta, yellow, black in 0-1
+    - ``"gray"``: gray level in 0-1
+    - ``"Lab"``: CIELAB (D65), L in 0-100
+
+``"Lab"`` is not understood by `xcolor`; themes using it are converted to
+``"RGB"`` before the .tex file is written (see `themes_to_xcolor()`).
+"""
+
+import functools
+
+import numpy
+
+# number of components per model
+MODELS = {"RGB": 3, "rgb": 3, "HTML": 1, "hsb": 3, "HSB": 3, "cmyk": 4, "gray": 1, "Lab": 3}
+
+# models of integer components and their maximum (`xcolor`'s default
+# ``\rangeRGB`` and ``\rangeHSB``)
+INTEGER_MODELS = {"RGB": 255, "HSB": 240}
+
+# models `xcolor` can read directly
+XCOLOR_MODELS = ("RGB", "rgb", "HTML", "hsb", "HSB", "cmyk", "gray")
+
+# sRGB (D65) to CIE XYZ
+_RGB_TO_XYZ = numpy.array(
+    [
+        [0.4124564, 0.3575761, 0.1804375],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.0193339, 0.1191920, 0.9503041],
+    ]
+)
+_XYZ_TO_RGB = numpy.linalg.inv(_RGB_TO_XYZ)
+_WHITE = _RGB_TO_XYZ.sum(axis=1)
+
+# theme entries holding a single (color name, color code) tuple
+_SINGLE_COLORS = ("background_color", "concept_color", "text_color")
+
+
+def _check_model(model):
+    if model not in MODELS:
+        err_msg = "'%s' color format not supported (%s)."
+        raise RuntimeError(err_msg % (model, ", ".join(MODELS)))
+
+
+def parse_codes(codes, model):
+    """Parse color code strings into a ``(n, components)`` float array.
+
+    ``"HTML"`` codes are returned as ``(n, 3)`` integers in 0-255.
+    """
+    _check_model(model)
+    codes = [str(c).strip() for c in codes]
+    if model == "HTML":
+        values = numpy.array([int(c.lstrip("#"), 16) for c in codes], dtype=numpy.int64)
+        shifts = numpy.array([16, 8, 0])
+        return ((values[:, None] >> shifts) & 0xFF).astype(float)
+    flat = numpy.array(",".join(codes).split(","), dtype=float) if codes else numpy.empty(0)
+    if flat.size != len(codes) * MODELS[model]:
+        raise RuntimeError("Color codes do not all have %d components." % MODELS[model])
+    return flat.reshape(len(codes), MODELS[model])
+
+
+def format_codes(values, model):
+    """Format an array of colors as `xcolor` code strings."""
+    _check_model(model)
+    values = numpy.asarray(values, dtype=float)
+    if model == "HTML":
+        ints = numpy.clip(numpy.rint(values), 0, 255).astype(int)
+        return ["%02X%02X%02X" % tuple(v) for v in ints]
+    if model in INTEGER_MODELS:
+        ints = numpy.clip(numpy.rint(values), 0, INTEGER_MODELS[model]).astype(int)
+        return [", ".join(str(v) for v in row) for row in ints]
+    return [", ".join("%g" % round(v, 6) for v in row) for row in values]
+
+
+def _hsb_to_rgb(hsb):
+    h, s, b = (hsb[:, i] for i in range(3))
+    i = numpy.floor(h * 6.0) % 6
+    f = h * 6.0 - numpy.floor(h * 6.0)
+    p, q, t = b * (1 - s), b * (1 - f * s), b * (1 - (1 - f) * s)
+    choices = [
+        numpy.stack(c, axis=1)
+        for c in ((b, t, p), (q, b, p), (p, b, t), (p, q, b), (t, p, b), (b, p, q))
+    ]
+    return numpy.select([(i == k)[:, None] for k in range(6)], choices)
+
+
+def _rgb_to_hsb(rgb):
+    high, low = rgb.max(axis=1), rgb.min(axis=1)
+    delta = high - low
+    safe = numpy.where(delta == 0, 1, delta)
+    r, g, b = (rgb[:, i] for i in range(3))
+    hue = numpy.select(
+        [delta == 0, high == r, high == g],
+        [0.0, ((g - b) / safe) % 6, (b - r) / safe + 2],
+        (r - g) / safe + 4,
+    ) / 6.0
+    saturation = numpy.where(high == 0, 0.0, delta / numpy.where(high == 0, 1, high))
+    return numpy.stack([hue, saturation, high], axis=1)
+
+
+def _lab_f(t):
+    return numpy.where(t > (6 / 29.0) ** 3, numpy.cbrt(t), t / (3 * (6 / 29.0) ** 2) + 4 / 29.0)
+
+
+def _lab_f_inv(t):
+    return numpy.where(t > 6 / 29.0, t ** 3, 3 * (6 / 29.0) ** 2 * (t - 4 / 29.0))
+
+
+def _rgb_to_lab(rgb):
+    linear = numpy.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _RGB_TO_XYZ.T / _WHITE
+    fx, fy, fz = (_lab_f(xyz[:, i]) for i in range(3))
+    return numpy.stack([116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)], axis=1)
+
+
+def _lab_to_rgb(lab):
+    fy = (lab[:, 0] + 16) / 116.0
+    fx, fz = fy + lab[:, 1] / 500.0, fy - lab[:, 2] / 200.0
+    xyz = numpy.stack([_lab_f_inv(fx), _lab_f_inv(fy), _lab_f_inv(fz)], axis=1) * _WHITE
+    linear = numpy.clip(xyz @ _XYZ_TO_RGB.T, 0, 1)
+    return numpy.where(
+        linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055
+    )
+
+
+def to_rgb(values, model):
+    """Convert an array of colors to ``(n, 3)`` rgb floats in 0-1."""
+    _check_model(model)
+    values = numpy.atleast_2d(numpy.asarray(values, dtype=float))
+    if model in ("RGB", "HTML"):
+        rgb = values / 255.0
+    elif model == "rgb":
+        rgb = values
+    elif model == "hsb":
+        rgb = _hsb_to_rgb(values)
+    elif model == "HSB":
+        rgb = _hsb_to_rgb(values / INTEGER_MODELS["HSB"])
+    elif model == "cmyk":
+        # the inverse of xcolor's conversion with full undercolor removal
+        rgb = 1.0 - numpy.minimum(1.0, values[:, :3] + values[:, 3:])
+    elif model == "gray":
+        rgb = numpy.repeat(values, 3, axis=1)
+    else:
+        rgb = _lab_to_rgb(values)
+    return numpy.clip(rgb, 0.0, 1.0)
+
+
+def from_rgb(rgb, model):
+    """Convert ``(n, 3)`` rgb floats in 0-1 to an array in `model`."""
+    _check_model(model)
+    rgb = numpy.clip(numpy.atleast_2d(numpy.asarray(rgb, dtype=float)), 0.0, 1.0)
+    if model in ("RGB", "HTML"):
+        return rgb * 255.0
+    if model == "rgb":
+        return rgb
+    if model == "hsb":
+        return _rgb_to_hsb(rgb)
+    if model == "HSB":
+        return _rgb_to_hsb(rgb) * INTEGER_MODELS["HSB"]
+    if model == "cmyk":
+        # xcolor: k = min(c, m, y), then full undercolor removal
+        cmy = 1.0 - rgb
+        k = cmy.min(axis=1, keepdims=True)
+        return numpy.hstack([cmy - k, k])
+    if model == "gray":
+        # xcolor's luminance weights
+        return rgb @ numpy.array([[0.3], [0.59], [0.11]])
+    return _rgb_to_lab(rgb)
+
+
+def convert(values, source, target):
+    """Convert an array of colors from one model to another."""
+    if source == target:
+        return numpy.asarray(values, dtype=float)
+    return from_rgb(to_rgb(values, source), target)
+
+
+def convert_codes(codes, source, target):
+    """Convert color code strings from one model to another."""
+    if not len(codes):
+        return []
+    return format_codes(convert(parse_codes(codes, source), source, target), target)
+
+
+@functools.lru_cache(maxsize=None)
+def latex_color_table():
+    """Names and ``(n, 3)`` rgb array of every LaTeX defined color."""
+    from .predefined import latex_color_codes
+
+    names = tuple(latex_color_codes)
+    rgb = to_rgb(parse_codes([latex_color_codes[n]["RGB"] for n in names], "RGB"), "RGB")
+    rgb.setflags(write=False)
+    return names, rgb
+
+
+def themes_to_xcolor(themes, target="RGB"):
+    """Convert themes in models `xcolor` cannot read, in bulk.
+
+    The color codes of every theme whose ``color_format`` is not one of
+    `XCOLOR_MODELS` (i.e. ``"Lab"``) are gathered per model and converted
+    in one call. Themes are updated in place (``node_info`` is replaced
+    by a converted copy).
+
+    Parameters
+    ----------
+
+    themes : list
+        `create_logo()` keyword arguments.
+
+    target : str (Optional - Default is "RGB")
+        `xcolor` model to convert to.
+
+    Returns
+    -------
+
+    themes : list
+        The same themes.
+
+    """
+    pending = {}
+    for theme in themes:
+        model = theme.get("color_format")
+        if model in XCOLOR_MODELS or model not in MODELS:
+            continue
+        slots = []
+        node_info = theme.get("node_info")
+        if node_info is not None:
+            slots += [("node_info", i) for i in range(len(node_info))]
+        slots += [(key, None) for key in _SINGLE_COLORS if theme.get(key)]
+        slots = [s for s in slots if _get(theme, s)[1] is not None]
+        pending.setdefault(model, []).append((theme, slots))
+
+    for model, entries in pending.items():
+        codes = [_get(theme, slot)[1] for theme, slots in entries for slot in slots]
+        converted = iter(convert_codes(codes, model, target))
+        for theme, slots in entries:
+            if "node_info" in theme and theme["node_info"] is not None:
+                theme["node_info"] = numpy.array(theme["node_info"], dtype=object)
+            for slot in slots:
+                name = _get(theme, slot)[0]
+                _set(theme, slot, (name, next(converted)))
+            theme["color_format"] = target
+    return themes
+
+
+def _get(theme, slot):
+    key, i = slot
+    color = theme[key] if i is None else theme[key][i][0]
+    return color if color is not None else (None, None)
+
+
+def _set(theme, slot, color):
+    key, i = slot
+    if i is None:
+        theme[key] = color
+    else:
+        theme[key][i, 0] = color
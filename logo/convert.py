@@ -0,0 +1,211 @@
+"""Direct PDF to SVG conversion driven from Python.
+
+The `standalone` class ``convert`` option used by `create_logo()` makes the
+TeX engine spawn ImageMagick/Ghostscript with ``--shell-escape`` for every
+logo, and ImageMagick embeds a raster image in the SVG. The converters here
+instead turn the finished PDF into a vector SVG:
+
+    - ``mutool``: MuPDF, converts many PDFs in a single process
+    - ``pdftocairo``: Poppler, one PDF per process
+    - ``dvisvgm``: ``dvisvgm --pdf``, one PDF per process
+
+With ``converter="auto"`` each available tool is timed on the first PDF
+converted, and the fastest is remembered (on disk, next to the render cache)
+for later runs.
+"""
+
+import concurrent.futures
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from . import limits
+from .cache import default_cache_dir
+
+CONVERTERS = ("mutool", "pdftocairo", "dvisvgm")
+
+logger = logging.getLogger(__name__)
+
+# fastest converter measured in this process
+_selected = {}
+
+
+def available_converters():
+    """Converters whose executable is on the ``PATH``."""
+    return [c for c in CONVERTERS if shutil.which(c)]
+
+
+def _timings_path():
+    return os.path.join(default_cache_dir(), "svg_converter_timings.json")
+
+
+def _load_timings():
+    try:
+        with open(_timings_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_timings(timings):
+    """Write the converter timings atomically; failures are only logged."""
+    path = _timings_path()
+    tmp = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # a file per writer, so concurrent writers never share one
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(timings, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Could not save the converter timings to %s: %s", path, e)
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _run(command, cwd=None):
+    process = limits.run(command, "convert", cwd=cwd)
+    if process.returncode:
+        err_msg = "'%s' failed: %s"
+        raise RuntimeError(err_msg % (" ".join(command), process.stderr.decode()[-500:]))
+    return process
+
+
+def _convert_batch(converter, pdfs, svgs, workers):
+    """Convert ``pdfs`` to ``svgs`` with a single converter."""
+    if converter == "mutool":
+        # every PDF is a single page, so pages are numbered in input order
+        scratch = tempfile.mkdtemp(prefix=".mutool-", dir=os.path.dirname(svgs[0]))
+        try:
+            pattern = os.path.join(scratch, "page%d.svg")
+            _run(["mutool", "convert", "-F", "svg", "-O", "text=path", "-o", pattern] + pdfs)
+            for i, svg in enumerate(svgs):
+                # the outputs may be on other file systems than the first
+                shutil.move(pattern % (i + 1), svg)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        return
+
+    def _one(pdf_svg):
+        pdf, svg = pdf_svg
+        if converter == "pdftocairo":
+            _run(["pdftocairo", "-svg", pdf, svg])
+        elif converter == "dvisvgm":
+            _run(["dvisvgm", "--pdf", "--no-fonts", "--output=%s" % svg, pdf])
+        else:
+            raise RuntimeError("'%s' converter not supported." % converter)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_one, zip(pdfs, svgs)))
+
+
+def select_converter(sample_pdf, candidates=None):
+    """Time every available converter on a sample PDF and pick the fastest.
+
+    Parameters
+    ----------
+
+    sample_pdf : str
+        PDF to convert (the output is discarded).
+
+    candidates : list (Optional - Default is None)
+        Converters to try. Defaults to `available_converters()`.
+
+    Returns
+    -------
+
+    converter : str
+        Name of the fastest converter, or ``None`` if none succeeded.
+
+    """
+    candidates = candidates or available_converters()
+    timings = {}
+    scratch = tempfile.mkdtemp(prefix=".svg-converters-")
+    try:
+        for converter in candidates:
+            svg = os.path.join(scratch, "%s.svg" % converter)
+            start = time.perf_counter()
+            try:
+                _convert_batch(converter, [os.path.abspath(sample_pdf)], [svg], 1)
+            except (RuntimeError, OSError):
+                continue
+            timings[converter] = time.perf_counter() - start
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    if not timings:
+        return None
+    fastest = min(timings, key=timings.get)
+    _selected["auto"] = fastest
+    _save_timings({"selected": fastest, "seconds": timings})
+    return fastest
+
+
+def resolve_converter(converter="auto"):
+    """Name of the converter to use, or ``None`` for the legacy path.
+
+    ``"auto"`` returns the measured choice if one is known (and still
+    installed), ``"measure"`` if it still has to be measured, and ``None``
+    if no converter is installed. ``None`` and ``"convert"`` select the
+    ImageMagick path through the `standalone` class.
+    """
+    if converter in (None, "convert"):
+        return None
+    available = available_converters()
+    if converter != "auto":
+        if converter not in available:
+            raise RuntimeError("'%s' converter not found." % converter)
+        return converter
+    if not available:
+        return None
+    selected = _selected.get("auto") or _load_timings().get("selected")
+    if selected in available:
+        _selected["auto"] = selected
+        return selected
+    return "measure"
+
+
+def pdf_to_svg(pdfs, svgs=None, converter="auto", workers=4):
+    """Convert PDFs to vector SVGs.
+
+    Parameters
+    ----------
+
+    pdfs : list
+        PDF file names.
+
+    svgs : list (Optional - Default is None)
+        Output file names. Defaults to the PDF names with an .svg suffix.
+
+    converter : str (Optional - Default is "auto")
+        One of `CONVERTERS` or ``"auto"`` for the fastest measured one.
+
+    workers : int (Optional - Default is 4)
+        Concurrent conversion processes for converters handling one PDF
+        per process. ``mutool`` converts the whole batch in one process.
+
+    Returns
+    -------
+
+    converter : str
+        The converter used.
+
+    """
+    pdfs = [os.path.abspath(p) for p in pdfs]
+    if svgs is None:
+        svgs = ["%s.svg" % os.path.splitext(p)[0] for p in pdfs]
+    svgs = [os.path.abspath(s) for s in svgs]
+    if not pdfs:
+        return None
+    resolved = resolve_converter(converter)
+    if resolved is None:
+        raise RuntimeError("No PDF to SVG converter found (%s)." % ", ".join(CONVERTERS))
+    if resolved == "measure":
+        resolved = select_converter(pdfs[0])
+        if resolved is None:
+            raise RuntimeError("No PDF to SVG converter succeeded.")
+    _convert_batch(resolved, pdfs, svgs, workers)
+    return resolved
@@ -20,7 +20,7 @@ How to use:
         $ python runner.py
 
 Requirements:
-    Python 3.6+ (numpy)
+    Python 3.7+ (numpy)
     LuaTeX, Version 1.10.0 (TeX Live 2019)
     M+ fonts
         info -- https://mplus-fonts.osdn.jp/about-en.html
@@ -47,11 +47,259 @@ File creation date:
 
 """
 
+import contextlib
 import os
-import subprocess
+import shutil
+import tempfile
 
 from .predefined import CHILD_NODES, GRANDCHILD_NODES
+from .predefined import BACKGROUNDS, TRANSPARENT
 from . import build_tex_file
+from . import changes
+from . import colorspace
+from . import backgrounds as _backgrounds
+from . import convert
+from . import engines
+from . import icons
+from . import limits
+from . import raster
+from . import reproducible
+from . import svg_optimize
+from . import validate
+
+
+def _destination(fname, move_to):
+    """Absolute output directory and bare job name for `fname`."""
+    directory, jobname = os.path.split(fname)
+    destination = os.path.join(os.getcwd(), move_to or "", directory)
+    return os.path.abspath(destination), jobname
+
+
+@contextlib.contextmanager
+def _sandbox(destination):
+    """Private working directory inside `destination`.
+
+    Every render works in its own directory, so concurrent renders (even
+    with the same file name) never see each other's intermediary files.
+    Creating it inside `destination` keeps it on the same file system,
+    which makes publishing the products with `os.replace()` atomic.
+    """
+    os.makedirs(destination, exist_ok=True)
+    sandbox = tempfile.mkdtemp(prefix=".logo-", dir=destination)
+    try:
+        yield sandbox
+    finally:
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+
+def _publish(sandbox, destination, clean_up=(), keep=None, skip_unchanged=False):
+    """Atomically move the products of a render to `destination`.
+
+    Files with an extension in `clean_up` are left behind (and removed
+    with the sandbox). If `keep` is given only those file names are moved.
+    With `skip_unchanged` a file that looks the same as the one already in
+    `destination` (see `logo.changes.unchanged()`) is not moved, so the
+    published file keeps its bytes and modification time.
+    """
+    published = []
+    for f in sorted(os.listdir(sandbox)):
+        if keep is not None and f not in keep:
+            continue
+        if f.rsplit(".", 1)[-1] in clean_up:
+            continue
+        source, target = os.path.join(sandbox, f), os.path.join(destination, f)
+        if skip_unchanged and changes.unchanged(source, target):
+            continue
+        os.replace(source, target)
+        published.append(target)
+    return published
+
+
+def _prepare(
+    fname,
+    node_info,
+    color_format,
+    background_color,
+    concept_color,
+    text_color,
+    move_to,
+    nav_logo,
+    concept_text,
+    concept_font_style,
+    concept_font_size,
+    font,
+    engine,
+    convert_tikz,
+    fmat,
+    clean_up,
+    dry_run,
+    svg_converter,
+    optimize_svg,
+    optimize_png,
+    skip_unchanged,
+    deterministic,
+):
+    """Validate a theme and generate its .tex document.
+
+    This is the first stage of a render (see `logo.pipeline`); the
+    arguments are those of `create_logo()`. Returns the render state used
+    by `_write_tex()`, `_compile()`, `_convert()`, `_optimize()`, and
+    `_publish()`.
+    """
+
+    # catch theme problems before spending time on a TeX run
+    theme, errors = validate.validate_theme(
+        {
+            "node_info": node_info,
+            "color_format": color_format,
+            "background_color": background_color,
+            "concept_color": concept_color,
+            "text_color": text_color,
+        }
+    )
+    if errors:
+        raise RuntimeError("Invalid theme:\n    %s" % "\n    ".join(errors))
+    if color_format not in colorspace.XCOLOR_MODELS:
+        # e.g. CIELAB, which xcolor cannot read
+        colorspace.themes_to_xcolor([theme])
+        color_format = theme["color_format"]
+    node_info = theme["node_info"]
+    background_color = theme["background_color"]
+    concept_color = theme["concept_color"]
+    text_color = theme["text_color"]
+
+    non_node_colors = []
+    for nnc in [background_color, concept_color, text_color]:
+        if nnc:
+            non_node_colors.append(nnc)
+
+    defined_colors = list(node_info[:, 0]) + non_node_colors
+    # remove `None`s
+    defined_colors = [dc for dc in defined_colors if dc[0] != None and dc[1] != None]
+
+    # convert .svg output from the .pdf directly if possible, and keep
+    # the .pdf itself if that is the desired format
+    direct_svg = fmat == "svg" and convert.resolve_converter(svg_converter)
+    if direct_svg or fmat == "pdf":
+        convert_tikz = ""
+    if fmat == "pdf" and clean_up:
+        clean_up = [ext for ext in clean_up if ext != "pdf"]
+
+    # create the .tex header and footer
+    tex_header, tex_footer = build_tex_file.set_header_and_footer(
+        font, convert_tikz % fmat if convert_tikz else "", defined_colors, color_format
+    )
+
+    # set level distances and sibling angles
+    leveldistance_siblingangle = build_tex_file.level_distances_and_sibling_angles(
+        CHILD_NODES, GRANDCHILD_NODES
+    )
+
+    # create the tikz preamble
+    tex_content = build_tex_file.initialize_tikz(
+        nav_logo,
+        background_color[0],
+        concept_color[0],
+        text_color[0],
+        *leveldistance_siblingangle
+    )
+
+    # create the root node for the concept mindmap
+    tex_content += build_tex_file.create_concept(
+        concept_color[0], concept_text, concept_font_style, concept_font_size
+    )
+
+    # create each child node (and grandchild node within)
+    for color, text in node_info:
+        tex_content += build_tex_file.create_child(color[0], GRANDCHILD_NODES, text)
+
+    # finalize the tikz object
+    tex_content += build_tex_file.finalize_tikz(nav_logo)
+
+    # combine all .tex file content
+    fcontent = tex_header + tex_content + tex_footer
+    if deterministic:
+        # no PDF dates, and a trailer ID that only changes with the content
+        tex_header, tex_footer = build_tex_file.set_header_and_footer(
+            font,
+            convert_tikz % fmat if convert_tikz else "",
+            defined_colors,
+            color_format,
+            reproducible.pdf_settings(fcontent),
+        )
+        fcontent = tex_header + tex_content + tex_footer
+
+    destination, jobname = _destination(fname, move_to)
+    return {
+        "destination": destination,
+        "jobname": jobname,
+        "tex": fcontent,
+        "fmat": fmat,
+        "font": font,
+        "engine": engine,
+        "shell_escape": convert_tikz != "",
+        "direct_svg": direct_svg,
+        "svg_converter": svg_converter,
+        "clean_up": clean_up or (),
+        "dry_run": dry_run,
+        "optimize_svg": optimize_svg,
+        "optimize_png": optimize_png,
+        "skip_unchanged": skip_unchanged,
+        "deterministic": deterministic,
+    }
+
+
+def _write_tex(render, sandbox):
+    """Write the .tex document of a render into its sandbox."""
+    with open(os.path.join(sandbox, "%s.tex" % render["jobname"]), "w") as f:
+        f.write(render["tex"])
+
+
+def _compile(render, sandbox):
+    """Compile a render with the first engine that succeeds.
+
+    See the following for the reasoning behind `--shell-escape`:
+    https://tex.stackexchange.com/questions/99475/how-to-invoke-latex-with-the-shell-escape-flag-in-texstudio-former-texmakerx/99476#99476
+    """
+    jobname, fmat = render["jobname"], render["fmat"]
+    tried = engines.candidates(render["font"], fmat, render["engine"])
+    for candidate in tried:
+        seconds = engines.compile_tex(
+            candidate,
+            jobname,
+            sandbox,
+            fmat,
+            shell_escape=render["shell_escape"],
+            deterministic=render["deterministic"],
+        )
+        if seconds is not None:
+            render["compiled_with"] = candidate
+            return seconds
+    err_msg = "'%s' could not be compiled with %s."
+    raise RuntimeError(err_msg % (jobname, ", ".join(tried)))
+
+
+def _convert(render, sandbox):
+    """Convert the .pdf of a compiled render to .svg outside of TeX."""
+    compiled_with = render.get("compiled_with")
+    if render["direct_svg"] and engines.ENGINES[compiled_with]["kind"] == "tex":
+        pdf = os.path.join(sandbox, "%s.pdf" % render["jobname"])
+        convert.pdf_to_svg([pdf], converter=render["svg_converter"])
+
+
+def _optimize(render, sandbox):
+    """Apply the requested .svg/.png optimizations to a render."""
+    fmat, product = render["fmat"], os.path.join(sandbox, render["jobname"])
+    for wanted, optimize_file in (
+        ("svg", svg_optimize.optimize_svg_file),
+        ("png", raster.optimize_png_file),
+    ):
+        options = render["optimize_%s" % wanted]
+        if fmat == wanted and options:
+            options = options if isinstance(options, dict) else {}
+            optimize_file("%s.%s" % (product, fmat), **options)
+    if render["deterministic"] and os.path.exists("%s.%s" % (product, fmat)):
+        reproducible.strip_file("%s.%s" % (product, fmat))
 
 
 def create_logo(
@@ -67,10 +315,16 @@ def create_logo(
     concept_font_style="bfseries",
     concept_font_size="large",
     font="M+ 1mn",
-    engine="lualatex",
+    engine="auto",
     convert_tikz=r",convert={outfile=\jobname.%s}",
     fmat="png",
     clean_up=["aux", "log", "pdf"],
+    dry_run=False,
+    svg_converter="auto",
+    optimize_svg=False,
+    optimize_png=False,
+    skip_unchanged=False,
+    deterministic=False,
 ):
     """
     
@@ -92,7 +346,9 @@ def create_logo(
         node text.
     
     color_format : str
-        Color system. 'RGB' appears to be the most robust.
+        Color system. 'RGB' appears to be the most robust. Any model of
+        `logo.colorspace.MODELS` is accepted; 'Lab' (CIELAB) colors are
+        converted to 'RGB' for xcolor.
     
     background_color :  tuple
         Logo background color. Tuple of (color name, color code).
@@ -105,7 +361,8 @@ def create_logo(
         Text color within the root node. Tuple of (color name, color code).
     
     move_to : str
-        Default is None. Move the output to the directory.
+        Default is None. Move the output to the directory, relative to
+        the current working directory.
     
     nav_logo : dict
         Parameters, including `text` and `font_style`, for creating the
@@ -123,8 +380,11 @@ def create_logo(
     font : str (Optional - Default is "M+ 1mn")
         Font type. The font is
     
-    engine : str (Optional - Default is "lualatex")
-        TeX engine to compile to document.
+    engine : str (Optional - Default is "auto")
+        Engine to compile the document, e.g. "lualatex" or "xelatex".
+        "auto" picks the fastest installed engine (by measured compile
+        time) that supports `font` and `fmat`, falling back to the next
+        one if a compile fails. See `logo.engines`.
     
     convert_tikz : str (Optional - Default is r",convert={outfile=\jobname.%s})
         TiKz keywords for automatically converting the resultant .pdf
@@ -132,13 +392,59 @@ def create_logo(
     
     fmat : str (Optional - png)
         Convert the resultant .pdf to this format.
-        This parameter may also be set to .jpg, .svg, etc.
+        This parameter may also be set to .jpg, .svg, etc. With "pdf"
+        the .pdf itself is kept and no conversion takes place.
     
     clean_up : list (Optional - Default is ["aux", "log", "pdf"])
         Remove these types of files after processing. Add .tex to the
         list of the intermediary .text file is not needed following the
         create of the logo.
     
+    dry_run : bool (Optional - Default is False)
+        Only write the .tex file, do not compile it.
+    
+    svg_converter : str (Optional - Default is "auto")
+        How .svg output is created. "auto" converts the .pdf to a vector
+        .svg from Python with the fastest available tool (see
+        `logo.convert`), falling back to `convert_tikz` if none is
+        installed. A name from `logo.convert.CONVERTERS` forces that tool,
+        and None always uses `convert_tikz`.
+    
+    optimize_svg : bool or dict (Optional - Default is False)
+        Optimize .svg output for the web (see `logo.svg_optimize`).
+        A dict is passed on as keyword arguments, e.g. ``{"symbols": True}``.
+    
+    optimize_png : bool or dict (Optional - Default is False)
+        Losslessly minimize .png output (see `logo.raster.optimize_png()`).
+        A dict is passed on as keyword arguments.
+    
+    skip_unchanged : bool (Optional - Default is False)
+        Leave files in the output directory untouched if the new render
+        looks the same (see `logo.changes`), e.g. so a release only
+        uploads the logos that changed.
+    
+    deterministic : bool (Optional - Default is False)
+        Create byte-identical files for identical arguments: fixed PDF
+        dates and trailer ID, and no time stamps or metadata in the
+        .png/.svg (see `logo.reproducible`).
+    
+    Returns
+    -------
+    
+    published : list
+        Paths of the files written to the output directory.
+    
+    Notes
+    -----
+    
+    Each call compiles in its own temporary directory within the output
+    directory and then moves the products into place with `os.replace()`,
+    so concurrent calls (threads or processes) sharing an output directory,
+    even with the same `fname`, do not clobber each other.
+    
+    The TeX run never stops at an error prompt, and it is killed (along
+    with any conversion it started) after a timeout. See `logo.limits`.
+    
     Examples
     --------
     
@@ -153,77 +459,71 @@ def create_logo(
     
     """
 
-    if len(node_info) != CHILD_NODES:
-        err_msg = "There must be 7 elements in the logo, %s were passed in."
-        raise RuntimeError(err_msg % len(node_info))
-
-    non_node_colors = []
-    for nnc in [background_color, concept_color, text_color]:
-        if nnc:
-            non_node_colors.append(nnc)
-
-    defined_colors = list(node_info[:, 0]) + non_node_colors
-    # remove `None`s
-    defined_colors = [dc for dc in defined_colors if dc[0] != None and dc[1] != None]
-
-    # create the .tex header and footer
-    tex_header, tex_footer = build_tex_file.set_header_and_footer(
-        font, convert_tikz % fmat, defined_colors, color_format
-    )
-
-    # set level distances and sibling angles
-    leveldistance_siblingangle = build_tex_file.level_distances_and_sibling_angles(
-        CHILD_NODES, GRANDCHILD_NODES
-    )
-
-    # create the tikz preamble
-    tex_content = build_tex_file.initialize_tikz(
+    render = _prepare(
+        fname,
+        node_info,
+        color_format,
+        background_color,
+        concept_color,
+        text_color,
+        move_to,
         nav_logo,
-        background_color[0],
-        concept_color[0],
-        text_color[0],
-        *leveldistance_siblingangle
+        concept_text,
+        concept_font_style,
+        concept_font_size,
+        font,
+        engine,
+        convert_tikz,
+        fmat,
+        clean_up,
+        dry_run,
+        svg_converter,
+        optimize_svg,
+        optimize_png,
+        skip_unchanged,
+        deterministic,
     )
+    with _sandbox(render["destination"]) as sandbox:
+        _write_tex(render, sandbox)
+        if not dry_run:
+            _compile(render, sandbox)
+            _convert(render, sandbox)
+            _optimize(render, sandbox)
 
-    # create the root node for the concept mindmap
-    tex_content += build_tex_file.create_concept(
-        concept_color[0], concept_text, concept_font_style, concept_font_size
-    )
+        # move the products (minus the intermediaries) to the output directory
+        return _publish(
+            sandbox, render["destination"], render["clean_up"], skip_unchanged=skip_unchanged
+        )
 
-    # create each child node (and grandchild node within)
-    for color, text in node_info:
-        tex_content += build_tex_file.create_child(color[0], GRANDCHILD_NODES, text)
-
-    # finalize the tikz object
-    tex_content += build_tex_file.finalize_tikz(nav_logo)
-
-    # combine all .tex file content
-    fcontent = tex_header + tex_content + tex_footer
 
-    # write the .tex file
-    with open("%s.tex" % fname, "w") as f:
-        f.write(fcontent)
+def _convert_favicon(jobname, sandbox, resolutions, theme=None, simplified_size=0):
+    """Create a multi-resolution ``<jobname>.ico``.
 
-    # create the logo with a terminal call
-    # see the following for reasoning:
-    # https://tex.stackexchange.com/questions/99475/how-to-invoke-latex-with-the-shell-escape-flag-in-texstudio-former-texmakerx/99476#99476
-    if convert_tikz != "":
-        shell_escape = "--shell-escape"
-    else:
-        shell_escape = convert_tikz
-    subprocess.Popen([engine, shell_escape, "%s.tex" % fname]).wait()
-
-    # This works on OSX, may not work on other operating systems
-    if clean_up:
-        find = ["find", "-E", ".", "-type", "f", "-maxdepth", "1", "-regex"]
-        find.extend([r".*\.(%s)" % "|".join(clean_up), "-delete"])
-        subprocess.Popen(find).wait()
-
-    # move the products to a new directory
-    if move_to:
-        currdir = os.getcwd()
-        fs = [f for f in os.listdir(currdir) if f.startswith("%s" % fname)]
-        [os.rename(f, "%s/%s%s" % (currdir, move_to, f)) for f in fs]
+    Resolutions up to ``simplified_size`` are drawn from the ``theme`` (see
+    `logo.icons`), the others are scaled from ``<jobname>.png``. Without a
+    ``simplified_size``, ImageMagick converts the .png instead.
+    """
+    if simplified_size:
+        icons.write_favicon(
+            os.path.join(sandbox, "%s.ico" % jobname),
+            resolutions,
+            theme,
+            os.path.join(sandbox, "%s.png" % jobname),
+            simplified_size,
+        )
+        return
+    limits.run(
+        [
+            "convert",
+            "%s.png" % jobname,
+            "-define",
+            "icon:auto-resize=%s" % resolutions,
+            "%s.ico" % jobname,
+        ],
+        "convert",
+        cwd=sandbox,
+        capture=False,
+    )
 
 
 def create_favicon(
@@ -237,6 +537,11 @@ def create_favicon(
     concept_text=None,
     resolutions="64,48,32,16",
     clean_up=True,
+    dry_run=False,
+    optimize_png=False,
+    skip_unchanged=False,
+    deterministic=False,
+    simplified_size=icons.SIMPLIFIED_SIZE,
 ):
     """
     
@@ -263,6 +568,26 @@ def create_favicon(
     clean_up : bool (Default is True)
         Remove all files needed to create the .ico files.
     
+    dry_run : bool (Default is False)
+        Only write the .tex file of the underlying logo.
+    
+    optimize_png : bool or dict (Default is False)
+        Optimize the underlying .png logo if it is kept (``clean_up=False``).
+        See `create_logo()`.
+    
+    skip_unchanged : bool (Default is False)
+        See `create_logo()`.
+    
+    deterministic : bool (Default is False)
+        See `create_logo()`. The PNG entries of the .ico are stripped too.
+    
+    simplified_size : int (Default is 32)
+        Draw resolutions up to this size directly from simplified geometry
+        (no grandchildren, no gradients, pixel-snapped circles), see
+        `logo.icons`. Larger resolutions are scaled from the full logo,
+        which is only compiled if there are any. ``0`` converts the full
+        logo with ImageMagick at every resolution.
+    
     Examples
     --------
     
@@ -280,40 +605,145 @@ def create_favicon(
     favicon = "favicon"
     fname = "%s_%s" % (fname, favicon)
 
-    # create a logo with no root text
-    create_logo(
-        fname,
-        node_info=node_info,
-        color_format=color_format,
-        background_color=background_color,
-        concept_color=concept_color,
-        concept_text=concept_text,
-        text_color=text_color,
-        move_to=move_to,
-    )
+    theme = {
+        "node_info": node_info,
+        "color_format": color_format,
+        "background_color": background_color,
+        "concept_color": concept_color,
+        "text_color": text_color,
+    }
+
+    destination, jobname = _destination(fname, move_to)
+    with _sandbox(destination) as sandbox:
+
+        # create a logo with no root text, unless every resolution is drawn
+        if dry_run or icons.needs_render(resolutions, simplified_size):
+            create_logo(
+                jobname,
+                concept_text=concept_text,
+                move_to=sandbox,
+                dry_run=dry_run,
+                optimize_png=optimize_png if not clean_up else False,
+                deterministic=deterministic,
+                **theme
+            )
+
+        # create favicons
+        if not dry_run:
+            _convert_favicon(jobname, sandbox, resolutions, theme, simplified_size)
+            if deterministic:
+                reproducible.strip_file(os.path.join(sandbox, "%s.ico" % jobname))
+
+        # publish the favicons, and the files needed to create them if wanted
+        keep = ["%s.ico" % jobname] if clean_up and not dry_run else None
+        return _publish(sandbox, destination, keep=keep, skip_unchanged=skip_unchanged)
+
+
+def create_logo_variants(
+    fname,
+    backgrounds=("transparent", "light", "dark"),
+    fmat="png",
+    move_to=None,
+    **kwargs
+):
+    """
+    
+    Create background variants of a logo from a single render. The logo
+    is compiled once with a transparent background, then each solid
+    background is composited in-process (.png) or injected as a
+    background rectangle (.svg), which avoids a TeX run per variant.
+    
+    Parameters
+    ----------
+    
+    fname : str
+        Base logo file name. Each variant is saved as `<fname>_<label>`,
+        e.g. "canon2020_theme_light.png".
+    
+    backgrounds : iterable (Optional - Default is ("transparent", "light", "dark"))
+        Background variants to create. Either keys of `logo.BACKGROUNDS`
+        or (color name, color code) tuples, which are labeled by name.
+    
+    fmat : str (Optional - Default is "png")
+        Output format. Only "png" and "svg" are supported.
+    
+    move_to : see `create_logo()`
+    
+    **kwargs : see `create_logo()`
+        Theme keyword arguments. Any `background_color` is ignored.
+    
+    Returns
+    -------
+    
+    variants : dict
+        Variant label to file path.
+    
+    Examples
+    --------
+    
+    Create the transparent, light, and dark canon2020 logos with a single
+    LuaTeX run.
+    
+    >>> import logo
+    >>> theme = logo.canon2020_theme_transparent
+    >>> logo.create_logo_variants("canon2020_theme", **theme)
+    
+    """
 
-    # create favicons
-    subprocess.Popen(
-        [
-            "convert",
-            "%s.png" % fname,
-            "-define",
-            "icon:auto-resize=%s" % resolutions,
-            "%s.ico" % fname,
-        ]
-    ).wait()
-
-    # remove all files needed to create the favicons
-    # except the favicons themselves
-    if clean_up:
-        find = ["find", ".", "-type", "f", "-maxdepth", "1"]
-        find.extend(["-name", "%s.*" % fname])
-        find.extend(["!", "-name", "%s.ico" % fname])
-        find.extend(["-delete"])
-        subprocess.Popen(find).wait()
-
-    # move the products to a new directory
-    if move_to:
-        currdir = os.getcwd()
-        fs = [f for f in os.listdir(currdir) if f.startswith("%s" % fname)]
-        [os.rename(f, "%s/%s%s" % (currdir, move_to, f)) for f in fs]
+    if fmat not in ("png", "svg"):
+        raise RuntimeError("Background variants are not supported for '%s'." % fmat)
+
+    # resolve the background labels and colors
+    variants = []
+    for background in backgrounds:
+        if isinstance(background, str):
+            if background not in BACKGROUNDS:
+                raise RuntimeError("'%s' background not found." % background)
+            variants.append((background, BACKGROUNDS[background]))
+        else:
+            variants.append((background[0], tuple(background)))
+
+    destination, jobname = _destination(fname, move_to)
+    with _sandbox(destination) as sandbox:
+
+        # render the transparent logo once, keeping the .pdf for the page
+        # size of the .png variants (it is not published)
+        kwargs["background_color"] = TRANSPARENT
+        if fmat == "png":
+            clean_up = kwargs.get("clean_up", ["aux", "log", "pdf"]) or ()
+            kwargs["clean_up"] = [ext for ext in clean_up if ext != "pdf"]
+        source_name = "%s_transparent" % jobname
+        create_logo(source_name, fmat=fmat, move_to=sandbox, **kwargs)
+        source = os.path.join(sandbox, "%s.%s" % (source_name, fmat))
+        pdf = os.path.join(sandbox, "%s.pdf" % source_name)
+        page_size = _backgrounds.pdf_page_size(pdf) if os.path.exists(pdf) else None
+
+        # derive each solid background variant from the transparent render
+        color_format = kwargs.get("color_format") or "RGB"
+        products = {}
+        for label, color in variants:
+            product = "%s_%s.%s" % (jobname, label, fmat)
+            if color == TRANSPARENT:
+                products[label] = product
+                continue
+            if fmat == "png":
+                _backgrounds.composite_png(
+                    source, color, os.path.join(sandbox, product), color_format, page_size=page_size
+                )
+                if kwargs.get("optimize_png"):
+                    options = kwargs["optimize_png"]
+                    options = options if isinstance(options, dict) else {}
+                    raster.optimize_png_file(os.path.join(sandbox, product), **options)
+            else:
+                _backgrounds.inject_svg_background(
+                    source, color, os.path.join(sandbox, product), color_format
+                )
+            products[label] = product
+
+        # publish the variants (the transparent render only if requested)
+        keep = set(products.values()) | {"%s.tex" % source_name}
+        _publish(
+            sandbox, destination, keep=keep, skip_unchanged=kwargs.get("skip_unchanged", False)
+        )
+
+    return {k: os.path.join(destination, v) for k, v in products.items()}
@@ -0,0 +1,288 @@
+"""Registry of rendering engines with probing and measured selection.
+
+The built-in engines are the TeX engines able to load system fonts through
+`fontspec` (``lualatex`` and ``xelatex``). Python backends, which turn the
+generated .tex file into the output without a TeX installation, can be
+added with `register_engine()`.
+
+Probing results (executable path and version), font support, and the
+average compile time per engine are cached on disk in the cache directory
+(see `logo.cache.default_cache_dir()`), so later processes pick the fastest
+engine that supports the requested font and format without re-probing.
+The choice can be overridden with an explicit engine name or the
+``$LOGO_ENGINE`` environment variable. TeX engines keep their font caches
+in the shared directory configured with `logo.fonts`, if any.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from . import convert
+from . import fonts
+from . import limits
+from . import reproducible
+from .cache import default_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# serializes the load-modify-save of the engine state between threads
+_STATE_LOCK = threading.RLock()
+
+# formats the `standalone` class can produce through ImageMagick
+IMAGEMAGICK_FORMATS = {"png", "jpg", "jpeg", "gif", "svg", "eps", "tif", "tiff", "bmp"}
+
+ENGINES = {
+    "lualatex": {"kind": "tex", "fonts": "luaotfload"},
+    "xelatex": {"kind": "tex", "fonts": "fontconfig"},
+}
+
+
+def register_engine(name, render, formats, fonts=None):
+    """Register a Python rendering backend.
+
+    Parameters
+    ----------
+
+    name : str
+        Engine name, usable as `create_logo(engine=name)`.
+
+    render : callable
+        ``render(jobname, directory, fmat)`` reads ``<jobname>.tex`` from
+        ``directory`` and writes ``<jobname>.<fmat>`` next to it.
+
+    formats : iterable
+        Output formats the backend can produce.
+
+    fonts : iterable (Optional - Default is None)
+        Fonts the backend can render. ``None`` means any font.
+
+    """
+    ENGINES[name] = {
+        "kind": "python",
+        "render": render,
+        "formats": set(formats),
+        "fonts": None if fonts is None else set(fonts),
+    }
+
+
+def _state_path():
+    return os.path.join(default_cache_dir(), "engines.json")
+
+
+def _load_state():
+    try:
+        with open(_state_path()) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    for section in ("probes", "fonts", "timings"):
+        state.setdefault(section, {})
+    return state
+
+
+def _save_state(state):
+    """Write the engine state atomically; failures are only logged.
+
+    The state is bookkeeping, so a full disk or a read-only cache
+    directory must never fail a render.
+    """
+    path = _state_path()
+    tmp = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # a file per writer, so concurrent writers never share one
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Could not save the engine state to %s: %s", path, e)
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _executable_id(path):
+    """Identify an executable by path and modification time."""
+    return "%s@%d" % (path, os.stat(path).st_mtime)
+
+
+def probe(name, state=None):
+    """Whether a TeX engine is installed, caching its version on disk.
+
+    Returns
+    -------
+
+    info : dict or None
+        ``path`` and ``version`` of the engine, or None if not installed.
+
+    """
+    spec = ENGINES[name]
+    if spec["kind"] == "python":
+        return {"path": None, "version": "python"}
+    path = shutil.which(name)
+    if path is None:
+        return None
+    with _STATE_LOCK:
+        save = state is None
+        state = _load_state() if state is None else state
+        cached = state["probes"].get(name)
+        if cached and cached["id"] == _executable_id(path):
+            return cached
+        process = limits.run([path, "--version"], "probe")
+        version = process.stdout.decode(errors="replace").splitlines()
+        info = {"id": _executable_id(path), "path": path, "version": (version or [""])[0]}
+        state["probes"][name] = info
+        if save:
+            _save_state(state)
+    return info
+
+
+def supports_font(name, font, state=None):
+    """Whether an engine can find `font`, caching found fonts on disk.
+
+    Missing fonts are looked up again by later processes, as the font may
+    have been installed since.
+    """
+    spec = ENGINES[name]
+    if spec["kind"] == "python":
+        return spec["fonts"] is None or font in spec["fonts"]
+    with _STATE_LOCK:
+        save = state is None
+        state = _load_state() if state is None else state
+        known = state["fonts"].setdefault(spec["fonts"], {})
+        if known.get(font):
+            return True
+        found = fonts.find_font(font, spec["fonts"]) is not None
+        if found:
+            known[font] = True
+            if save:
+                _save_state(state)
+    return found
+
+
+def supports_format(name, fmat):
+    """Whether an engine can produce `fmat` with the installed tools."""
+    spec = ENGINES[name]
+    if spec["kind"] == "python":
+        return fmat in spec["formats"]
+    if fmat == "pdf":
+        return True
+    if fmat == "svg" and convert.available_converters():
+        return True
+    return fmat in IMAGEMAGICK_FORMATS and shutil.which("convert") is not None
+
+
+def record_timing(name, seconds):
+    """Add a compile time to the running average of an engine.
+
+    Errors are only logged, so the bookkeeping never fails a compile.
+    """
+    with _STATE_LOCK:
+        try:
+            state = _load_state()
+            timing = state["timings"].setdefault(name, {"count": 0, "mean": 0.0})
+            timing["count"] += 1
+            timing["mean"] += (seconds - timing["mean"]) / timing["count"]
+        except (AttributeError, KeyError, TypeError) as e:
+            # e.g. a state file written by hand
+            logger.warning("Could not record the %s timing: %s", name, e)
+            return
+        _save_state(state)
+
+
+def candidates(font, fmat, engine="auto"):
+    """Engines to try for a render, in order of preference.
+
+    Parameters
+    ----------
+
+    font : see `create_logo()`
+
+    fmat : see `create_logo()`
+
+    engine : str (Optional - Default is "auto")
+        An engine name selects only that engine. ``"auto"`` (or None) uses
+        ``$LOGO_ENGINE`` if set, or else every installed engine supporting
+        ``font`` and ``fmat``: those without timings first (so they get
+        measured), then by average compile time.
+
+    Returns
+    -------
+
+    engines : list
+        Engine names.
+
+    """
+    if engine in (None, "auto"):
+        engine = os.environ.get("LOGO_ENGINE") or "auto"
+    if engine != "auto":
+        if engine not in ENGINES:
+            raise RuntimeError("'%s' engine not registered." % engine)
+        return [engine]
+
+    with _STATE_LOCK:
+        state = _load_state()
+        usable = []
+        for name in ENGINES:
+            if probe(name, state) is None:
+                continue
+            if not supports_format(name, fmat) or not supports_font(name, font, state):
+                continue
+            usable.append(name)
+        _save_state(state)
+    if not usable:
+        err_msg = "No installed engine (%s) supports font '%s' and format '%s'."
+        raise RuntimeError(err_msg % (", ".join(ENGINES), font, fmat))
+
+    def _speed(name):
+        timing = state["timings"].get(name)
+        return (0, 0.0) if timing is None else (1, timing["mean"])
+
+    return sorted(usable, key=_speed)
+
+
+def compile_tex(name, jobname, directory, fmat, shell_escape=False, deterministic=False):
+    """Compile ``<jobname>.tex`` in ``directory`` with an engine.
+
+    With `deterministic` TeX runs with a fixed date (see
+    `logo.reproducible.tex_env()`).
+
+    Returns
+    -------
+
+    seconds : float or None
+        Compile time, or None if the engine did not produce any output.
+
+    """
+    spec = ENGINES[name]
+    start = time.perf_counter()
+    if spec["kind"] == "python":
+        product = "%s.%s" % (jobname, fmat)
+        try:
+            spec["render"](jobname, directory, fmat)
+        except Exception:
+            return None
+    else:
+        product = "%s.%s" % (jobname, fmat if shell_escape else "pdf")
+        # never stop at an error prompt; a failed engine falls through to
+        # the next candidate
+        command = [name, "-interaction=nonstopmode", "-halt-on-error", "%s.tex" % jobname]
+        if shell_escape:
+            command.insert(1, "--shell-escape")
+        env = fonts.font_env()
+        if deterministic:
+            env = reproducible.tex_env(env)
+        try:
+            limits.run(command, "compile", cwd=directory, env=env, capture=False)
+        except (OSError, RuntimeError):
+            return None
+    if not os.path.exists(os.path.join(directory, product)):
+        return None
+    seconds = time.perf_counter() - start
+    record_timing(name, seconds)
+    return seconds
@@ -0,0 +1,193 @@
+"""Shared font cache and memoized font resolution for the TeX engines.
+
+The first LuaLaTeX run with ``fontspec`` and a system font such as
+``M+ 1mn`` builds the luaotfload font names database and a cached copy of
+the font, which takes far longer than the render itself. In a fresh
+container every batch worker would pay that price again.
+
+Pointing ``$LOGO_FONT_CACHE`` (or ``python -m logo --font-cache``) at a
+persistent directory, e.g. a volume shared by containers, makes every TeX
+subprocess keep these caches there (``TEXMFVAR``/``TEXMFCACHE`` for
+luaotfload, ``XDG_CACHE_HOME`` for fontconfig). `warm_font_cache()`
+fills the directory up front and reports cold and warm startup times::
+
+    $ LOGO_FONT_CACHE=/cache/fonts python -m logo.fonts "M+ 1mn"
+"""
+
+import argparse
+import functools
+import os
+import shutil
+import tempfile
+import time
+
+from . import limits
+
+DEFAULT_FONT = "M+ 1mn"
+
+# TeX engines whose font lookups are cached
+TEX_ENGINES = ("lualatex", "xelatex")
+
+_WARM_UP_TEX = r"""\documentclass{article}
+\usepackage{fontspec}
+\setmainfont{%s}
+\begin{document}
+PySAL
+\end{document}
+"""
+
+
+def font_cache_dir():
+    """The shared font cache directory from ``$LOGO_FONT_CACHE``, or None."""
+    directory = os.environ.get("LOGO_FONT_CACHE")
+    return os.path.abspath(directory) if directory else None
+
+
+def font_env():
+    """Environment for TeX subprocesses using the shared font cache.
+
+    Returns None (inherit the environment) if no shared cache is set.
+    """
+    directory = font_cache_dir()
+    if directory is None:
+        return None
+    texmf_var = os.path.join(directory, "texmf-var")
+    xdg_cache = os.path.join(directory, "xdg")
+    for d in (texmf_var, xdg_cache):
+        os.makedirs(d, exist_ok=True)
+    env = dict(os.environ)
+    env["TEXMFVAR"] = env["TEXMFCACHE"] = texmf_var
+    env["XDG_CACHE_HOME"] = xdg_cache
+    return env
+
+
+@functools.lru_cache(maxsize=None)
+def _find_font(font, backend, cache_dir):
+    if backend == "luaotfload":
+        command = ["luaotfload-tool", "--find=%s" % font]
+    else:
+        command = ["fc-list", ":family=%s" % font, "file"]
+    try:
+        # a first lookup may build the font names database
+        process = limits.run(command, "compile", env=font_env())
+    except (OSError, RuntimeError):
+        return None
+    output = process.stdout.decode(errors="replace")
+    if process.returncode or not output.strip():
+        return None
+    for line in output.splitlines():
+        if backend == "luaotfload" and "Resolved file name" in line:
+            return line.rsplit('"', 2)[-2] if line.count('"') >= 2 else font
+        if backend != "luaotfload" and line.strip():
+            return line.strip().rstrip(":")
+    return font
+
+
+def find_font(font, backend="luaotfload"):
+    """Resolve a font name to its file, memoized for the process.
+
+    Parameters
+    ----------
+
+    font : str
+        Font name, e.g. "M+ 1mn".
+
+    backend : str (Optional - Default is "luaotfload")
+        "luaotfload" (LuaLaTeX) or "fontconfig" (XeLaTeX).
+
+    Returns
+    -------
+
+    path : str or None
+        The font file (or the font name if the backend does not report a
+        file), or None if the font was not found.
+
+    """
+    return _find_font(font, backend, font_cache_dir())
+
+
+def _time_compile(engine, font):
+    """Seconds to compile a minimal `fontspec` document, and success."""
+    scratch = tempfile.mkdtemp(prefix="logo-fonts-")
+    try:
+        with open(os.path.join(scratch, "fonts.tex"), "w") as f:
+            f.write(_WARM_UP_TEX % font)
+        command = [engine, "-interaction=nonstopmode", "-halt-on-error", "fonts.tex"]
+        start = time.perf_counter()
+        try:
+            process = limits.run(command, "compile", cwd=scratch, env=font_env())
+        except (OSError, RuntimeError):
+            return time.perf_counter() - start, False
+        return time.perf_counter() - start, process.returncode == 0
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def warm_font_cache(fonts=(DEFAULT_FONT,), engines=None):
+    """Fill the font caches and time cold and warm TeX startups.
+
+    Parameters
+    ----------
+
+    fonts : iterable (Optional - Default is ("M+ 1mn",))
+        Fonts to cache.
+
+    engines : iterable (Optional - Default is None)
+        TeX engines to warm up. Defaults to the installed `TEX_ENGINES`.
+
+    Returns
+    -------
+
+    report : list
+        A dict per engine and font with the ``cold`` (first) and ``warm``
+        (second) compile time in seconds, and whether the font compiled
+        (``ok``).
+
+    """
+    if engines is None:
+        engines = [e for e in TEX_ENGINES if shutil.which(e)]
+    report = []
+    for engine in engines:
+        for font in fonts:
+            cold, ok = _time_compile(engine, font)
+            warm, ok_warm = _time_compile(engine, font) if ok else (None, False)
+            report.append(
+                {
+                    "engine": engine,
+                    "font": font,
+                    "cold": cold,
+                    "warm": warm,
+                    "ok": ok and ok_warm,
+                }
+            )
+    return report
+
+
+def format_report(report):
+    """Format `warm_font_cache()` timings as a plain text table."""
+    lines = ["%-10s %-20s %9s %9s  %s" % ("engine", "font", "cold", "warm", "status")]
+    for r in report:
+        warm = "%9.2f" % r["warm"] if r["warm"] is not None else "%9s" % "-"
+        status = "ok" if r["ok"] else "failed"
+        lines.append("%-10s %-20s %9.2f %s  %s" % (r["engine"], r["font"], r["cold"], warm, status))
+    lines.append("font cache: %s" % (font_cache_dir() or "TeX default"))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m logo.fonts", description="Warm up the TeX font caches."
+    )
+    parser.add_argument("fonts", nargs="*", default=[DEFAULT_FONT])
+    parser.add_argument("--cache-dir", default=None, help="shared font cache directory")
+    parser.add_argument("--engine", action="append", help="engine to warm up (repeatable)")
+    args = parser.parse_args(argv)
+    if args.cache_dir:
+        os.environ["LOGO_FONT_CACHE"] = args.cache_dir
+    report = warm_font_cache(args.fonts, args.engine)
+    print(format_report(report))
+    return int(not all(r["ok"] for r in report))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
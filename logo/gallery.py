@@ -0,0 +1,212 @@
+"""Contact sheets and HTML galleries for reviewing themes.
+
+`create_gallery()` replaces the ``theme_logos``/``plotter`` helpers of
+`PySAL_logo_creation.ipynb`: themes are compiled with the batch renderer,
+every worker rasterizes its own .pdf straight to a thumbnail in memory,
+and the thumbnails are laid out in a single grid image (and optionally a
+self-contained HTML page), so no full-size raster is written or read
+back (see `logo.batch.render_sheet()`)::
+
+    >>> import logo
+    >>> themes = ["canon2020_theme_light", "canon2020_theme_dark"]
+    >>> logo.create_gallery("canon2020_gallery", themes, html=True)
+"""
+
+import base64
+import html as _html
+
+import numpy
+
+from . import batch
+from . import raster
+from .colors import color_to_rgb
+from . import predefined
+
+
+def contact_sheet(images, columns=4, padding=8, background=None):
+    """Lay out images in a grid of equally sized cells.
+
+    Parameters
+    ----------
+
+    images : list
+        ``(height, width, 4)`` RGBA arrays of ``uint8``.
+
+    columns : int (Optional - Default is 4)
+        Number of cells per row.
+
+    padding : int (Optional - Default is 8)
+        Gap around and between cells in pixels.
+
+    background : tuple (Optional - Default is None)
+        ``(r, g, b)`` background. None keeps the sheet transparent.
+
+    Returns
+    -------
+
+    sheet : numpy.ndarray
+        RGBA (or RGB with a ``background``) array of ``uint8``.
+
+    cells : list
+        ``(x, y, width, height)`` of each image on the sheet.
+
+    """
+    columns = max(1, min(columns, len(images)))
+    rows = -(-len(images) // columns)
+    cell_w = max(image.shape[1] for image in images)
+    cell_h = max(image.shape[0] for image in images)
+    width = columns * (cell_w + padding) + padding
+    height = rows * (cell_h + padding) + padding
+    sheet = numpy.zeros((height, width, 4), dtype=numpy.uint8)
+    cells = []
+    for i, image in enumerate(images):
+        h, w = image.shape[:2]
+        row, col = divmod(i, columns)
+        # center each image in its cell
+        x = padding + col * (cell_w + padding) + (cell_w - w) // 2
+        y = padding + row * (cell_h + padding) + (cell_h - h) // 2
+        sheet[y : y + h, x : x + w] = image
+        cells.append((x, y, w, h))
+    if background is not None:
+        sheet = raster.composite(sheet, background)
+    return sheet, cells
+
+
+def _html_page(title, entries):
+    """Self-contained HTML gallery of ``(name, png bytes, width, height)``."""
+    figures = []
+    for name, png, w, h in entries:
+        uri = base64.b64encode(png).decode("ascii")
+        name = _html.escape(name)
+        figures.append(
+            '<figure><img src="data:image/png;base64,%s" width="%d" height="%d" alt="%s">'
+            "<figcaption>%s</figcaption></figure>" % (uri, w, h, name, name)
+        )
+    style = (
+        "body { font-family: sans-serif; } "
+        "main { display: flex; flex-wrap: wrap; gap: 16px; } "
+        "figure { margin: 0; text-align: center; } "
+        "img { background: repeating-conic-gradient(#ddd 0 25%, #fff 0 50%) 0 0 / 16px 16px; }"
+    )
+    return (
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>%s</title>\n'
+        "<style>%s</style>\n</head>\n<body>\n<h1>%s</h1>\n<main>\n%s\n</main>\n</body>\n</html>\n"
+        % (_html.escape(title), style, _html.escape(title), "\n".join(figures))
+    )
+
+
+def create_gallery(
+    fname="gallery",
+    themes=None,
+    thumbnail_width=256,
+    columns=4,
+    padding=8,
+    background=None,
+    html=False,
+    move_to=None,
+    workers=1,
+    threads=False,
+    optimize_png=False,
+    **kwargs
+):
+    """
+
+    Render themes into a contact sheet for review.
+
+    Parameters
+    ----------
+
+    fname : str (Optional - Default is "gallery")
+        Base file name of the `<fname>.png` contact sheet, the
+        `<fname>.json` map of its cells, and the `<fname>.html` gallery.
+
+    themes : list or dict (Optional - Default is None)
+        Names of themes in `logo.THEMES`, or a dict of name to theme
+        (`create_logo()` keyword arguments). Defaults to every theme in
+        `logo.THEMES`.
+
+    thumbnail_width : int (Optional - Default is 256)
+        Width of each thumbnail in pixels.
+
+    columns : int (Optional - Default is 4)
+        Number of thumbnails per row.
+
+    padding : int (Optional - Default is 8)
+        Gap around and between thumbnails in pixels.
+
+    background : tuple (Optional - Default is None)
+        Sheet background as a (color name, "r, g, b") tuple. None keeps
+        the sheet transparent.
+
+    html : bool (Optional - Default is False)
+        Also write an HTML page with the captioned thumbnails embedded.
+
+    move_to : see `create_logo()`
+
+    workers : see `logo.batch.run_jobs()`
+
+    threads : see `logo.batch.run_jobs()`
+
+    optimize_png : bool or dict (Optional - Default is False)
+        Optimize the contact sheet (see `logo.raster.optimize_png()`).
+
+    **kwargs : see `create_logo()`
+        Passed on for every theme, e.g. ``nav_logo=logo.psnav_2line`` and
+        ``concept_text=""`` for a gallery of navigation logos.
+
+    Returns
+    -------
+
+    gallery : dict
+        The JSON map: contact sheet `image`, `width`, and `height`, and
+        `cells` mapping each theme name to its `x`, `y`, `width`, and
+        `height`.
+
+    Examples
+    --------
+
+    >>> import logo
+    >>> themes = ["traditional_theme_light", "traditional_theme_dark"]
+    >>> logo.create_gallery("traditional", themes, columns=2)
+
+    """
+
+    if themes is None:
+        themes = list(predefined.THEMES)
+    if not isinstance(themes, dict):
+        themes = {name: batch.resolve_theme(name) for name in themes}
+    if not themes:
+        raise RuntimeError("A gallery needs at least one theme.")
+
+    rgb = color_to_rgb(background) if background else None
+
+    def _compose(thumbnails, image_name):
+        sheet, cells = contact_sheet(thumbnails, columns, padding, rgb)
+        gallery = {
+            "image": image_name,
+            "width": sheet.shape[1],
+            "height": sheet.shape[0],
+            "cells": {},
+        }
+        for name, (x, y, w, h) in zip(themes, cells):
+            gallery["cells"][name] = {"x": x, "y": y, "width": w, "height": h}
+        others = {}
+        if html:
+            entries = [
+                (name, raster.write_png(t), t.shape[1], t.shape[0])
+                for name, t in zip(themes, thumbnails)
+            ]
+            others["html"] = _html_page(image_name[: -len(".png")], entries)
+        return sheet, gallery, others
+
+    return batch.render_sheet(
+        fname,
+        themes,
+        _compose,
+        thumbnail_width,
+        move_to=move_to,
+        workers=workers,
+        threads=threads,
+        optimize_png=optimize_png,
+        **kwargs
+    )
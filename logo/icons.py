@@ -0,0 +1,215 @@
+"""Favicons drawn at their target size, and .ico assembly.
+
+At 16x16 and 32x32 pixels the 21 grandchild nodes of the mindmap are
+sub-pixel noise, and a full-size render scaled down smears the concept and
+children together. Resolutions up to `SIMPLIFIED_SIZE` are instead drawn
+directly at their size (`draw_favicon()`) from simplified geometry:
+
+    - only the concept and the seven children, enlarged to fill the icon,
+    - solid connection bars (no color gradients) at least a pixel wide,
+    - circles with whole-pixel diameters centered on the pixel grid, so
+      their edges fall on pixel boundaries.
+
+Larger resolutions are scaled down from the full render, and the .ico file
+is assembled in process from PNG compressed entries (`ico_bytes()`), so
+favicons up to `SIMPLIFIED_SIZE` need neither TeX nor ImageMagick.
+"""
+
+import struct
+
+import numpy
+
+from . import raster
+from . import validate
+from .build_tex_file import level_distances_and_sibling_angles
+from .colors import color_to_rgb
+from .predefined import CHILD_NODES, GRANDCHILD_NODES
+
+# largest resolution drawn from the simplified geometry
+SIMPLIFIED_SIZE = 32
+
+# node diameters and connection bar width of the TikZ mindmap (cm)
+CONCEPT_SIZE = 4.0
+CHILD_SIZE = 2.5
+BAR_WIDTH = 0.2
+
+# smallest child diameter in pixels, smaller disks look like plus signs
+MIN_CHILD_PIXELS = 4
+
+
+def parse_resolutions(resolutions):
+    """Sizes of a `create_favicon()` resolutions string such as "64,48,32,16"."""
+    if isinstance(resolutions, str):
+        resolutions = resolutions.split(",")
+    return [int(r) for r in resolutions]
+
+
+def needs_render(resolutions, simplified_size=SIMPLIFIED_SIZE):
+    """Whether any resolution is scaled from the full logo render."""
+    sizes = parse_resolutions(resolutions)
+    return not simplified_size or max(sizes) > simplified_size
+
+
+def _snap(center, diameter):
+    """Center a whole-pixel diameter on the pixel grid."""
+    if diameter % 2:
+        return numpy.floor(center) + 0.5
+    return numpy.round(center)
+
+
+def _geometry(size):
+    """Pixel centers and diameters of the concept and children, bar width."""
+    distance, angle, _, _ = level_distances_and_sibling_angles(CHILD_NODES, GRANDCHILD_NODES)
+    distance, angle = float(distance[:-2]), float(angle)
+    # the children touch the edges of the icon
+    scale = size / (2.0 * distance + CHILD_SIZE)
+    # the concept diameter has the parity of the icon, so it is centered
+    concept = max(2, int(round(CONCEPT_SIZE * scale)))
+    if concept % 2 != size % 2:
+        concept += 1
+    child = max(MIN_CHILD_PIXELS, int(round(CHILD_SIZE * scale)))
+    # `grow cyclic` spreads the children counterclockwise around the east
+    angles = numpy.radians(angle * (numpy.arange(CHILD_NODES) - (CHILD_NODES - 1) / 2.0))
+    offsets = numpy.stack([numpy.cos(angles), -numpy.sin(angles)], axis=1)
+    centers = size / 2.0 + distance * scale * offsets
+    centers = numpy.clip(_snap(centers, child), child / 2.0, size - child / 2.0)
+    bar = max(1.0, BAR_WIDTH * scale)
+    return (size / 2.0, size / 2.0), concept, centers, child, bar
+
+
+def _disk(x, y, center, diameter):
+    """Coverage of a disk, anti-aliased over one pixel."""
+    distance = numpy.hypot(x - center[0], y - center[1])
+    return numpy.clip(diameter / 2.0 - distance + 0.5, 0.0, 1.0)
+
+
+def _bar(x, y, start, end, width):
+    """Coverage of a straight bar between two points."""
+    direction = numpy.subtract(end, start, dtype=float)
+    t = (x - start[0]) * direction[0] + (y - start[1]) * direction[1]
+    t = numpy.clip(t / direction.dot(direction), 0.0, 1.0)
+    distance = numpy.hypot(x - start[0] - t * direction[0], y - start[1] - t * direction[1])
+    return numpy.clip(width / 2.0 - distance + 0.5, 0.0, 1.0)
+
+
+def draw_favicon(size, theme):
+    """Draw the simplified mindmap of a theme at a size.
+
+    Parameters
+    ----------
+
+    size : int
+        Width and height in pixels.
+
+    theme : dict
+        `create_logo()` keyword arguments. The node and concept text is
+        left out, it would not be legible.
+
+    Returns
+    -------
+
+    image : numpy.ndarray
+        ``(size, size, 4)`` RGBA array of ``uint8``.
+
+    """
+    theme, errors = validate.validate_theme(theme)
+    if errors:
+        raise RuntimeError("Invalid theme:\n    %s" % "\n    ".join(errors))
+    color_format = theme["color_format"]
+    y, x = numpy.mgrid[0:size, 0:size] + 0.5
+    concept_center, concept, centers, child, bar = _geometry(size)
+    node_colors = [color_to_rgb(color, color_format) for color in theme["node_info"][:, 0]]
+
+    layers = []
+    for center, rgb in zip(centers, node_colors):
+        layers.append((_bar(x, y, concept_center, center, bar), rgb))
+    concept_rgb = color_to_rgb(theme["concept_color"], color_format)
+    layers.append((_disk(x, y, concept_center, concept), concept_rgb))
+    for center, rgb in zip(centers, node_colors):
+        layers.append((_disk(x, y, center, child), rgb))
+
+    # composite premultiplied colors back to front
+    color = numpy.zeros((size, size, 3))
+    alpha = numpy.zeros((size, size))
+    background = theme.get("background_color")
+    if background and background[1] is not None:
+        color[...] = color_to_rgb(background, color_format)
+        alpha[...] = 1.0
+    for coverage, rgb in layers:
+        color = color * (1.0 - coverage[..., None]) + numpy.multiply.outer(coverage, rgb)
+        alpha = alpha * (1.0 - coverage) + coverage
+    visible = alpha > 0
+    color[visible] /= alpha[visible, None]
+    image = numpy.empty((size, size, 4), dtype=numpy.uint8)
+    image[..., :3] = numpy.clip(numpy.round(color), 0, 255)
+    image[..., 3] = numpy.clip(numpy.round(alpha * 255), 0, 255)
+    return image
+
+
+def square(image, background=None):
+    """Pad an RGBA image to a centered square.
+
+    The padding is transparent, or the ``(r, g, b)`` ``background``.
+    """
+    h, w = image.shape[:2]
+    side = max(h, w)
+    padded = numpy.zeros((side, side, 4), dtype=numpy.uint8)
+    if background is not None:
+        padded[..., :3] = background
+        padded[..., 3] = 255
+    top, left = (side - h) // 2, (side - w) // 2
+    padded[top : top + h, left : left + w] = image
+    return padded
+
+
+def ico_bytes(images):
+    """An .ico file of square RGBA images (PNG compressed entries)."""
+    pngs = [raster.write_png(image) for image in images]
+    data = struct.pack("<HHH", 0, 1, len(images))
+    offset = 6 + 16 * len(images)
+    for image, png in zip(images, pngs):
+        # a size of 0 means 256 pixels
+        side = image.shape[0] % 256
+        data += struct.pack("<BBBBHHII", side, side, 0, 0, 1, 32, len(png), offset)
+        offset += len(png)
+    return data + b"".join(pngs)
+
+
+def write_favicon(fname, resolutions, theme, png=None, simplified_size=SIMPLIFIED_SIZE):
+    """Write a multi-resolution .ico file.
+
+    Parameters
+    ----------
+
+    fname : str
+        The .ico file name.
+
+    resolutions : str or list
+        Sizes in pixels, e.g. "64,48,32,16".
+
+    theme : dict
+        `create_logo()` keyword arguments.
+
+    png : str (Optional - Default is None)
+        Full logo render the resolutions above ``simplified_size`` are
+        scaled from. Required if there are any (see `needs_render()`).
+
+    simplified_size : int (Optional - Default is `SIMPLIFIED_SIZE`)
+        Largest resolution drawn with `draw_favicon()`.
+
+    """
+    images = []
+    full = None
+    for size in parse_resolutions(resolutions):
+        if size <= simplified_size:
+            images.append(draw_favicon(size, theme))
+            continue
+        if full is None:
+            background = theme.get("background_color")
+            rgb = None
+            if background and background[1] is not None:
+                rgb = color_to_rgb(background, theme["color_format"])
+            full = square(raster.read_png(png), rgb)
+        images.append(raster.resize(full, size, size))
+    with open(fname, "wb") as f:
+        f.write(ico_bytes(images))
@@ -0,0 +1,254 @@
+"""Responsive image sets rasterized from a single vector render.
+
+`create_image_set()` compiles a theme once to PDF and rasterizes every
+requested width from that PDF in parallel, instead of a TeX run (and an
+ImageMagick conversion at a fixed density) per size. The sizes are listed
+in a JSON manifest with ready-made ``srcset`` attributes::
+
+    <img src="pysal_logo_320w.png"
+         srcset="pysal_logo_320w.png 320w, pysal_logo_640w.png 640w, ..."
+         sizes="320px">
+"""
+
+import concurrent.futures
+import json
+import os
+import shutil
+import struct
+
+from . import convert
+from . import raster
+from .backgrounds import DENSITY
+from .create_pysal_logo import _destination, _publish, _sandbox, create_logo
+
+# rasterizers, in order of preference
+RASTERIZERS = ("pdftocairo", "convert")
+
+# formats the rasterizers write directly; others are converted from .png
+_NATIVE = {"png", "jpg"}
+
+
+def available_rasterizers():
+    """Rasterizers whose executable is on the ``PATH``."""
+    return [r for r in RASTERIZERS if shutil.which(r)]
+
+
+def _image_size(path):
+    """``(width, height)`` of a .png or .jpg file, or None."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:8] == raster.PNG_SIGNATURE:
+        return struct.unpack(">II", data[16:24])
+    if data[:2] == b"\xff\xd8":
+        pos = 2
+        while pos + 9 < len(data):
+            marker, length = struct.unpack(">HH", data[pos : pos + 4])
+            if marker in (0xFFC0, 0xFFC1, 0xFFC2):
+                height, width = struct.unpack(">HH", data[pos + 5 : pos + 9])
+                return width, height
+            pos += 2 + length
+    return None
+
+
+def _rasterize(rasterizer, pdf, width, fmat, out):
+    """Rasterize a single page PDF at a pixel width."""
+    if fmat not in _NATIVE:
+        png = "%s.png" % out
+        _rasterize(rasterizer, pdf, width, "png", png)
+        convert._run(["convert", png, out])
+        return
+    if rasterizer == "pdftocairo":
+        command = ["pdftocairo", "-png" if fmat == "png" else "-jpeg", "-singlefile"]
+        if fmat == "png":
+            command.append("-transp")
+        command += ["-scale-to-x", str(width), "-scale-to-y", "-1", pdf]
+        # pdftocairo appends the extension itself
+        command.append(os.path.splitext(out)[0])
+    else:
+        # oversample, then scale down to the exact width
+        background = ["-background", "none"]
+        if fmat == "jpg":
+            background = ["-background", "white", "-flatten"]
+        command = ["convert", "-density", "600", pdf] + background
+        command += ["-resize", "%dx" % width, out]
+    convert._run(command)
+
+
+def rasterize_png(pdf, width=None, rasterizer="auto"):
+    """Rasterize a single page PDF to PNG bytes, without writing a file.
+
+    Parameters
+    ----------
+
+    pdf : str
+        PDF file name.
+
+    width : int (Optional - Default is None)
+        Width in pixels. None rasterizes at the `standalone` conversion
+        density, the size of the .png TeX itself would write.
+
+    rasterizer : str (Optional - Default is "auto")
+        One of `RASTERIZERS`, or "auto" for the first one installed.
+
+    Returns
+    -------
+
+    png : bytes
+
+    """
+    if rasterizer == "auto":
+        installed = available_rasterizers()
+        if not installed:
+            raise RuntimeError("No rasterizer found (%s)." % ", ".join(RASTERIZERS))
+        rasterizer = installed[0]
+    if rasterizer == "pdftocairo":
+        command = ["pdftocairo", "-png", "-singlefile", "-transp"]
+        if width:
+            command += ["-scale-to-x", str(width), "-scale-to-y", "-1"]
+        else:
+            command += ["-r", str(DENSITY)]
+        # a "-" output file writes the single page to stdout
+        command += [pdf, "-"]
+    elif rasterizer == "convert":
+        density = 600 if width else DENSITY
+        command = ["convert", "-density", str(density), "-background", "none", pdf]
+        if width:
+            command += ["-resize", "%dx" % width]
+        command.append("png:-")
+    else:
+        raise RuntimeError("'%s' rasterizer not supported." % rasterizer)
+    return convert._run(command).stdout
+
+
+def create_image_set(
+    fname,
+    theme,
+    widths=(160, 320, 640),
+    densities=(1, 2, 3),
+    formats=("png",),
+    move_to=None,
+    workers=4,
+    rasterizer="auto",
+    optimize_png=False,
+):
+    """
+
+    Create a responsive set of logo images from a single TeX run.
+
+    Parameters
+    ----------
+
+    fname : str
+        Base file name. Each image is saved as `<fname>_<width>w.<format>`
+        and the manifest as `<fname>_srcset.json`.
+
+    theme : dict
+        `create_logo()` keyword arguments, e.g. `logo.canon2020_theme_transparent`.
+
+    widths : iterable (Optional - Default is (160, 320, 640))
+        Display widths in CSS pixels.
+
+    densities : iterable (Optional - Default is (1, 2, 3))
+        Pixel densities (1x, 2x, 3x) rendered for every width.
+
+    formats : iterable (Optional - Default is ("png",))
+        Output formats, e.g. "png", "jpg", or "webp". "svg" adds a single
+        vector image (see `logo.convert`) which fits every width.
+
+    move_to : see `create_logo()`
+
+    workers : int (Optional - Default is 4)
+        Number of concurrent rasterizations.
+
+    rasterizer : str (Optional - Default is "auto")
+        One of `RASTERIZERS`, or "auto" for the first one installed.
+
+    optimize_png : bool or dict (Optional - Default is False)
+        Optimize every .png (see `logo.raster.optimize_png()`).
+
+    Returns
+    -------
+
+    manifest : dict
+        Written to `<fname>_srcset.json`. `images` maps each format to its
+        files with pixel `width` and `height`, and `srcset` maps each
+        raster format to an `srcset` attribute value.
+
+    Examples
+    --------
+
+    >>> import logo
+    >>> theme = logo.canon2020_theme_transparent
+    >>> logo.create_image_set("pysal_logo", theme, formats=("png", "svg"))
+
+    """
+
+    if rasterizer == "auto":
+        available = available_rasterizers()
+        if not available:
+            raise RuntimeError("No rasterizer found (%s)." % ", ".join(RASTERIZERS))
+        rasterizer = available[0]
+    elif rasterizer not in RASTERIZERS:
+        raise RuntimeError("'%s' rasterizer not supported." % rasterizer)
+
+    pixel_widths = sorted({int(round(w * d)) for w in widths for d in densities})
+    raster_formats = [f for f in formats if f != "svg"]
+
+    destination, jobname = _destination(fname, move_to)
+    with _sandbox(destination) as sandbox:
+
+        # the single TeX run
+        theme = dict(theme, fmat="pdf", clean_up=["aux", "log"])
+        create_logo(jobname, move_to=sandbox, **theme)
+        pdf = os.path.join(sandbox, "%s.pdf" % jobname)
+
+        def _one(task):
+            width, fmat = task
+            out = os.path.join(sandbox, "%s_%dw.%s" % (jobname, width, fmat))
+            _rasterize(rasterizer, pdf, width, fmat, out)
+            if fmat == "png" and optimize_png:
+                options = optimize_png if isinstance(optimize_png, dict) else {}
+                raster.optimize_png_file(out, **options)
+            return task, out
+
+        tasks = [(w, f) for f in raster_formats for w in pixel_widths]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            rendered = dict(pool.map(_one, tasks))
+
+        images, srcset = {}, {}
+        for fmat in raster_formats:
+            entries = []
+            for width in pixel_widths:
+                out = rendered[width, fmat]
+                size = _image_size(out)
+                if size is None:
+                    # e.g. webp; same pixels as the .png it was converted from
+                    size = _image_size("%s.png" % out)
+                entries.append(
+                    {"file": os.path.basename(out), "width": size[0], "height": size[1]}
+                )
+            images[fmat] = entries
+            srcset[fmat] = ", ".join("%s %dw" % (e["file"], e["width"]) for e in entries)
+        keep = {e["file"] for entries in images.values() for e in entries}
+
+        if "svg" in formats:
+            svg = "%s.svg" % jobname
+            convert.pdf_to_svg([pdf], [os.path.join(sandbox, svg)])
+            images["svg"] = [{"file": svg, "width": None, "height": None}]
+            keep.add(svg)
+
+        manifest = {
+            "name": jobname,
+            "widths": list(widths),
+            "densities": list(densities),
+            "images": images,
+            "srcset": srcset,
+        }
+        manifest_name = "%s_srcset.json" % jobname
+        with open(os.path.join(sandbox, manifest_name), "w") as f:
+            json.dump(manifest, f, indent=2)
+        keep.add(manifest_name)
+
+        _publish(sandbox, destination, keep=keep)
+
+    return manifest
@@ -0,0 +1,367 @@
+"""Nav logo text layout from cached font metrics.
+
+The nav logos in `logo.predefined` place their text with hand-tuned
+``\\node[text width=...] at (x, y)`` coordinates, found by compiling again
+and again. `nav_logo()` instead measures the text with the advance widths
+of the configured font and computes the node widths and positions for any
+submodule name in one go::
+
+    >>> import logo
+    >>> nav = logo.nav_logo("pysal/esda", r"\\textbf{e}xploratory \\textbf{s}patial data analysis")
+    >>> logo.create_logo("esda_nav", nav_logo=nav, concept_text="", **logo.canon2020_theme_transparent)
+
+The advance widths are read from the font file (the ``cmap``, ``hhea``,
+``hmtx``, and ``OS/2`` tables of a TrueType/OpenType font) and cached as
+JSON in the cache directory (see `logo.cache.default_cache_dir()`), so the
+font file is parsed once per machine. If the font file cannot be found,
+widths fall back to those of a monospaced font (half an em per character,
+like ``M+ 1mn``).
+"""
+
+import functools
+import json
+import os
+import re
+import struct
+import tempfile
+
+from . import fonts
+from .cache import default_cache_dir
+
+# \defaultfontfeatures{Scale=3} in the .tex header
+FONT_SCALE = 3
+
+PT_PER_CM = 72.27 / 2.54
+
+# left edge of the nav logo text, right of the mindmap (cm)
+TEXT_LEFT = 10.0
+
+# vertical center of the nav logo text (cm)
+TEXT_CENTER = -1.0
+
+# gap between two lines of nav logo text (pt)
+LINE_GAP = 20.0
+
+# font sizes of a single line title, and of a title with a subtitle
+TITLE_SIZE = 125
+TITLE_SIZE_2LINE = 75
+SUBTITLE_SIZE = 25
+
+# advance width (in em) of every character without metrics
+MONOSPACE_ADVANCE = 0.5
+
+# highest code point whose advance width is cached
+_MAX_CODE_POINT = 0x2FFF
+
+_TOKEN = re.compile(
+    r"\\hspace\*?\s*\{([^}]*)\}"  # horizontal space
+    r"|\\([A-Za-z]+)\s*"  # command, with the spaces it swallows
+    r"|\\([^A-Za-z])"  # escaped character
+    r"|([^\\{}]+)"  # text
+)
+_LENGTH = re.compile(r"^\s*(-?[0-9.]+)\s*(em|ex|pt|cm|mm)\s*$")
+
+
+def _tables(data):
+    """Table name to (offset, length) of an sfnt font (first of a collection)."""
+    start = 0
+    if data[:4] == b"ttcf":
+        (start,) = struct.unpack(">I", data[12:16])
+    (count,) = struct.unpack(">H", data[start + 4 : start + 6])
+    tables = {}
+    for i in range(count):
+        record = start + 12 + 16 * i
+        tag, _, offset, length = struct.unpack(">4sIII", data[record : record + 16])
+        tables[tag.decode("latin-1")] = offset, length
+    return tables
+
+
+def _cmap_format4(data, at):
+    seg_count = struct.unpack(">H", data[at + 6 : at + 8])[0] // 2
+    ends = at + 14
+    starts = ends + 2 * seg_count + 2
+    deltas = starts + 2 * seg_count
+    range_offsets = deltas + 2 * seg_count
+    mapping = {}
+    for i in range(seg_count):
+        (end,) = struct.unpack(">H", data[ends + 2 * i : ends + 2 * i + 2])
+        (start,) = struct.unpack(">H", data[starts + 2 * i : starts + 2 * i + 2])
+        (delta,) = struct.unpack(">h", data[deltas + 2 * i : deltas + 2 * i + 2])
+        offset = range_offsets + 2 * i
+        (range_offset,) = struct.unpack(">H", data[offset : offset + 2])
+        for code in range(start, min(end, _MAX_CODE_POINT) + 1):
+            if range_offset == 0:
+                glyph = (code + delta) & 0xFFFF
+            else:
+                address = offset + range_offset + 2 * (code - start)
+                (glyph,) = struct.unpack(">H", data[address : address + 2])
+                glyph = (glyph + delta) & 0xFFFF if glyph else 0
+            if glyph:
+                mapping[code] = glyph
+    return mapping
+
+
+def _cmap_format12(data, at):
+    (groups,) = struct.unpack(">I", data[at + 12 : at + 16])
+    mapping = {}
+    for i in range(groups):
+        start, end, glyph = struct.unpack(">III", data[at + 16 + 12 * i : at + 28 + 12 * i])
+        for code in range(start, min(end, _MAX_CODE_POINT) + 1):
+            mapping[code] = glyph + code - start
+    return mapping
+
+
+def parse_font(path):
+    """Advance widths of a TrueType/OpenType font file.
+
+    Returns
+    -------
+
+    metrics : dict
+        ``advances`` (code point to width in em, as a string keyed dict),
+        ``default`` (width of unmapped characters in em), and ``x_height``
+        in em.
+
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    tables = _tables(data)
+    for required in ("cmap", "head", "hhea", "hmtx"):
+        if required not in tables:
+            raise RuntimeError("'%s' has no '%s' table." % (path, required))
+    head, hhea, hmtx = tables["head"][0], tables["hhea"][0], tables["hmtx"][0]
+    (units,) = struct.unpack(">H", data[head + 18 : head + 20])
+    (n_metrics,) = struct.unpack(">H", data[hhea + 34 : hhea + 36])
+    advances = struct.unpack(">%dH" % (2 * n_metrics), data[hmtx : hmtx + 4 * n_metrics])[::2]
+
+    # prefer the full Unicode cmap, then the BMP one
+    cmap = tables["cmap"][0]
+    (n_subtables,) = struct.unpack(">H", data[cmap + 2 : cmap + 4])
+    subtables = {}
+    for i in range(n_subtables):
+        platform, encoding, offset = struct.unpack(
+            ">HHI", data[cmap + 4 + 8 * i : cmap + 12 + 8 * i]
+        )
+        (fmt,) = struct.unpack(">H", data[cmap + offset : cmap + offset + 2])
+        subtables.setdefault(fmt, cmap + offset)
+    if 12 in subtables:
+        mapping = _cmap_format12(data, subtables[12])
+    elif 4 in subtables:
+        mapping = _cmap_format4(data, subtables[4])
+    else:
+        raise RuntimeError("'%s' has no Unicode cmap." % path)
+
+    def _advance(glyph):
+        return advances[min(glyph, n_metrics - 1)] / float(units)
+
+    x_height = 0.5
+    if "OS/2" in tables:
+        os2 = tables["OS/2"][0]
+        (version,) = struct.unpack(">H", data[os2 : os2 + 2])
+        if version >= 2:
+            (x_height_units,) = struct.unpack(">h", data[os2 + 86 : os2 + 88])
+            x_height = x_height_units / float(units) or x_height
+    return {
+        "advances": {str(code): _advance(glyph) for code, glyph in mapping.items()},
+        "default": _advance(0),
+        "x_height": x_height,
+    }
+
+
+def _font_file(font):
+    """The file of a font name (or a font file name), or None."""
+    if os.path.isfile(font):
+        return font
+    for backend in ("luaotfload", "fontconfig"):
+        path = fonts.find_font(font, backend)
+        if path and os.path.isfile(path):
+            return path
+    return None
+
+
+def _metrics_path(font):
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", os.path.basename(font))
+    return os.path.join(default_cache_dir(), "metrics", "%s.json" % name)
+
+
+class FontMetrics:
+    """Advance widths of a font, in em.
+
+    Parameters
+    ----------
+
+    advances : dict
+        Code point (as a string) to advance width.
+
+    default : float (Optional - Default is `MONOSPACE_ADVANCE`)
+        Advance width of characters not in ``advances``.
+
+    x_height : float (Optional - Default is 0.5)
+        Height of an "x", the unit of ``ex`` lengths.
+
+    """
+
+    def __init__(self, advances, default=MONOSPACE_ADVANCE, x_height=0.5):
+        self.advances = advances
+        self.default = default
+        self.x_height = x_height
+
+    def advance(self, char):
+        """Advance width of a character in em."""
+        return self.advances.get(str(ord(char)), self.default)
+
+    def width(self, tex, size):
+        """Width in pt of TeX text set at a font size (before `FONT_SCALE`)."""
+        em = 0.0
+        for token in _TOKEN.finditer(tex):
+            length, command, escaped, text = token.groups()
+            if length is not None:
+                value = _LENGTH.match(length)
+                if value:
+                    em += self._length(float(value.group(1)), value.group(2), size)
+            elif escaped is not None:
+                # escaped characters such as \& or \%
+                em += self.advance(escaped)
+            elif text is not None:
+                # TeX sets a run of spaces as one
+                em += sum(self.advance(c) for c in re.sub(r"\s+", " ", text))
+            # other commands (\textbf, \selectfont, ...) and braces take no space
+        return em * size * FONT_SCALE
+
+    def _length(self, value, unit, size):
+        """A TeX length in em."""
+        if unit == "em":
+            return value
+        if unit == "ex":
+            return value * self.x_height
+        points = value * {"pt": 1.0, "cm": PT_PER_CM, "mm": PT_PER_CM / 10}[unit]
+        return points / (size * FONT_SCALE)
+
+
+@functools.lru_cache(maxsize=None)
+def font_metrics(font=fonts.DEFAULT_FONT):
+    """Metrics of a font, read from the metrics cache or the font file.
+
+    Parameters
+    ----------
+
+    font : str (Optional - Default is "M+ 1mn")
+        Font name (resolved with `logo.fonts.find_font()`) or font file.
+
+    Returns
+    -------
+
+    metrics : FontMetrics
+        Monospaced metrics (`MONOSPACE_ADVANCE`) if the font file is not
+        found or cannot be read.
+
+    """
+    path = _font_file(font)
+    if path is None:
+        return FontMetrics({})
+    cached = _metrics_path(path)
+    stamp = [os.path.getsize(path), int(os.path.getmtime(path))]
+    try:
+        with open(cached) as f:
+            metrics = json.load(f)
+        if metrics.get("stamp") == stamp:
+            return FontMetrics(metrics["advances"], metrics["default"], metrics["x_height"])
+    except (OSError, ValueError, KeyError):
+        pass
+    try:
+        metrics = parse_font(path)
+    except (RuntimeError, struct.error):
+        return FontMetrics({})
+    metrics["stamp"] = stamp
+    os.makedirs(os.path.dirname(cached), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cached), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(metrics, f)
+    os.replace(tmp, cached)
+    return FontMetrics(metrics["advances"], metrics["default"], metrics["x_height"])
+
+
+def _line_node(text, size, leading, left, y, metrics, margin):
+    """A TikZ node placing a line of text with its left edge at ``left``."""
+    width = metrics.width(text, size) + margin * size * FONT_SCALE
+    x = left + width / 2.0 / PT_PER_CM
+    return r"\node[text width=%d] at (%g, %g) {\fontsize{%g}{%g}\selectfont %s};" % (
+        int(round(width)),
+        round(x, 2),
+        round(y, 2),
+        size,
+        leading,
+        text,
+    )
+
+
+def nav_logo(
+    title,
+    subtitle=None,
+    font=fonts.DEFAULT_FONT,
+    title_size=None,
+    subtitle_size=SUBTITLE_SIZE,
+    max_width=None,
+    left=TEXT_LEFT,
+    margin=0.1,
+):
+    """TikZ nav logo text for `create_logo(nav_logo=...)`.
+
+    Parameters
+    ----------
+
+    title : str
+        First line, e.g. "pysal/spaghetti". May contain TeX markup.
+
+    subtitle : str (Optional - Default is None)
+        Second, smaller line, e.g. the long name of the submodule.
+
+    font : str (Optional - Default is "M+ 1mn")
+        Font the logo is compiled with. See `font_metrics()`.
+
+    title_size : int (Optional - Default is None)
+        Title font size. Defaults to `TITLE_SIZE` for a single line and
+        `TITLE_SIZE_2LINE` with a subtitle.
+
+    subtitle_size : int (Optional - Default is `SUBTITLE_SIZE`)
+        Subtitle font size.
+
+    max_width : float (Optional - Default is None)
+        Widest a line may be, in cm. Lines that are wider are set in a
+        smaller font size so they fit.
+
+    left : float (Optional - Default is `TEXT_LEFT`)
+        Left edge of the text in cm.
+
+    margin : float (Optional - Default is 0.1)
+        Extra node width in em, so rounding never breaks a line.
+
+    Returns
+    -------
+
+    nav : str
+        A ``\\node`` per line.
+
+    """
+    metrics = font_metrics(font)
+    if title_size is None:
+        title_size = TITLE_SIZE if subtitle is None else TITLE_SIZE_2LINE
+
+    def _fit(text, size):
+        if max_width is None:
+            return size
+        width = metrics.width(text, size) / PT_PER_CM
+        return size if width <= max_width else int(size * max_width / width)
+
+    title_size = _fit(title, title_size)
+    if subtitle is None:
+        return _line_node(title, title_size, 50, left, TEXT_CENTER, metrics, margin)
+
+    subtitle_size = _fit(subtitle, subtitle_size)
+    # centers of the two lines, spaced by their heights around the center
+    spacing = ((title_size + subtitle_size) / 2.0 * FONT_SCALE + LINE_GAP) / PT_PER_CM
+    lines = [
+        _line_node(title, title_size, 0, left, TEXT_CENTER + spacing / 2, metrics, margin),
+        _line_node(subtitle, subtitle_size, 0, left, TEXT_CENTER - spacing / 2, metrics, margin),
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,149 @@
+"""Timeouts and resource limits for the TeX and conversion subprocesses.
+
+Every external tool (TeX engines, ImageMagick, the PDF converters) is
+started through `run()`, which
+
+    - never leaves the child waiting for terminal input,
+    - kills the child, and everything it spawned (e.g. ImageMagick and
+      Ghostscript started by ``--shell-escape``), when the timeout of its
+      stage expires, and
+    - applies the CPU time and memory limits of its stage, if any, through
+      the util-linux ``prlimit`` command (Linux only).
+
+Timeouts per stage are set in `TIMEOUTS` or with ``$LOGO_TIMEOUT_<STAGE>``
+(e.g. ``LOGO_TIMEOUT_COMPILE=120``). Limits are opt-in per stage, in
+`LIMITS` or with ``$LOGO_LIMIT_CPU_<STAGE>`` (seconds) and
+``$LOGO_LIMIT_MEMORY_<STAGE>`` (megabytes), e.g.
+``LOGO_LIMIT_MEMORY_COMPILE=2048``.
+
+The limits are not set in the child with a ``preexec_fn``, which is not
+safe in a process with threads (see `logo.batch.run_jobs()`), but by
+``prlimit`` before it executes the command.
+"""
+
+import os
+import shutil
+import signal
+import subprocess
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# seconds before a subprocess of each stage is killed (None for no limit)
+TIMEOUTS = {"compile": 300, "convert": 120, "probe": 60}
+
+# CPU seconds and address space (megabytes) of the subprocesses of a stage,
+# e.g. {"compile": {"cpu": 600, "memory": 2048}}; stages without an entry
+# run without limits
+LIMITS = {}
+
+
+def stage_timeout(stage):
+    """Timeout in seconds of a stage, or None."""
+    value = os.environ.get("LOGO_TIMEOUT_%s" % stage.upper())
+    if value:
+        return float(value)
+    return TIMEOUTS.get(stage)
+
+
+def stage_limits(stage):
+    """CPU seconds and memory megabytes of a stage, each None for no limit."""
+    limits = LIMITS.get(stage, {})
+    cpu = os.environ.get("LOGO_LIMIT_CPU_%s" % stage.upper()) or limits.get("cpu")
+    memory = os.environ.get("LOGO_LIMIT_MEMORY_%s" % stage.upper()) or limits.get("memory")
+    return int(cpu) if cpu else None, int(memory) if memory else None
+
+
+def _with_limits(command, cpu, memory):
+    """Prefix a command with ``prlimit`` setting the rlimits of the child."""
+    prlimit = shutil.which("prlimit")
+    if resource is None or prlimit is None:
+        raise RuntimeError("Resource limits need the util-linux 'prlimit' command.")
+    options = []
+    if cpu:
+        options.append("--cpu=%d:%d" % (cpu, cpu + 5))
+    if memory:
+        size = memory * 1024 * 1024
+        hard = resource.getrlimit(resource.RLIMIT_AS)[1]
+        # a hard limit already lower is kept
+        if hard == resource.RLIM_INFINITY or size <= hard:
+            options.append("--as=%d" % size)
+    return [prlimit] + options + ["--"] + list(command)
+
+
+def _kill(process):
+    """Kill a child with everything it spawned, and reap it."""
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass
+    process.communicate()
+
+
+def run(command, stage, cwd=None, env=None, capture=True):
+    """Run a command with the timeout and resource limits of a stage.
+
+    Parameters
+    ----------
+
+    command : list
+        Program and arguments.
+
+    stage : str
+        Key of `TIMEOUTS`, e.g. "compile" or "convert".
+
+    cwd : str (Optional - Default is None)
+        Working directory.
+
+    env : dict (Optional - Default is None)
+        Environment. None inherits the current one.
+
+    capture : bool (Optional - Default is True)
+        Capture stdout and stderr instead of passing them through.
+
+    Returns
+    -------
+
+    process : subprocess.CompletedProcess
+
+    Raises
+    ------
+
+    RuntimeError
+        If the timeout of the stage expired (the child and its descendants
+        are killed first), or the stage has limits and ``prlimit`` is not
+        installed.
+
+    """
+    timeout = stage_timeout(stage)
+    kwargs = {}
+    cpu, memory = stage_limits(stage)
+    limited = _with_limits(command, cpu, memory) if cpu or memory else command
+    if os.name == "posix":
+        # own process group, so descendants can be killed together
+        kwargs["start_new_session"] = True
+    output = subprocess.PIPE if capture else None
+    process = subprocess.Popen(
+        limited,
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=output,
+        stderr=output,
+        **kwargs
+    )
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill(process)
+        err_msg = "'%s' timed out after %gs (%s stage)."
+        raise RuntimeError(err_msg % (" ".join(command), timeout, stage))
+    except BaseException:
+        _kill(process)
+        raise
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
@@ -0,0 +1,289 @@
+"""Pipelined rendering: stages connected by bounded queues.
+
+`create_logo()` runs generate, compile, convert, optimize, and publish
+strictly in sequence. For a batch, `run_pipeline()` instead runs each of
+these as a `Stage` with its own worker threads, so the TeX compilation of
+one job overlaps with the conversion, optimization, and file I/O of the
+jobs before it::
+
+    generate -> compile -> convert -> optimize -> publish
+
+Each stage takes items from a bounded queue, so a fast stage blocks (and
+stops holding sandboxes) when the next stage falls behind. The number of
+workers per stage is configurable, e.g. many compile workers for TeX, a
+few for conversion::
+
+    $ python -m logo manifest.toml --stages compile=4,convert=2,optimize=2
+
+A job that fails in any stage is passed through the remaining stages
+untouched, and its sandbox is still removed by the publish stage.
+"""
+
+import inspect
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+from .create_pysal_logo import create_favicon, create_logo
+from .create_pysal_logo import _compile, _convert, _convert_favicon, _optimize
+from .create_pysal_logo import _prepare, _publish, _write_tex
+from .icons import needs_render
+
+# stages in order, with their default number of workers
+STAGES = (("generate", 1), ("compile", 2), ("convert", 1), ("optimize", 1), ("publish", 1))
+
+_STOP = object()
+
+# `create_favicon()` arguments a drawn favicon needs
+_THEME_KEYS = ("node_info", "color_format", "background_color", "concept_color", "text_color")
+
+
+class Stage:
+    """A pipeline step run by worker threads between two queues.
+
+    Parameters
+    ----------
+
+    name : str
+        Stage name, used for timings.
+
+    func : callable
+        ``func(item)`` doing the work of the stage on an item (a dict).
+        Exceptions are recorded in ``item["error"]``.
+
+    workers : int (Optional - Default is 1)
+        Number of worker threads.
+
+    maxsize : int (Optional - Default is None)
+        Capacity of the input queue. Defaults to twice the workers.
+
+    always : bool (Optional - Default is False)
+        Also run `func` on items that failed in an earlier stage.
+
+    """
+
+    def __init__(self, name, func, workers=1, maxsize=None, always=False):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.inbox = queue.Queue(maxsize or 2 * self.workers)
+        self.outbox = None
+        self.downstream_workers = 1
+        self.always = always
+        self._running = self.workers
+        self._lock = threading.Lock()
+
+    def _work(self):
+        while True:
+            item = self.inbox.get()
+            if item is _STOP:
+                break
+            if item["error"] is None or self.always:
+                start = time.perf_counter()
+                try:
+                    self.func(item)
+                except Exception as e:
+                    if item["error"] is None:
+                        item["error"] = "%s: %s" % (type(e).__name__, e)
+                item["seconds"][self.name] = time.perf_counter() - start
+            self.outbox.put(item)
+        # the last worker to stop tells the next stage to stop
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        if last:
+            for _ in range(self.downstream_workers):
+                self.outbox.put(_STOP)
+
+    def start(self):
+        threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+        return threads
+
+
+class Pipeline:
+    """Stages connected in order by their bounded input queues."""
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        # unbounded, collects the items leaving the last stage
+        self.sink = queue.Queue()
+        for stage, following in zip(self.stages, self.stages[1:]):
+            stage.outbox = following.inbox
+            stage.downstream_workers = following.workers
+        self.stages[-1].outbox = self.sink
+
+    def run(self, items):
+        """Push items through every stage and return them in input order."""
+        threads = [t for stage in self.stages for t in stage.start()]
+        first = self.stages[0]
+        for item in items:
+            first.inbox.put(item)
+        for _ in range(first.workers):
+            first.inbox.put(_STOP)
+        done = []
+        while True:
+            item = self.sink.get()
+            if item is _STOP:
+                break
+            done.append(item)
+        for t in threads:
+            t.join()
+        return sorted(done, key=lambda item: item["index"])
+
+
+def _bind(func, *args, **kwargs):
+    """Every argument of `func` for a call, defaults included."""
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return bound.arguments
+
+
+def _generate(item):
+    job, dry_run = item["job"], item["dry_run"]
+    kwargs = dict(job["kwargs"])
+    kwargs["move_to"] = os.path.abspath(kwargs.get("move_to") or os.curdir)
+    if job["kind"] == "favicon":
+        args = _bind(create_favicon, job["name"], dry_run=dry_run, **kwargs)
+        parameters = inspect.signature(create_logo).parameters
+        logo = {k: v for k, v in args.items() if k in parameters and k != "clean_up"}
+        logo["fname"] = "%s_favicon" % job["name"]
+        logo["optimize_png"] = args["optimize_png"] if not args["clean_up"] else False
+        render = _prepare(**_bind(create_logo, **logo))
+        render["favicon"] = {
+            "resolutions": args["resolutions"],
+            "theme": {k: args[k] for k in _THEME_KEYS},
+            "simplified_size": args["simplified_size"],
+        }
+        if args["clean_up"] and not dry_run:
+            render["keep"] = ["%s.ico" % render["jobname"]]
+    else:
+        render = _prepare(**_bind(create_logo, job["name"], dry_run=dry_run, **kwargs))
+    item["render"] = render
+    os.makedirs(render["destination"], exist_ok=True)
+    item["sandbox"] = tempfile.mkdtemp(prefix=".logo-", dir=render["destination"])
+    _write_tex(render, item["sandbox"])
+
+
+def _drawn_only(render):
+    """Whether a favicon is drawn without its logo (see `logo.icons`)."""
+    favicon = render.get("favicon")
+    return bool(favicon) and not needs_render(
+        favicon["resolutions"], favicon["simplified_size"]
+    )
+
+
+def _compile_stage(item):
+    if not item["dry_run"] and not _drawn_only(item["render"]):
+        _compile(item["render"], item["sandbox"])
+
+
+def _convert_stage(item):
+    render = item["render"]
+    if item["dry_run"]:
+        return
+    if not _drawn_only(render):
+        _convert(render, item["sandbox"])
+    if "favicon" in render:
+        favicon = render["favicon"]
+        _convert_favicon(
+            render["jobname"],
+            item["sandbox"],
+            favicon["resolutions"],
+            favicon["theme"],
+            favicon["simplified_size"],
+        )
+
+
+def _optimize_stage(item):
+    if not item["dry_run"] and not _drawn_only(item["render"]):
+        _optimize(item["render"], item["sandbox"])
+
+
+def _publish_stage(item):
+    sandbox = item.get("sandbox")
+    try:
+        if item["error"] is None:
+            render = item["render"]
+            favicon = "favicon" in render
+            clean_up = () if favicon else render["clean_up"]
+            _publish(
+                sandbox,
+                render["destination"],
+                clean_up,
+                render.get("keep"),
+                render["skip_unchanged"],
+            )
+            ext = "tex" if item["dry_run"] else "ico" if favicon else render["fmat"]
+            product = os.path.join(render["destination"], "%s.%s" % (render["jobname"], ext))
+            # an unchanged product is left in place rather than published
+            if not os.path.exists(product):
+                item["error"] = "RuntimeError: %s was not created." % product
+    finally:
+        if sandbox:
+            shutil.rmtree(sandbox, ignore_errors=True)
+
+
+_FUNCS = {
+    "generate": _generate,
+    "compile": _compile_stage,
+    "convert": _convert_stage,
+    "optimize": _optimize_stage,
+    "publish": _publish_stage,
+}
+
+
+def run_pipeline(jobs, stages=None, dry_run=False):
+    """Render batch jobs through the staged pipeline.
+
+    Parameters
+    ----------
+
+    jobs : list
+        See `logo.batch.build_jobs()`. Themes are expected to be valid
+        (see `logo.batch.run_jobs()`).
+
+    stages : dict (Optional - Default is None)
+        Number of workers per stage name, e.g. ``{"compile": 4}``. Stages
+        not given use the defaults in `STAGES`.
+
+    dry_run : bool (Optional - Default is False)
+        Only write the .tex files.
+
+    Returns
+    -------
+
+    results : list
+        `logo.batch.run_job()` style results, in the order of ``jobs``,
+        with the per-stage times in ``stages``.
+
+    """
+    workers = dict(STAGES)
+    unknown = set(stages or {}) - set(workers)
+    if unknown:
+        raise RuntimeError("Unknown stages: %s" % ", ".join(sorted(unknown)))
+    workers.update(stages or {})
+    pipeline = Pipeline(
+        Stage(name, _FUNCS[name], workers[name], always=name == "publish")
+        for name, _ in STAGES
+    )
+    items = (
+        {"index": i, "job": job, "dry_run": dry_run, "error": None, "seconds": {}}
+        for i, job in enumerate(jobs)
+    )
+    results = []
+    for item in pipeline.run(items):
+        results.append(
+            {
+                "kind": item["job"]["kind"],
+                "name": item["job"]["name"],
+                "seconds": sum(item["seconds"].values()),
+                "error": item["error"],
+                "stages": item["seconds"],
+            }
+        )
+    return results
@@ -4,20 +4,26 @@
     - LaTeX defined colors (http://latexcolor.com/)
     - tikz mindmap/concept colors, ans backgrounds, etc.
     - complete theme templates
+
+The LaTeX color table and the theme templates are built on first use
+(PEP 562 module `__getattr__()`), so importing `logo` stays cheap. In a
+process with an attached theme pack (see `use_theme_pack()`), e.g. a
+batch pool worker, they are read from the pack instead.
 """
 
 import numpy
 
-from . import defined_latex_colors
+from . import colorspace
 
 
 def create_dict(_names, _codes, _format="RGB"):
     """Helper for ColorBrewer2"""
+    # convert every code at once
+    rgb = colorspace.to_rgb(colorspace.parse_codes(_codes, _format), _format)
     schema = {}
-    for i, (n, f, c) in enumerate(zip(_names, [_format] * len(_names), _codes)):
-        schema[i] = {n: {f: c}}
-        c = str([float(x) / 255.0 for x in c.split(",")])
-        schema[i][n].update({f.lower(): {c}})
+    for i, (n, c, values) in enumerate(zip(_names, _codes, rgb.tolist())):
+        schema[i] = {n: {_format: c}}
+        schema[i][n].update({_format.lower(): {str(values)}})
     return schema
 
 
@@ -42,7 +48,7 @@ def _theme_builder(theme_info, background, concept_color=None, text_color=None):
     # set the color names and codes for LaTeX defined colors
     elif type(theme_info) == dict:
         theme_colors = [
-            (idx, color, latex_color_codes[color]["RGB"])
+            (idx, color, _latex_color_codes()[color]["RGB"])
             for idx, color in theme_info.items()
         ]
         theme_colors.sort()
@@ -52,12 +58,7 @@ def _theme_builder(theme_info, background, concept_color=None, text_color=None):
     # combine color and text information for nodes
     node_info = numpy.array(list(zip(theme_colors, NO_TEXT)))
     # set background color
-    if background == "light":
-        background_color = WHITE
-    elif background == "dark":
-        background_color = BLACK
-    else:
-        background_color = TRANSPARENT
+    background_color = BACKGROUNDS.get(background, TRANSPARENT)
     
     # pack up theme information
     if concept_color == None:
@@ -185,19 +186,47 @@ See also:   https://github.com/Inventium/latexcolor.com
             https://drive.google.com/drive/folders/1l_vDhUO6wfbj2DSBytEYD4AfNfwRJ5je
 """
 
-latex_color_codes = defined_latex_colors.all_latex_colors
-latex_color_names = defined_latex_colors.latex_color_names
+# theme pack the color table and themes are read from, if any
+_PACK = None
+
+
+def use_theme_pack(pack):
+    """Read the LaTeX colors and themes from a `logo.theme_pack.ThemePack`.
+
+    Only names not looked up yet are read from the pack, so it should be
+    set before the first lookup, e.g. in a pool worker initializer.
+    """
+    global _PACK
+    _PACK = pack
+
+
+def _latex_color_codes():
+    """`latex_color_codes`, from the theme pack or the defined colors."""
+    if "latex_color_codes" not in globals():
+        if _PACK is not None and _PACK.n_latex:
+            codes = {n: {"RGB": c} for n, c in _PACK.latex_colors().items()}
+        else:
+            from . import defined_latex_colors
+
+            codes = defined_latex_colors.all_latex_colors
+        globals()["latex_color_names"] = list(codes.keys())
+        globals()["latex_color_codes"] = codes
+    return globals()["latex_color_codes"]
 
 
 ################################################################################
 ############      Pre-defined concept colors and backgrounds        ############
 ################################################################################
 
-WHITE = "white", latex_color_codes["white"]["RGB"]
-BLACK = "black", latex_color_codes["black"]["RGB"]
-DARKGRAY = "dimgray", latex_color_codes["dimgray"]["RGB"]
+# codes as in `latex_color_codes`, without loading the table
+WHITE = "white", "255.0, 255.0, 255.0"
+BLACK = "black", "0.0, 0.0, 0.0"
+DARKGRAY = "dimgray", "104.55, 104.55, 104.55"
 TRANSPARENT = None, None
 
+# theme background variants
+BACKGROUNDS = {"transparent": TRANSPARENT, "light": WHITE, "dark": BLACK}
+
 ################################################################################
 ####################      Pre-defined theme templates        ###################
 ################################################################################
@@ -213,10 +242,6 @@ traditional_colors = {
     5: "darkred",
     6: "orange(colorwheel)",
 }
-# Tradition/Canonical PySAL themes ---------------------------------------------
-traditional_theme_transparent = _theme_builder(traditional_colors, "transparent")
-traditional_theme_light = _theme_builder(traditional_colors, "light")
-traditional_theme_dark = _theme_builder(traditional_colors, "dark")
 
 # Canonical colors as of 02/2020 -----------------------------------------------
 names = ["metallic", "tc", "yellow", "shamrock", "nvy", "vio", "orng"]
@@ -230,31 +255,73 @@ codes = [
     "239, 138, 23",
 ]
 canon2020 = create_dict(names, codes)
-canon2020_theme_transparent = _theme_builder("canon2020", "transparent")
-canon2020_theme_light = _theme_builder("canon2020", "light")
-canon2020_theme_dark = _theme_builder("canon2020", "dark")
-
 
-# ColorBrewer2 themes ----------------------------------------------------------
-cb_qual_Paired_n7_theme_transparent = _theme_builder("cb_qual_Paired_n7", "transparent")
-cb_qual_Paired_n7_theme_light = _theme_builder("cb_qual_Paired_n7", "light")
-cb_qual_Paired_n7_theme_dark = _theme_builder("cb_qual_Paired_n7", "dark")
-cb_qual_Set1_n7_theme_transparent = _theme_builder("cb_qual_Set1_n7", "transparent")
-cb_qual_Set1_n7_theme_light = _theme_builder("cb_qual_Set1_n7", "light")
-cb_qual_Set1_n7_theme_dark = _theme_builder("cb_qual_Set1_n7", "dark")
+# submodule colors -------------------------------------------------------------
+# spaghetti
+spaghetti_colors = {idx:"arylideyellow" for idx in range(CHILD_NODES)}
 
 
 ################################################################################
-##########################      Submodule themes        ########################
+#########################      Theme registries        #########################
 ################################################################################
 
+# pre-defined themes by name, e.g. for referencing in batch manifests, as
+# (colors, background, concept color name) `_theme_builder` arguments
+_CATALOG = {
+    # Tradition/Canonical PySAL themes
+    "traditional_theme_transparent": (traditional_colors, "transparent", None),
+    "traditional_theme_light": (traditional_colors, "light", None),
+    "traditional_theme_dark": (traditional_colors, "dark", None),
+    # Canonical colors as of 02/2020
+    "canon2020_theme_transparent": ("canon2020", "transparent", None),
+    "canon2020_theme_light": ("canon2020", "light", None),
+    "canon2020_theme_dark": ("canon2020", "dark", None),
+    # ColorBrewer2 themes
+    "cb_qual_Paired_n7_theme_transparent": ("cb_qual_Paired_n7", "transparent", None),
+    "cb_qual_Paired_n7_theme_light": ("cb_qual_Paired_n7", "light", None),
+    "cb_qual_Paired_n7_theme_dark": ("cb_qual_Paired_n7", "dark", None),
+    "cb_qual_Set1_n7_theme_transparent": ("cb_qual_Set1_n7", "transparent", None),
+    "cb_qual_Set1_n7_theme_light": ("cb_qual_Set1_n7", "light", None),
+    "cb_qual_Set1_n7_theme_dark": ("cb_qual_Set1_n7", "dark", None),
+    # submodule themes
+    "spaghetti_theme_transparent": (spaghetti_colors, "transparent", "vividauburn"),
+}
 
-# spaghetti
-spaghetti_colors = {idx:"arylideyellow" for idx in range(CHILD_NODES)}
-spaghetti_theme_transparent = _theme_builder(
-    spaghetti_colors,
-    "transparent",
-    concept_color=("vividauburn", latex_color_codes["vividauburn"]["RGB"])
-)
 
+def _themes():
+    """`THEMES`, from the theme pack or built from the color tables."""
+    if "THEMES" not in globals():
+        if _PACK is not None and all(name in _PACK for name in _CATALOG):
+            themes = {name: _PACK[name] for name in _CATALOG}
+        else:
+            themes = {}
+            for name, (colors, background, concept) in _CATALOG.items():
+                if concept is not None:
+                    concept = concept, _latex_color_codes()[concept]["RGB"]
+                themes[name] = _theme_builder(colors, background, concept_color=concept)
+        # every theme is also a module constant, e.g. `canon2020_theme_light`
+        globals().update(themes)
+        globals()["THEMES"] = themes
+    return globals()["THEMES"]
+
+
+def __getattr__(name):
+    """Build the LaTeX color table and the themes on first use."""
+    if name in ("latex_color_codes", "latex_color_names"):
+        _latex_color_codes()
+    elif name == "THEMES" or name in _CATALOG:
+        _themes()
+    else:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    return globals()[name]
+
+
+# navigation logo text by name
+NAV_LOGOS = {
+    "psnav_1line": psnav_1line,
+    "psnav_2line": psnav_2line,
+    "spgh_long": spgh_long,
+}
 
+# node text by name
+NODE_TEXT = {"NO_TEXT": NO_TEXT, "GREEK": GREEK, "BULLETS": BULLETS}
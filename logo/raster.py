@@ -0,0 +1,494 @@
+"""In-process raster handling for rendered logos.
+
+Only PNG is supported, which is what `create_logo()` produces by default.
+Decoding and encoding are done with `zlib` and `numpy` so that no imaging
+library is required on top of the TeX tool chain.
+"""
+
+import struct
+import zlib
+
+import numpy
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# number of samples per pixel for each PNG color type
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def _read_bytes(png):
+    """Return the raw bytes of a PNG passed in as a file name or bytes."""
+    if isinstance(png, (bytes, bytearray, memoryview)):
+        return bytes(png)
+    with open(png, "rb") as f:
+        return f.read()
+
+
+def iter_chunks(data):
+    """Yield ``(chunk type, chunk body)`` pairs from PNG bytes."""
+    if data[:8] != PNG_SIGNATURE:
+        raise RuntimeError("Not a PNG file.")
+    pos = 8
+    while pos < len(data):
+        (length,) = struct.unpack(">I", data[pos : pos + 4])
+        ctype = data[pos + 4 : pos + 8]
+        yield ctype, data[pos + 8 : pos + 8 + length]
+        pos += length + 12
+
+
+def _chunk(ctype, body):
+    """Serialize a single PNG chunk."""
+    crc = zlib.crc32(ctype + body) & 0xFFFFFFFF
+    return struct.pack(">I", len(body)) + ctype + body + struct.pack(">I", crc)
+
+
+def _paeth(a, b, c):
+    """Vectorized Paeth predictor."""
+    p = a + b - c
+    pa, pb, pc = numpy.abs(p - a), numpy.abs(p - b), numpy.abs(p - c)
+    return numpy.where((pa <= pb) & (pa <= pc), a, numpy.where(pb <= pc, b, c))
+
+
+def _unfilter(filtered, filters, bpp):
+    """Reverse the per-scanline PNG filters.
+
+    Scanlines using only the None/Sub/Up filters are reconstructed row by
+    row. Average and Paeth depend on the reconstructed left *and* upper
+    neighbours, so those images are reconstructed along anti-diagonals,
+    which are independent of each other and can be vectorized.
+    """
+    h, stride = filtered.shape
+    if numpy.all(filters <= 2):
+        out = numpy.empty_like(filtered)
+        prior = numpy.zeros(stride, dtype=numpy.uint8)
+        for i in range(h):
+            row = filtered[i]
+            if filters[i] == 1:
+                row = row.reshape(-1, bpp).cumsum(axis=0, dtype=numpy.uint8)
+                row = row.reshape(-1)
+            elif filters[i] == 2:
+                row = row + prior
+            out[i] = row
+            prior = out[i]
+        return out
+
+    npix = stride // bpp
+    flt = filtered.reshape(h, npix, bpp).astype(numpy.int16)
+    recon = numpy.zeros((h + 1, npix + 1, bpp), dtype=numpy.int16)
+    ftypes = filters.astype(numpy.int16)
+    for d in range(h + npix - 1):
+        rows = numpy.arange(max(0, d - npix + 1), min(h - 1, d) + 1)
+        cols = d - rows
+        a = recon[rows + 1, cols]
+        b = recon[rows, cols + 1]
+        c = recon[rows, cols]
+        ft = ftypes[rows][:, None]
+        pred = numpy.select(
+            [ft == 0, ft == 1, ft == 2, ft == 3],
+            [numpy.zeros_like(a), a, b, (a + b) >> 1],
+            _paeth(a, b, c),
+        )
+        recon[rows + 1, cols + 1] = (flt[rows, cols] + pred) & 0xFF
+    return recon[1:, 1:].reshape(h, stride).astype(numpy.uint8)
+
+
+def _filter_candidates(data, bpp):
+    """Every scanline filtered with each of the PNG filters 0-4.
+
+    Returns a ``(5, height, stride)`` array of ``uint8``.
+    """
+    x = data.astype(numpy.int16)
+    a = numpy.zeros_like(x)
+    a[:, bpp:] = x[:, :-bpp]
+    b = numpy.zeros_like(x)
+    b[1:] = x[:-1]
+    c = numpy.zeros_like(x)
+    c[:, bpp:] = b[:, :-bpp]
+    candidates = numpy.stack(
+        [x, x - a, x - b, x - ((a + b) >> 1), x - _paeth(a, b, c)]
+    ) & 0xFF
+    return candidates.astype(numpy.uint8)
+
+
+def _filter(data, bpp, filter_type, candidates=None):
+    """Apply a PNG filter to every scanline.
+
+    ``filter_type`` is one of the PNG filter codes 0-4, or ``"adaptive"``
+    to pick the filter per scanline with the minimum sum of absolute
+    differences heuristic from the PNG specification.
+    Returns the scanlines prefixed with their filter byte.
+    """
+    h = data.shape[0]
+    if candidates is None:
+        candidates = _filter_candidates(data, bpp)
+    if filter_type == "adaptive":
+        signed = numpy.minimum(candidates, 256 - candidates.astype(numpy.int16))
+        chosen = signed.sum(axis=2).argmin(axis=0)
+    else:
+        chosen = numpy.full(h, int(filter_type))
+    lines = candidates[chosen, numpy.arange(h)]
+    return numpy.hstack([chosen.astype(numpy.uint8)[:, None], lines])
+
+
+def read_png(png):
+    """Decode a (non-interlaced) PNG into an RGBA array.
+
+    Parameters
+    ----------
+
+    png : str or bytes
+        PNG file name or the PNG bytes themselves.
+
+    Returns
+    -------
+
+    image : numpy.ndarray
+        ``(height, width, 4)`` array of ``uint8``.
+
+    """
+    data = _read_bytes(png)
+    idat, palette, trns = [], None, None
+    for ctype, body in iter_chunks(data):
+        if ctype == b"IHDR":
+            w, h, depth, ctype_, _, _, interlace = struct.unpack(">IIBBBBB", body)
+        elif ctype == b"PLTE":
+            palette = numpy.frombuffer(body, dtype=numpy.uint8).reshape(-1, 3)
+        elif ctype == b"tRNS":
+            trns = body
+        elif ctype == b"IDAT":
+            idat.append(body)
+    if interlace:
+        raise RuntimeError("Interlaced PNGs are not supported.")
+
+    channels = _CHANNELS[ctype_]
+    bits = depth * channels
+    bpp = max(1, bits // 8)
+    stride = (w * bits + 7) // 8
+    raw = numpy.frombuffer(zlib.decompress(b"".join(idat)), dtype=numpy.uint8)
+    raw = raw[: h * (stride + 1)].reshape(h, stride + 1)
+    scanlines = _unfilter(raw[:, 1:], raw[:, 0], bpp)
+
+    # unpack the scanlines into samples
+    if depth == 16:
+        samples = scanlines.view(">u2").reshape(h, w, channels)
+        samples8 = (samples >> 8).astype(numpy.uint8)
+    elif depth == 8:
+        samples = samples8 = scanlines.reshape(h, w, channels)
+    else:
+        bitplane = numpy.unpackbits(scanlines, axis=1)[:, : w * depth]
+        weights = 1 << numpy.arange(depth - 1, -1, -1)
+        samples = (bitplane.reshape(h, w, depth) * weights).sum(axis=2)
+        samples = samples.astype(numpy.uint8)[..., None]
+        if ctype_ == 3:
+            samples8 = samples
+        else:
+            samples8 = (samples.astype(numpy.uint16) * 255 // (2 ** depth - 1))
+            samples8 = samples8.astype(numpy.uint8)
+
+    # expand to RGBA
+    image = numpy.full((h, w, 4), 255, dtype=numpy.uint8)
+    if ctype_ == 3:
+        idx = samples[..., 0]
+        image[..., :3] = palette[idx]
+        if trns is not None:
+            alpha = numpy.full(256, 255, dtype=numpy.uint8)
+            alpha[: len(trns)] = numpy.frombuffer(trns, dtype=numpy.uint8)
+            image[..., 3] = alpha[idx]
+    elif ctype_ in (0, 4):
+        image[..., :3] = samples8[..., :1]
+        if ctype_ == 4:
+            image[..., 3] = samples8[..., 1]
+        elif trns is not None:
+            (key,) = struct.unpack(">H", trns[:2])
+            image[samples[..., 0] == key, 3] = 0
+    else:
+        image[..., :channels] = samples8
+        if ctype_ == 2 and trns is not None:
+            key = numpy.array(struct.unpack(">HHH", trns[:6]))
+            image[(samples == key).all(axis=2), 3] = 0
+    return image
+
+
+def write_png(image, fname=None, compression=9, filter_type="adaptive"):
+    """Encode an array as a PNG.
+
+    Parameters
+    ----------
+
+    image : numpy.ndarray
+        ``(height, width)`` grayscale, ``(height, width, 3)`` RGB, or
+        ``(height, width, 4)`` RGBA array of ``uint8``.
+
+    fname : str (Optional - Default is None)
+        Write the PNG to this file name.
+
+    compression : int (Optional - Default is 9)
+        `zlib` compression level.
+
+    filter_type : int or str (Optional - Default is "adaptive")
+        PNG scanline filter. See `_filter()`.
+
+    Returns
+    -------
+
+    png : bytes
+        The encoded PNG.
+
+    """
+    image = numpy.ascontiguousarray(image, dtype=numpy.uint8)
+    if image.ndim == 2:
+        image = image[..., None]
+    h, w, channels = image.shape
+    ctype = {1: 0, 3: 2, 4: 6}[channels]
+    lines = _filter(image.reshape(h, w * channels), channels, filter_type)
+    ihdr = struct.pack(">IIBBBBB", w, h, 8, ctype, 0, 0, 0)
+    png = PNG_SIGNATURE
+    png += _chunk(b"IHDR", ihdr)
+    png += _chunk(b"IDAT", zlib.compress(lines.tobytes(), compression))
+    png += _chunk(b"IEND", b"")
+    if fname:
+        with open(fname, "wb") as f:
+            f.write(png)
+    return png
+
+
+# chunks needed to decode an image; everything else is metadata
+_CRITICAL = (b"IHDR", b"PLTE", b"tRNS", b"IDAT", b"IEND")
+
+# deflate level used to rank encodings before the final compression
+_TRIAL_LEVEL = 4
+
+# ancillary chunks which must precede PLTE
+_BEFORE_PLTE = (b"cHRM", b"gAMA", b"iCCP", b"sBIT", b"sRGB")
+
+
+def _assemble(ihdr, idat, plte=None, trns=None, ancillary=()):
+    """Serialize PNG chunks in the order required by the specification."""
+    png = PNG_SIGNATURE + _chunk(b"IHDR", ihdr)
+    for ctype, body in ancillary:
+        if ctype in _BEFORE_PLTE:
+            png += _chunk(ctype, body)
+    if plte is not None:
+        png += _chunk(b"PLTE", plte)
+    if trns is not None:
+        png += _chunk(b"tRNS", trns)
+    for ctype, body in ancillary:
+        if ctype not in _BEFORE_PLTE:
+            png += _chunk(ctype, body)
+    return png + _chunk(b"IDAT", idat) + _chunk(b"IEND", b"")
+
+
+def _reductions(image):
+    """Lossless encodings of an RGBA image, from smallest color type up.
+
+    Yields ``(color type, bit depth, scanlines, bpp, PLTE, tRNS)``.
+    """
+    h, w = image.shape[:2]
+    opaque = bool((image[..., 3] == 255).all())
+    gray = bool(
+        ((image[..., 0] == image[..., 1]) & (image[..., 1] == image[..., 2])).all()
+    )
+
+    # palette, with the translucent entries first to keep tRNS short
+    colors, index = numpy.unique(image.reshape(-1, 4).view(numpy.uint32), return_inverse=True)
+    if len(colors) <= 256:
+        rgba = colors.view(numpy.uint8).reshape(-1, 4)
+        order = numpy.argsort(rgba[:, 3] == 255, kind="stable")
+        rgba = rgba[order]
+        index = numpy.argsort(order)[index].astype(numpy.uint8).reshape(h, w)
+        depth = next(d for d in (1, 2, 4, 8) if len(rgba) <= 2 ** d)
+        if depth < 8:
+            bits = numpy.unpackbits(index[..., None], axis=2)[..., 8 - depth :]
+            lines = numpy.packbits(bits.reshape(h, w * depth), axis=1)
+        else:
+            lines = index
+        translucent = int((rgba[:, 3] < 255).sum())
+        trns = rgba[:translucent, 3].tobytes() if translucent else None
+        yield 3, depth, lines, 1, rgba[:, :3].tobytes(), trns
+
+    channels = [0] if gray else [0, 1, 2]
+    ctype = 0 if gray else 2
+    if not opaque:
+        channels.append(3)
+        ctype += 4
+    samples = image[..., channels]
+    yield ctype, 8, samples.reshape(h, -1), len(channels), None, None
+
+
+def optimize_png(
+    png,
+    filters=(0, 1, 2, 3, 4, "adaptive"),
+    strategies=(zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED),
+    keep_chunks=(),
+):
+    """Losslessly minimize the size of a PNG.
+
+    Every lossless reduction (a palette with transparency when there are at
+    most 256 colors, grayscale, dropping an opaque alpha channel) is encoded
+    with each scanline filter and deflate strategy, and the smallest is
+    compressed again with maximum effort. The result is only kept if it is
+    smaller than the input. Metadata chunks are removed.
+
+    Parameters
+    ----------
+
+    png : str or bytes
+        PNG file name or the PNG bytes themselves.
+
+    filters : iterable (Optional - Default is (0, 1, 2, 3, 4, "adaptive"))
+        Scanline filters to try. See `_filter()`.
+
+    strategies : iterable (Optional - Default is (Z_DEFAULT_STRATEGY, Z_FILTERED))
+        `zlib` compression strategies to try.
+
+    keep_chunks : iterable (Optional - Default is ())
+        Ancillary chunk types to keep, e.g. ``(b"pHYs",)``.
+
+    Returns
+    -------
+
+    png : bytes
+        The optimized PNG, or the original if nothing smaller was found.
+
+    report : dict
+        Sizes ``before`` and ``after`` in bytes, bytes ``saved``, and the
+        ``color_type``, ``bit_depth``, ``filter``, and ``strategy`` used.
+
+    """
+    data = _read_bytes(png)
+    chunks = list(iter_chunks(data))
+    ihdr = chunks[0][1]
+    _, _, depth, ctype, _, _, interlace = struct.unpack(">IIBBBBB", ihdr)
+    ancillary = [(t, b) for t, b in chunks if t in set(keep_chunks) - set(_CRITICAL)]
+    best = data
+    report = {"color_type": ctype, "bit_depth": depth, "filter": None, "strategy": None}
+
+    if depth == 16 or interlace:
+        # 16 bit samples and interlacing cannot be re-encoded losslessly
+        # here, so only the metadata is removed
+        get = dict(chunks).get
+        idat = b"".join(b for t, b in chunks if t == b"IDAT")
+        candidate = _assemble(ihdr, idat, get(b"PLTE"), get(b"tRNS"), ancillary)
+        best = candidate if len(candidate) < len(best) else best
+    else:
+        image = read_png(data)
+        h, w = image.shape[:2]
+        # rank every combination with a fast deflate level, then compress
+        # only the most promising one with maximum effort
+        trials = []
+        for ctype, depth, lines, bpp, plte, trns in _reductions(image):
+            candidates = _filter_candidates(lines, bpp)
+            for filter_type in filters:
+                raw = _filter(lines, bpp, filter_type, candidates).tobytes()
+                for strategy in strategies:
+                    compressor = zlib.compressobj(_TRIAL_LEVEL, zlib.DEFLATED, 15, 9, strategy)
+                    size = len(compressor.compress(raw) + compressor.flush())
+                    if not trials or size < trials[0]:
+                        trials = [size, ctype, depth, plte, trns, filter_type, strategy, raw]
+        _, ctype, depth, plte, trns, filter_type, strategy, raw = trials
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        idat = compressor.compress(raw) + compressor.flush()
+        header = struct.pack(">IIBBBBB", w, h, depth, ctype, 0, 0, 0)
+        candidate = _assemble(header, idat, plte, trns, ancillary)
+        if len(candidate) < len(best):
+            best = candidate
+            report.update(
+                color_type=ctype, bit_depth=depth, filter=filter_type, strategy=strategy
+            )
+    report.update(before=len(data), after=len(best), saved=len(data) - len(best))
+    return best, report
+
+
+def optimize_png_file(fname, out=None, **kwargs):
+    """Optimize a .png file in place (or into `out`).
+
+    ``kwargs`` are passed on to `optimize_png()`. Returns its report.
+    """
+    data, report = optimize_png(fname, **kwargs)
+    if out or report["saved"]:
+        with open(out or fname, "wb") as f:
+            f.write(data)
+    return report
+
+
+def composite(image, rgb, padding=0):
+    """Flatten an RGBA image onto a solid background color.
+
+    Parameters
+    ----------
+
+    image : numpy.ndarray
+        ``(height, width, 4)`` RGBA array of ``uint8``.
+
+    rgb : tuple
+        Background ``(r, g, b)`` integers.
+
+    padding : int or tuple (Optional - Default is 0)
+        Background margin in pixels added around the image. A tuple
+        is interpreted as ``(before, after)`` and applied to both axes,
+        a pair of tuples as ``((top, bottom), (left, right))``.
+
+    Returns
+    -------
+
+    flattened : numpy.ndarray
+        ``(height, width, 3)`` RGB array of ``uint8``.
+
+    """
+    if isinstance(padding, int):
+        padding = padding, padding
+    if isinstance(padding[0], int):
+        padding = padding, padding
+    (top, bottom), (left, right) = padding
+    background = numpy.asarray(rgb, dtype=numpy.float32)
+    alpha = image[..., 3:].astype(numpy.float32) / 255.0
+    flat = image[..., :3].astype(numpy.float32) * alpha + background * (1.0 - alpha)
+    h, w = image.shape[:2]
+    canvas = numpy.empty((h + top + bottom, w + left + right, 3), numpy.uint8)
+    canvas[:] = numpy.asarray(rgb, dtype=numpy.uint8)
+    canvas[top : top + h, left : left + w] = numpy.rint(flat)
+    return canvas
+
+
+def _area_weights(source, target):
+    """``(target, source)`` matrix averaging source pixels into target pixels."""
+    edges = numpy.linspace(0, source, target + 1)
+    lo, hi = edges[:-1, None], edges[1:, None]
+    pixels = numpy.arange(source)[None, :]
+    overlap = numpy.clip(numpy.minimum(hi, pixels + 1) - numpy.maximum(lo, pixels), 0, None)
+    return (overlap / overlap.sum(axis=1, keepdims=True)).astype(numpy.float32)
+
+
+def resize(image, width, height=None):
+    """Downscale an RGBA image by area averaging.
+
+    Parameters
+    ----------
+
+    image : numpy.ndarray
+        ``(height, width, 4)`` RGBA array of ``uint8``.
+
+    width : int
+        Target width in pixels.
+
+    height : int (Optional - Default is None)
+        Target height in pixels. Defaults to keeping the aspect ratio.
+
+    Returns
+    -------
+
+    resized : numpy.ndarray
+        ``(height, width, 4)`` RGBA array of ``uint8``.
+
+    """
+    h, w = image.shape[:2]
+    if height is None:
+        height = max(1, int(round(h * width / float(w))))
+    # average premultiplied colors so transparent pixels do not bleed
+    pixels = image.astype(numpy.float32)
+    pixels[..., :3] *= pixels[..., 3:] / 255.0
+    rows, cols = _area_weights(h, height), _area_weights(w, width)
+    out = numpy.einsum("yh,hwc,xw->yxc", rows, pixels, cols, optimize=True)
+    alpha = out[..., 3:]
+    out[..., :3] = numpy.where(alpha > 0, out[..., :3] * 255.0 / numpy.maximum(alpha, 1e-6), 0)
+    return numpy.clip(numpy.rint(out), 0, 255).astype(numpy.uint8)
@@ -0,0 +1,169 @@
+"""Swap colors in a rendered vector SVG logo without recompiling.
+
+Node colors reach the SVG as solid ``fill``/``stroke`` values, and the
+mindmap connections between the concept and its children as gradients
+whose stops are interpolated between the parent and child colors. A
+document is parsed once into literal segments and color slots (cached per
+document), so each recoloring is only a lookup and a join.
+"""
+
+import functools
+import re
+
+import numpy
+
+from .colors import color_to_rgb, rgb_to_hex
+
+_COLOR = re.compile(
+    rb"(?P<key>fill|stroke|stop-color|flood-color)(?P<sep>=[\"']|:\s*)"
+    rb"(?P<color>#[0-9a-fA-F]{6}\b|#[0-9a-fA-F]{3}\b|rgb\([^)]*\))"
+)
+
+
+def _parse_svg_color(token):
+    """Parse an SVG color token to float RGB values in 0-255."""
+    token = token.decode().strip()
+    if token.startswith("#"):
+        token = token[1:]
+        if len(token) == 3:
+            token = "".join(c * 2 for c in token)
+        return tuple(float(int(token[i : i + 2], 16)) for i in range(0, 6, 2))
+    values = []
+    for v in token[4:-1].split(","):
+        v = v.strip()
+        if v.endswith("%"):
+            values.append(float(v[:-1]) * 2.55)
+        else:
+            values.append(float(v))
+    return tuple(values)
+
+
+@functools.lru_cache(maxsize=32)
+def _template(svg):
+    """Split an SVG into literal segments and color slots.
+
+    Returns the literal segments (one more than the slots), the color token
+    of each slot, whether each slot is a gradient stop, and the parsed RGB
+    value of each distinct token.
+    """
+    segments, tokens, stops = [], [], []
+    last = 0
+    for m in _COLOR.finditer(svg):
+        segments.append(svg[last : m.start("color")])
+        tokens.append(m.group("color"))
+        stops.append(m.group("key") == b"stop-color")
+        last = m.end("color")
+    segments.append(svg[last:])
+    parsed = {t: _parse_svg_color(t) for t in set(tokens)}
+    return tuple(segments), tuple(tokens), tuple(stops), parsed
+
+
+def _interpolate(colors, anchors, targets, tolerance):
+    """Remap colors lying on a segment between two anchor colors.
+
+    For every color, find an anchor pair ``(a, b)`` such that
+    ``color ~ a + t (b - a)`` and return ``a' + t (b' - a')``. Colors not
+    on any segment are returned as ``None``.
+    """
+    remapped = [None] * len(colors)
+    if len(anchors) < 2 or not colors:
+        return remapped
+    c = numpy.asarray(colors, dtype=float)[:, None, None, :]
+    a = numpy.asarray(anchors, dtype=float)
+    ta = numpy.asarray(targets, dtype=float)
+    d = a[None, :, :] - a[:, None, :]
+    length2 = (d ** 2).sum(axis=2)
+    length2[length2 == 0] = numpy.inf
+    t = ((c - a[:, None, :]) * d).sum(axis=3) / length2
+    residual = c - (a[:, None, :] + t[..., None] * d)
+    distance = numpy.sqrt((residual ** 2).sum(axis=3))
+    distance[(t < 0) | (t > 1)] = numpy.inf
+    for k in range(len(colors)):
+        i, j = numpy.unravel_index(distance[k].argmin(), distance[k].shape)
+        if distance[k, i, j] <= tolerance:
+            remapped[k] = ta[i] + t[k, i, j] * (ta[j] - ta[i])
+    return remapped
+
+
+def recolor(svg_bytes, mapping, color_format="RGB", tolerance=2.0):
+    """Replace colors in a vector SVG logo.
+
+    Parameters
+    ----------
+
+    svg_bytes : bytes or str
+        SVG document, e.g. the contents of a logo created with
+        ``create_logo(fmat="svg")`` and a vector converter.
+
+    mapping : dict
+        Old color to new color. Keys and values are (color name, color code)
+        tuples (as found in a theme's ``node_info``) or bare color codes.
+
+    color_format : str (Optional - Default is "RGB")
+        Color system of the codes in ``mapping``. See `color_to_rgb()`.
+
+    tolerance : float (Optional - Default is 2.0)
+        Maximum RGB distance (0-255 scale) for a document color to be
+        considered a match. Converters round colors, so exact equality
+        is too strict.
+
+    Returns
+    -------
+
+    svg : bytes or str
+        The recolored SVG, of the same type as ``svg_bytes``.
+
+    Examples
+    --------
+
+    >>> import logo
+    >>> svg = open("logo.svg", "rb").read()
+    >>> old = logo.canon2020_theme_transparent["node_info"][0, 0]
+    >>> new = logo.recolor(svg, {old: "#ff0000"})
+
+    """
+    as_text = isinstance(svg_bytes, str)
+    svg = svg_bytes.encode() if as_text else bytes(svg_bytes)
+    segments, tokens, stops, parsed = _template(svg)
+    if not tokens:
+        raise RuntimeError(
+            "No vector colors found. Was the SVG converted from a raster image?"
+        )
+
+    sources = [color_to_rgb(k, color_format) for k in mapping]
+    targets = [color_to_rgb(v, color_format) for v in mapping.values()]
+    src = numpy.asarray(sources, dtype=float)
+
+    # solid fills anchor the gradients, whether they are remapped or not
+    anchors = list(sources) + [parsed[t] for t, s in zip(tokens, stops) if not s]
+    anchors = list(dict.fromkeys(tuple(float(v) for v in a) for a in anchors))
+    anchor_targets = []
+    for anchor in anchors:
+        distance = numpy.sqrt(((src - anchor) ** 2).sum(axis=1))
+        k = distance.argmin()
+        anchor_targets.append(targets[k] if distance[k] <= tolerance else anchor)
+
+    # resolve every distinct document color once
+    replacement = {}
+    unmatched = []
+    for token, color in parsed.items():
+        distance = numpy.sqrt(((src - color) ** 2).sum(axis=1))
+        k = distance.argmin()
+        if distance[k] <= tolerance:
+            replacement[token] = rgb_to_hex(targets[k]).encode()
+        else:
+            unmatched.append(token)
+    unmatched_colors = [parsed[t] for t in unmatched]
+    remapped = _interpolate(unmatched_colors, anchors, anchor_targets, tolerance)
+    for token, new in zip(unmatched, remapped):
+        if new is not None:
+            new = numpy.clip(numpy.rint(new), 0, 255).astype(int)
+            replacement[token] = rgb_to_hex(new).encode()
+
+    # stitch the document back together
+    out = [segments[0]]
+    for token, segment in zip(tokens, segments[1:]):
+        out.append(replacement.get(token, token))
+        out.append(segment)
+    out = b"".join(out)
+    return out.decode() if as_text else out
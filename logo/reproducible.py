@@ -0,0 +1,153 @@
+"""Byte-identical renders for caching and content-addressed storage.
+
+By default the same theme gives different bytes on every run: the PDF
+carries its creation date and a random trailer ID, ImageMagick stamps
+.png files with ``tIME`` and ``date:create``/``date:modify`` text chunks
+(also inside the PNGs embedded in an .svg or .ico), and SVG converters add
+metadata and comments. With `create_logo(deterministic=True)`:
+
+    - TeX runs with a fixed ``SOURCE_DATE_EPOCH`` (``$SOURCE_DATE_EPOCH``
+      if set, else 0) and ``FORCE_SOURCE_DATE=1``,
+    - LuaTeX leaves out the creation and modification dates and writes a
+      trailer ID derived from the .tex document (`pdf_settings()`), and
+    - the products are stripped of time stamps and metadata
+      (`strip_file()`).
+"""
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+import struct
+
+from . import raster
+
+# .png chunks carrying time stamps or free text (dates, software, paths)
+VOLATILE_CHUNKS = (b"tIME", b"tEXt", b"zTXt", b"iTXt")
+
+# `\pdfvariable suppressoptionalinfo` bits: CreationDate (32), ModDate (64)
+_SUPPRESS_DATES = 32 + 64
+
+_SVG_VOLATILE = re.compile(r"<!--.*?-->\s*|<metadata\b.*?</metadata>\s*|<metadata\b[^>]*/>\s*", re.S)
+
+# PNGs embedded in an .svg (e.g. by ImageMagick), base64 may be wrapped
+_SVG_PNG = re.compile(r"(data:image/png;base64,)([A-Za-z0-9+/=\s]+)")
+
+
+def source_date_epoch():
+    """The fixed build time: ``$SOURCE_DATE_EPOCH`` or 0."""
+    return os.environ.get("SOURCE_DATE_EPOCH") or "0"
+
+
+def tex_env(env=None):
+    """Environment for a TeX run with a fixed date.
+
+    Parameters
+    ----------
+
+    env : dict (Optional - Default is None)
+        Base environment. Defaults to the current environment.
+
+    """
+    env = dict(os.environ if env is None else env)
+    env["SOURCE_DATE_EPOCH"] = source_date_epoch()
+    # also use the fixed date for \today and friends
+    env["FORCE_SOURCE_DATE"] = "1"
+    return env
+
+
+def pdf_settings(document):
+    """LuaTeX preamble lines dropping the PDF dates and fixing the trailer ID.
+
+    The ID is derived from the .tex ``document``, so it only changes with
+    the content. Other engines skip the lines (XeTeX reads the date from
+    ``SOURCE_DATE_EPOCH``).
+    """
+    digest = hashlib.md5(document.encode("utf-8")).hexdigest().upper()
+    return r"""
+    \ifdefined\pdfvariable
+        \pdfvariable suppressoptionalinfo %d
+        \pdfvariable trailerid {[<%s> <%s>]}
+    \fi""" % (
+        _SUPPRESS_DATES,
+        digest,
+        digest,
+    )
+
+
+def strip_png(png):
+    """PNG bytes without time stamp and text chunks."""
+    data = raster._read_bytes(png)
+    stripped = raster.PNG_SIGNATURE
+    for ctype, body in raster.iter_chunks(data):
+        if ctype not in VOLATILE_CHUNKS:
+            stripped += raster._chunk(ctype, body)
+    return stripped
+
+
+def _strip_data_uri(match):
+    try:
+        png = base64.b64decode("".join(match.group(2).split()), validate=True)
+    except (binascii.Error, ValueError):
+        return match.group(0)
+    if not png.startswith(raster.PNG_SIGNATURE):
+        return match.group(0)
+    stripped = strip_png(png)
+    if stripped == png:
+        return match.group(0)
+    return match.group(1) + base64.b64encode(stripped).decode("ascii")
+
+
+def strip_svg(svg):
+    """SVG bytes without comments, ``<metadata>``, and the time stamps and
+    text chunks of embedded ``data:image/png;base64`` images."""
+    text = _SVG_VOLATILE.sub("", svg.decode("utf-8"))
+    return _SVG_PNG.sub(_strip_data_uri, text).encode("utf-8")
+
+
+def strip_ico(ico):
+    """.ico bytes with every PNG entry stripped (see `strip_png()`).
+
+    BMP entries carry no time stamps and are kept as they are.
+    """
+    reserved, kind, count = struct.unpack("<HHH", ico[:6])
+    entries, images = [], []
+    for i in range(count):
+        entry = list(struct.unpack("<BBBBHHII", ico[6 + 16 * i : 22 + 16 * i]))
+        size, offset = entry[6:]
+        image = ico[offset : offset + size]
+        if image.startswith(raster.PNG_SIGNATURE):
+            image = strip_png(image)
+        entries.append(entry)
+        images.append(image)
+    data = struct.pack("<HHH", reserved, kind, count)
+    offset = 6 + 16 * count
+    for entry, image in zip(entries, images):
+        data += struct.pack("<BBBBHHII", *entry[:6], len(image), offset)
+        offset += len(image)
+    return data + b"".join(images)
+
+
+def strip_file(fname):
+    """Strip the time stamps and metadata of a .png, .svg, or .ico in place.
+
+    Returns
+    -------
+
+    stripped : bool
+        Whether the file changed.
+
+    """
+    ext = fname.rsplit(".", 1)[-1].lower()
+    strip = {"png": strip_png, "svg": strip_svg, "ico": strip_ico}.get(ext)
+    if strip is None:
+        return False
+    with open(fname, "rb") as f:
+        data = f.read()
+    stripped = strip(data)
+    if stripped == data:
+        return False
+    with open(fname, "wb") as f:
+        f.write(stripped)
+    return True
@@ -0,0 +1,358 @@
+"""Small local HTTP service that renders themed logos on demand.
+
+    $ python -m logo.server --port 8000 --workers 2
+
+    GET /logo?theme=canon2020_theme_transparent&fmat=svg
+    GET /logo?theme=canon2020_theme_transparent&background=dark
+    GET /logo?kind=nav_logo&theme=canon2020_theme_transparent&nav=psnav_1line
+    GET /logo?kind=favicon&theme=traditional_theme_transparent&resolutions=32,16
+
+Renders run in a bounded pool of worker processes. Concurrent identical
+requests are coalesced into a single render, and results are served from
+an in-memory LRU backed by the on-disk `logo.cache.RenderCache`.
+
+Query values end up in the TeX source, so they are restricted to known
+names (`ALLOWED_VALUES`, the theme, nav logo, and node text registries,
+and the fonts the service was started with), and ``concept_text`` may not
+contain TeX special characters. TeX runs without ``--shell-escape``: logos
+are compiled to .pdf and converted outside of TeX (see `render_bytes()`),
+and favicons are drawn without TeX at all (see `logo.icons`).
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import http.server
+import os
+import re
+import shutil
+import tempfile
+import threading
+import urllib.parse
+
+from . import batch
+from . import convert
+from . import icons
+from . import image_set
+from . import validate
+from .cache import RenderCache, cache_key
+from .fonts import DEFAULT_FONT
+from .predefined import BACKGROUNDS, NAV_LOGOS, NODE_TEXT
+
+# query parameters passed through to the batch job
+QUERY_PARAMS = (
+    "kind",
+    "theme",
+    "background",
+    "nav",
+    "node_text",
+    "fmat",
+    "concept_text",
+    "concept_font_style",
+    "concept_font_size",
+    "font",
+    "resolutions",
+)
+
+# fixed choices for query parameters that are written into the .tex file
+ALLOWED_VALUES = {
+    "kind": batch.KINDS,
+    "fmat": ("png", "svg", "pdf", "jpg"),
+    "concept_font_style": (
+        "bfseries",
+        "mdseries",
+        "itshape",
+        "slshape",
+        "scshape",
+        "upshape",
+        "normalfont",
+    ),
+    "concept_font_size": (
+        "tiny",
+        "scriptsize",
+        "footnotesize",
+        "small",
+        "normalsize",
+        "large",
+        "Large",
+        "LARGE",
+        "huge",
+        "Huge",
+    ),
+}
+
+# favicon resolutions, at most `logo.icons.SIMPLIFIED_SIZE` so they are
+# drawn without TeX
+FAVICON_RESOLUTIONS = (16, 24, 32)
+
+# width of .png and .jpg logos rasterized from the .pdf
+RASTER_WIDTH = 2048
+
+# characters with a special meaning in TeX
+_TEX_SPECIAL = re.compile(r"[\\{}%#$&~^]")
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "pdf": "application/pdf",
+    "jpg": "image/jpeg",
+    "ico": "image/x-icon",
+    "tex": "text/plain; charset=utf-8",
+}
+
+
+def _convert_pdf(pdf, fmat):
+    """Convert a compiled .pdf to `fmat` outside of TeX."""
+    if fmat == "pdf":
+        return pdf
+    out = "%s.%s" % (os.path.splitext(pdf)[0], fmat)
+    if fmat == "svg":
+        convert.pdf_to_svg([pdf], [out])
+        return out
+    rasterizers = image_set.available_rasterizers()
+    if not rasterizers:
+        raise RuntimeError("No rasterizer (%s) found." % ", ".join(image_set.RASTERIZERS))
+    image_set._rasterize(rasterizers[0], pdf, RASTER_WIDTH, fmat, out)
+    return out
+
+
+def render_bytes(job):
+    """Run a batch job in a scratch directory and return the product bytes.
+
+    A job with a ``convert_to`` format is compiled to .pdf and converted
+    afterwards (see `LogoService.job_from_query()`).
+    """
+    scratch = tempfile.mkdtemp(prefix="logo-server-")
+    job = dict(job, kwargs=dict(job["kwargs"], move_to=scratch))
+    try:
+        result = batch.run_job(job)
+        if result["error"]:
+            raise RuntimeError(result["error"])
+        product = os.path.join(scratch, batch.product_name(job))
+        if job.get("convert_to"):
+            product = _convert_pdf(product, job["convert_to"])
+        with open(product, "rb") as f:
+            return f.read()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+class LogoService:
+    """Render, coalesce, and cache logo requests.
+
+    Parameters
+    ----------
+
+    workers : int (Optional - Default is 2)
+        Maximum number of concurrent renders.
+
+    cache_dir : str (Optional - Default is None)
+        On-disk cache directory. See `logo.cache.default_cache_dir()`.
+
+    lru_size : int (Optional - Default is 64)
+        Number of renders kept in memory.
+
+    fonts : iterable (Optional - Default is ("M+ 1mn",))
+        Fonts requests may ask for.
+
+    """
+
+    def __init__(self, workers=2, cache_dir=None, lru_size=64, fonts=(DEFAULT_FONT,)):
+        self.fonts = tuple(fonts)
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        self.disk = RenderCache(cache_dir)
+        self.lru = collections.OrderedDict()
+        self.lru_size = lru_size
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.stats = collections.Counter()
+
+    def job_from_query(self, query):
+        """Translate query parameters into ``(cache key, extension, job)``."""
+        unknown = set(query) - set(QUERY_PARAMS)
+        if unknown:
+            raise ValueError("Unknown parameters: %s" % ", ".join(sorted(unknown)))
+        entry = dict(query)
+        self._check_query(entry)
+        kind = entry.pop("kind", "logo")
+        background = entry.pop("background", None)
+        if background:
+            if background not in BACKGROUNDS:
+                raise ValueError("'%s' background not found." % background)
+            entry["background_color"] = BACKGROUNDS[background]
+        entry["name"] = "logo"
+        try:
+            (job,) = batch.build_jobs({kind: [entry]})
+        except (RuntimeError, KeyError) as e:
+            raise ValueError(str(e))
+        ((job, errors),) = validate.validate_jobs([job])
+        if errors:
+            raise ValueError("Invalid theme: %s" % "; ".join(errors))
+        if kind == "favicon":
+            ext = "ico"
+            resolutions = ",".join(str(r) for r in reversed(FAVICON_RESOLUTIONS))
+            job["kwargs"].setdefault("resolutions", resolutions)
+            # every resolution is drawn from the theme, there is no TeX run
+            job["kwargs"]["simplified_size"] = icons.SIMPLIFIED_SIZE
+        else:
+            # compile without --shell-escape, convert the .pdf afterwards
+            ext = job["kwargs"].get("fmat", "png")
+            job["kwargs"].update(fmat="pdf", convert_tikz="")
+            job["convert_to"] = ext
+        return cache_key(job), ext, job
+
+    def _check_query(self, query):
+        """Reject query values that are not one of the allowed choices."""
+        allowed = dict(
+            ALLOWED_VALUES,
+            nav=tuple(NAV_LOGOS),
+            node_text=tuple(NODE_TEXT),
+            font=self.fonts,
+        )
+        for key, choices in allowed.items():
+            if key in query and query[key] not in choices:
+                err_msg = "%s: '%s' is not one of %s."
+                raise ValueError(err_msg % (key, query[key], ", ".join(choices)))
+        if _TEX_SPECIAL.search(query.get("concept_text", "")):
+            raise ValueError("concept_text: TeX special characters are not allowed.")
+        if "resolutions" in query:
+            sizes = query["resolutions"].split(",")
+            allowed = [str(r) for r in FAVICON_RESOLUTIONS]
+            if not all(size in allowed for size in sizes):
+                err_msg = "resolutions: must be a comma separated list of %s."
+                raise ValueError(err_msg % ", ".join(allowed))
+
+    def _remember(self, key, value):
+        with self.lock:
+            self.lru[key] = value
+            self.lru.move_to_end(key)
+            while len(self.lru) > self.lru_size:
+                self.lru.popitem(last=False)
+
+    def get(self, query):
+        """Return ``(data, extension, key)`` for a request."""
+        key, ext, job = self.job_from_query(query)
+        with self.lock:
+            if key in self.lru:
+                self.lru.move_to_end(key)
+                self.stats["memory"] += 1
+                return self.lru[key], ext, key
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self.inflight[key] = concurrent.futures.Future()
+            else:
+                self.stats["coalesced"] += 1
+        if not owner:
+            return future.result(), ext, key
+
+        # this request owns the render; everyone else waits on `future`
+        try:
+            data = self.disk.get(key, ext)
+            if data is None:
+                self.stats["rendered"] += 1
+                data = self.pool.submit(render_bytes, job).result()
+                self.disk.put(key, ext, data)
+            else:
+                self.stats["disk"] += 1
+            self._remember(key, data)
+            future.set_result(data)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.inflight[key]
+        return data, ext, key
+
+    def close(self):
+        self.pool.shutdown()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def _send(self, status, body, content_type="text/plain; charset=utf-8", etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "public, max-age=86400")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        service = self.server.service
+        if url.path == "/health":
+            stats = ", ".join("%s=%d" % kv for kv in sorted(service.stats.items()))
+            self._send(200, ("ok %s\n" % stats).encode())
+            return
+        if url.path != "/logo":
+            self._send(404, b"not found\n")
+            return
+        query = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()}
+        try:
+            data, ext, key = service.get(query)
+        except ValueError as e:
+            self._send(400, ("%s\n" % e).encode())
+            return
+        except Exception as e:
+            self._send(500, ("%s\n" % e).encode())
+            return
+        etag = '"%s"' % key
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self._send(200, data, CONTENT_TYPES.get(ext, "application/octet-stream"), etag)
+
+
+def make_server(host="127.0.0.1", port=8000, **kwargs):
+    """Create (but do not start) the HTTP server.
+
+    ``kwargs`` are passed on to `LogoService`. Call ``serve_forever()`` on
+    the result, and ``server.service.close()`` when done.
+    """
+    server = http.server.ThreadingHTTPServer((host, port), _Handler)
+    server.service = LogoService(**kwargs)
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m logo.server", description="Serve themed logos over HTTP."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2, help="concurrent renders")
+    parser.add_argument("--cache-dir", default=None, help="on-disk cache directory")
+    parser.add_argument("--lru-size", type=int, default=64, help="renders kept in memory")
+    parser.add_argument(
+        "--font",
+        action="append",
+        dest="fonts",
+        help="font requests may ask for (repeatable, default: %s)" % DEFAULT_FONT,
+    )
+    args = parser.parse_args(argv)
+
+    server = make_server(
+        args.host,
+        args.port,
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+        lru_size=args.lru_size,
+        fonts=args.fonts or (DEFAULT_FONT,),
+    )
+    print("Serving logos on http://%s:%d/logo" % server.server_address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Logos, navigation logos, and favicons for PySAL submodules.
+
+Every submodule is a registry entry of a name, a long description, and
+colors; its themes and navigation logo text are generated from the entry
+(see `submodule_theme()` and `logo.layout.nav_logo()`), so adding a
+submodule takes one line instead of a hand-tuned theme and nav constant::
+
+    >>> import logo
+    >>> logo.register_submodule("esda", r"\\textbf{e}xploratory \\textbf{s}patial \\textbf{d}ata \\textbf{a}nalysis", "canon2020")
+    >>> logo.create_submodule_logos(["spaghetti", "esda"], workers=4)
+
+`create_submodule_logos()` renders the whole set with the batch renderer
+(see `logo.batch.run_jobs()`). Products are stored in the render cache
+(see `logo.cache.RenderCache`) under a key of everything that determines
+them, so a rerun only compiles the entries that changed.
+"""
+
+import os
+import shutil
+import tempfile
+
+from . import batch
+from .cache import RenderCache, cache_key
+from .fonts import DEFAULT_FONT
+from .layout import nav_logo
+from . import predefined
+from .predefined import CHILD_NODES, spaghetti_full
+
+KINDS = ("logo", "nav_logo", "favicon")
+
+# registered submodules by name
+SUBMODULES = {}
+
+
+def register_submodule(name, description, colors, concept_color=None, text_color=None):
+    """Register a submodule.
+
+    Parameters
+    ----------
+
+    name : str
+        Package name without the "pysal/" prefix, e.g. "spaghetti".
+
+    description : str
+        Long name shown under "pysal/<name>" in the navigation logo. May
+        contain TeX markup, e.g. ``\\textbf{}`` for the letters of the name.
+
+    colors : str or list
+        A LaTeX color name for all nodes, a theme color set such as
+        "canon2020", or a list of LaTeX color names, one per node.
+
+    concept_color : str (Optional - Default is None)
+        LaTeX color name of the concept. Defaults to the theme default.
+
+    text_color : str (Optional - Default is None)
+        LaTeX color name of the text. Defaults to the theme default.
+
+    """
+    SUBMODULES[name] = {
+        "name": name,
+        "description": description,
+        "colors": colors,
+        "concept_color": concept_color,
+        "text_color": text_color,
+    }
+
+
+register_submodule("spaghetti", spaghetti_full, "arylideyellow", concept_color="vividauburn")
+
+
+def _entry(entry):
+    """A registry entry from a name, a tuple, or a dict."""
+    if isinstance(entry, str):
+        if entry not in SUBMODULES:
+            raise RuntimeError("'%s' submodule not registered." % entry)
+        return SUBMODULES[entry]
+    if isinstance(entry, (list, tuple)):
+        keys = ("name", "description", "colors", "concept_color", "text_color")
+        entry = dict(zip(keys, entry))
+    return dict({"concept_color": None, "text_color": None}, **entry)
+
+
+def submodule_theme(entry, background="transparent"):
+    """`create_logo()` theme of a submodule.
+
+    Parameters
+    ----------
+
+    entry : str, tuple, or dict
+        A registered name, or a ``(name, description, colors)`` entry
+        (see `register_submodule()`).
+
+    background : str (Optional - Default is "transparent")
+        "transparent", "light", or "dark".
+
+    """
+    entry = _entry(entry)
+    colors = entry["colors"]
+    if isinstance(colors, str) and colors in predefined.latex_color_codes:
+        colors = [colors] * CHILD_NODES
+    return batch.resolve_theme(
+        {
+            "colors": colors,
+            "background": background,
+            "concept_color": entry["concept_color"],
+            "text_color": entry["text_color"],
+        }
+    )
+
+
+def submodule_nav(entry, font=DEFAULT_FONT, max_width=None):
+    """Navigation logo text of a submodule, see `logo.layout.nav_logo()`."""
+    entry = _entry(entry)
+    return nav_logo(
+        "pysal/%s" % entry["name"], entry["description"], font=font, max_width=max_width
+    )
+
+
+def submodule_jobs(
+    entries=None,
+    kinds=KINDS,
+    backgrounds=("transparent",),
+    fmat="png",
+    nav_fmat="svg",
+    **kwargs
+):
+    """Batch jobs for the logos of submodules.
+
+    Targets are named ``<name>_logo``, ``<name>_nav_logo``, and
+    ``<name>_logo_favicon``, with a ``_<background>`` suffix for
+    backgrounds other than "transparent".
+
+    Parameters
+    ----------
+
+    entries : list (Optional - Default is None)
+        Registered names or entries (see `submodule_theme()`). Defaults to
+        every registered submodule.
+
+    kinds : iterable (Optional - Default is ("logo", "nav_logo", "favicon"))
+        Targets per submodule.
+
+    backgrounds : iterable (Optional - Default is ("transparent",))
+        A set of targets per background.
+
+    fmat : str (Optional - Default is "png")
+        Format of the logos.
+
+    nav_fmat : str (Optional - Default is "svg")
+        Format of the navigation logos.
+
+    **kwargs : see `create_logo()`
+        Passed on to every target, e.g. ``font`` or ``engine``.
+
+    Returns
+    -------
+
+    jobs : list
+        See `logo.batch.build_jobs()`.
+
+    """
+    if entries is None:
+        entries = list(SUBMODULES)
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        raise RuntimeError("Unknown targets: %s" % ", ".join(sorted(unknown)))
+    font = kwargs.get("font", DEFAULT_FONT)
+    jobs = []
+    for entry in map(_entry, entries):
+        nav = submodule_nav(entry, font) if "nav_logo" in kinds else None
+        for background in backgrounds:
+            suffix = "" if background == "transparent" else "_%s" % background
+            theme = submodule_theme(entry, background)
+            name = entry["name"]
+            for kind in KINDS:
+                if kind not in kinds:
+                    continue
+                job_kwargs = dict(theme, **kwargs)
+                if kind == "logo":
+                    job_kwargs.setdefault("fmat", fmat)
+                    jobname = "%s_logo%s" % (name, suffix)
+                else:
+                    job_kwargs["concept_text"] = ""
+                if kind == "nav_logo":
+                    job_kwargs.setdefault("fmat", nav_fmat)
+                    job_kwargs["nav_logo"] = nav
+                    jobname = "%s_nav_logo%s" % (name, suffix)
+                if kind == "favicon":
+                    jobname = "%s_logo%s" % (name, suffix)
+                jobs.append({"kind": kind, "name": jobname, "kwargs": job_kwargs})
+    return jobs
+
+
+def _job_key(job):
+    """Cache key of everything but the target name and output directory."""
+    kwargs = {k: v for k, v in job["kwargs"].items() if k != "move_to"}
+    return cache_key("submodule", job["kind"], kwargs)
+
+
+def create_submodule_logos(
+    entries=None,
+    move_to="submodule_examples",
+    kinds=KINDS,
+    backgrounds=("transparent",),
+    fmat="png",
+    nav_fmat="svg",
+    workers=1,
+    threads=False,
+    stages=None,
+    cache=True,
+    dry_run=False,
+    **kwargs
+):
+    """
+
+    Create the logos, navigation logos, and favicons of submodules.
+
+    Parameters
+    ----------
+
+    entries, kinds, backgrounds, fmat, nav_fmat : see `submodule_jobs()`
+
+    move_to : str (Optional - Default is "submodule_examples")
+        Output directory.
+
+    workers, threads, stages : see `logo.batch.run_jobs()`
+
+    cache : bool or logo.cache.RenderCache (Optional - Default is True)
+        Reuse products rendered before, by default from
+        `logo.cache.default_cache_dir()`.
+
+    dry_run : bool (Optional - Default is False)
+        Only write the .tex files. Nothing is read from or stored in the
+        cache.
+
+    **kwargs : see `create_logo()`
+
+    Returns
+    -------
+
+    results : list
+        One `logo.batch.run_job()` result per target, with ``cached`` set
+        for products copied from the cache.
+
+    Examples
+    --------
+
+    >>> import logo
+    >>> logo.create_submodule_logos(["spaghetti"], backgrounds=("light", "dark"))
+
+    """
+
+    jobs = submodule_jobs(entries, kinds, backgrounds, fmat, nav_fmat, **kwargs)
+    destination = os.path.abspath(move_to or os.curdir)
+    os.makedirs(destination, exist_ok=True)
+    for job in jobs:
+        job["kwargs"]["move_to"] = destination
+    store = None if dry_run else RenderCache() if cache is True else cache or None
+
+    # copy cached products, render the rest
+    results = [None] * len(jobs)
+    missing = []
+    for i, job in enumerate(jobs):
+        product = batch.product_name(job)
+        ext = product.rsplit(".", 1)[1]
+        cached = store.path(_job_key(job), ext) if store else None
+        if cached and os.path.exists(cached):
+            fd, tmp = tempfile.mkstemp(dir=destination, suffix=".tmp")
+            os.close(fd)
+            shutil.copyfile(cached, tmp)
+            os.replace(tmp, os.path.join(destination, product))
+            results[i] = {
+                "kind": job["kind"],
+                "name": job["name"],
+                "seconds": 0.0,
+                "error": None,
+                "cached": True,
+            }
+        else:
+            missing.append(i)
+
+    ran = batch.run_jobs(
+        [jobs[i] for i in missing],
+        workers=workers,
+        dry_run=dry_run,
+        threads=threads,
+        stages=stages,
+    )
+    for i, result in zip(missing, ran):
+        results[i] = dict(result, cached=False)
+        product = batch.product_name(jobs[i])
+        if store and not result["error"]:
+            with open(os.path.join(destination, product), "rb") as f:
+                store.put(_job_key(jobs[i]), product.rsplit(".", 1)[1], f.read())
+    return results
@@ -0,0 +1,258 @@
+"""Post-processing of .svg logos for smaller, faster-loading web assets.
+
+The optimizer
+
+    - merges duplicate gradient definitions,
+    - rounds coordinates,
+    - removes unreferenced definitions, comments, and metadata, and
+    - optionally turns repeated paths (e.g. glyph outlines of the node and
+      navigation text) into reusable ``<symbol>`` elements.
+
+It can be applied by `create_logo(optimize_svg=True)` or from the command
+line to existing files::
+
+    $ python -m logo.svg_optimize pysal_logo.svg pysal_nav_logo_2line.svg
+"""
+
+import argparse
+import logging
+import re
+import xml.etree.ElementTree as ET
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+ET.register_namespace("", SVG_NS)
+ET.register_namespace("xlink", XLINK_NS)
+
+_HREF = "{%s}href" % XLINK_NS
+_GRADIENTS = {"{%s}linearGradient" % SVG_NS, "{%s}radialGradient" % SVG_NS}
+_NUMBER = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_URL_REF = re.compile(r"url\(\s*#([^)\s]+)\s*\)")
+
+# attributes holding coordinates, rounded to a fixed number of decimals
+_COORDINATES = {
+    "d", "points", "x", "y", "x1", "y1", "x2", "y2", "cx", "cy", "r",
+    "rx", "ry", "fx", "fy", "width", "height", "stroke-width",
+}
+# attributes holding transformation matrices, rounded to significant digits
+_TRANSFORMS = {"transform", "gradientTransform", "patternTransform"}
+
+logger = logging.getLogger(__name__)
+
+
+def _format_number(value, decimals):
+    text = "%.*f" % (decimals, value)
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    if text in ("-0", ""):
+        text = "0"
+    if text.startswith("0."):
+        text = text[1:]
+    elif text.startswith("-0."):
+        text = "-" + text[2:]
+    return text
+
+
+def _round_numbers(value, decimals=None, digits=None):
+    """Round every number in an attribute value."""
+
+    def _round(match):
+        number = float(match.group(0))
+        if digits is not None:
+            # keep `digits` significant digits, however small the value
+            text = "%.*g" % (digits, number)
+            return _format_number(float(text), max(0, digits + 3))
+        return _format_number(number, decimals)
+
+    return _NUMBER.sub(_round, value)
+
+
+def _references(root):
+    """Ids referenced through ``url(#id)`` or ``href="#id"``."""
+    referenced = set()
+    for elem in root.iter():
+        for attr, value in elem.attrib.items():
+            if attr in (_HREF, "href") and value.startswith("#"):
+                referenced.add(value[1:])
+            else:
+                referenced.update(_URL_REF.findall(value))
+    return referenced
+
+
+def _rename_references(root, renamed):
+    """Point references to merged definitions at the kept definition."""
+    if not renamed:
+        return
+
+    def _url(match):
+        return "url(#%s)" % renamed.get(match.group(1), match.group(1))
+
+    for elem in root.iter():
+        for attr, value in list(elem.attrib.items()):
+            if attr in (_HREF, "href") and value[1:] in renamed:
+                elem.set(attr, "#%s" % renamed[value[1:]])
+            elif "url(" in value:
+                elem.set(attr, _URL_REF.sub(_url, value))
+
+
+def _merge_gradients(root):
+    """Keep a single copy of identical gradients. Returns the number merged."""
+    seen, renamed = {}, {}
+    for elem in root.iter():
+        if elem.tag not in _GRADIENTS or "id" not in elem.attrib:
+            continue
+        attrs = tuple(sorted((k, v) for k, v in elem.attrib.items() if k != "id"))
+        stops = tuple(tuple(sorted(s.attrib.items())) for s in elem)
+        signature = elem.tag, attrs, stops
+        if signature in seen:
+            renamed[elem.get("id")] = seen[signature]
+        else:
+            seen[signature] = elem.get("id")
+    _rename_references(root, renamed)
+    return len(renamed)
+
+
+def _remove_unused(root):
+    """Drop unreferenced definitions, metadata, and empty <defs>."""
+    removed = 0
+    while True:
+        referenced = _references(root)
+        dropped = 0
+        for parent in list(root.iter()):
+            for child in list(parent):
+                tag = child.tag.split("}")[-1]
+                in_defs = parent.tag == "{%s}defs" % SVG_NS and tag != "style"
+                unused = in_defs and child.get("id") not in referenced
+                if tag in ("metadata", "title", "desc") or unused:
+                    parent.remove(child)
+                    dropped += 1
+                elif tag == "defs" and len(child) == 0:
+                    parent.remove(child)
+        removed += dropped
+        if not dropped:
+            return removed
+
+
+def _glyph_symbols(root, min_length=64):
+    """Replace repeated paths by ``<use>`` of a shared ``<symbol>``.
+
+    Returns the number of symbols created.
+    """
+    paths = {}
+    for elem in root.iter("{%s}path" % SVG_NS):
+        d = elem.get("d")
+        if d and len(d) >= min_length and "id" not in elem.attrib:
+            paths.setdefault(d, []).append(elem)
+    repeated = {d: elems for d, elems in paths.items() if len(elems) > 1}
+    if not repeated:
+        return 0
+
+    defs = root.find("{%s}defs" % SVG_NS)
+    if defs is None:
+        defs = ET.Element("{%s}defs" % SVG_NS)
+        root.insert(0, defs)
+    taken = {elem.get("id") for elem in root.iter()}
+    for i, (d, elems) in enumerate(repeated.items()):
+        sid = "glyph%d" % i
+        while sid in taken:
+            sid = "_" + sid
+        symbol = ET.SubElement(defs, "{%s}symbol" % SVG_NS, id=sid, overflow="visible")
+        ET.SubElement(symbol, "{%s}path" % SVG_NS, d=d)
+        # fill, stroke, and transform stay on the <use>
+        for elem in elems:
+            del elem.attrib["d"]
+            elem.tag = "{%s}use" % SVG_NS
+            elem.set(_HREF, "#%s" % sid)
+    return len(repeated)
+
+
+def optimize_svg(svg, precision=2, symbols=False):
+    """Optimize an SVG document.
+
+    Parameters
+    ----------
+
+    svg : bytes or str
+        SVG document.
+
+    precision : int (Optional - Default is 2)
+        Decimals kept for coordinates. Transformation matrices keep
+        ``precision + 4`` significant digits.
+
+    symbols : bool (Optional - Default is False)
+        Turn repeated paths (glyphs) into reusable ``<symbol>`` elements.
+
+    Returns
+    -------
+
+    svg : bytes
+        The optimized document.
+
+    report : dict
+        Sizes ``before`` and ``after`` in bytes, bytes ``saved``, and the
+        number of ``merged_gradients``, ``removed_defs``, and ``symbols``.
+
+    """
+    data = svg.encode() if isinstance(svg, str) else bytes(svg)
+    root = ET.fromstring(data)
+
+    merged = _merge_gradients(root)
+    for elem in root.iter():
+        if elem is root:
+            continue
+        for attr, value in list(elem.attrib.items()):
+            if attr in _COORDINATES:
+                elem.set(attr, _round_numbers(value, decimals=precision))
+            elif attr in _TRANSFORMS:
+                elem.set(attr, _round_numbers(value, digits=precision + 4))
+    n_symbols = _glyph_symbols(root) if symbols else 0
+    removed = _remove_unused(root)
+
+    out = ET.tostring(root, encoding="utf-8", xml_declaration=True)
+    out = re.sub(rb">\s+<", b"><", out)
+    report = {
+        "before": len(data),
+        "after": len(out),
+        "saved": len(data) - len(out),
+        "merged_gradients": merged,
+        "removed_defs": removed,
+        "symbols": n_symbols,
+    }
+    return out, report
+
+
+def optimize_svg_file(fname, out=None, **kwargs):
+    """Optimize an .svg file in place (or into `out`) and report savings.
+
+    ``kwargs`` are passed on to `optimize_svg()`. Returns its report.
+    """
+    with open(fname, "rb") as f:
+        data, report = optimize_svg(f.read(), **kwargs)
+    with open(out or fname, "wb") as f:
+        f.write(data)
+    logger.info(
+        "%s: %d -> %d bytes (saved %d)",
+        fname,
+        report["before"],
+        report["after"],
+        report["saved"],
+    )
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m logo.svg_optimize", description="Optimize .svg logos in place."
+    )
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--precision", type=int, default=2, help="coordinate decimals")
+    parser.add_argument("--symbols", action="store_true", help="reuse repeated glyphs")
+    args = parser.parse_args(argv)
+    for fname in args.files:
+        r = optimize_svg_file(fname, precision=args.precision, symbols=args.symbols)
+        saved = 100.0 * r["saved"] / max(1, r["before"])
+        print("%s: %d -> %d bytes (%.1f%% saved)" % (fname, r["before"], r["after"], saved))
+
+
+if __name__ == "__main__":
+    main()
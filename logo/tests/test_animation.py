@@ -0,0 +1,117 @@
+import struct
+
+import numpy
+import pytest
+
+from .. import animation
+from .. import raster
+
+
+def _unlzw(data, min_size=8):
+    """Reference GIF LZW decoder."""
+    clear, end = 1 << min_size, (1 << min_size) + 1
+    stream = int.from_bytes(data, "little")
+    position, size, table, previous = 0, min_size + 1, None, None
+    out = bytearray()
+    while True:
+        code = stream >> position & (1 << size) - 1
+        position += size
+        assert position <= 8 * len(data), "no end code"
+        if code == clear:
+            table = [bytes([i]) for i in range(clear)] + [b"", b""]
+            size, previous = min_size + 1, None
+            continue
+        if code == end:
+            return bytes(out)
+        if previous is None:
+            entry = table[code]
+        else:
+            entry = table[code] if code < len(table) else previous + previous[:1]
+            if len(table) < 4096:
+                table.append(previous + entry[:1])
+                if len(table) == 1 << size and size < 12:
+                    size += 1
+        out += entry
+        previous = entry
+
+
+@pytest.mark.parametrize(
+    "indices",
+    [
+        # single pixel, constant, long runs filling the code table, noise
+        numpy.zeros((1, 1), dtype=numpy.uint8),
+        numpy.full((64, 64), 7, dtype=numpy.uint8),
+        numpy.random.default_rng(0).integers(0, 3, (200, 300), dtype=numpy.uint8),
+        numpy.random.default_rng(1).integers(0, 256, (100, 100), dtype=numpy.uint8),
+        numpy.repeat(numpy.arange(256, dtype=numpy.uint8), 40).reshape(80, 128),
+    ],
+)
+def test_lzw_round_trip(indices):
+    data = animation._lzw(indices)
+    assert _unlzw(data) == indices.tobytes()
+
+
+def test_lzw_min_size():
+    indices = numpy.random.default_rng(2).integers(0, 4, (50, 50), dtype=numpy.uint8)
+    assert _unlzw(animation._lzw(indices, min_size=2), min_size=2) == indices.tobytes()
+
+
+def test_lzw_compresses():
+    indices = numpy.zeros((256, 256), dtype=numpy.uint8)
+    indices[64:192, 64:192] = 1
+    assert len(animation._lzw(indices)) < indices.size // 20
+
+
+def _frames(n=3, shape=(24, 32)):
+    rng = numpy.random.default_rng(3)
+    colors = rng.integers(0, 256, (6, 4), dtype=numpy.uint8)
+    colors[:, 3] = 255
+    colors[0, 3] = 0
+    return [colors[rng.integers(0, len(colors), shape)] for _ in range(n)]
+
+
+def _sub_blocks(gif, position):
+    """Data of the sub-blocks at ``position`` and the position after them."""
+    data = bytearray()
+    while gif[position]:
+        data += gif[position + 1 : position + 1 + gif[position]]
+        position += 1 + gif[position]
+    return bytes(data), position + 1
+
+
+def _gif_frames(gif):
+    """Decoded color indices of every frame of a GIF."""
+    w, h, flags = struct.unpack("<HHB", gif[6:11])
+    position = 13 + (3 << (flags & 7) + 1 if flags & 0x80 else 0)
+    frames = []
+    while gif[position] != 0x3B:
+        if gif[position] == 0x21:
+            _, position = _sub_blocks(gif, position + 2)
+        else:
+            assert gif[position] == 0x2C
+            min_size = gif[position + 10]
+            data, position = _sub_blocks(gif, position + 11)
+            frames.append(numpy.frombuffer(_unlzw(data, min_size), numpy.uint8).reshape(h, w))
+    return frames
+
+
+def test_gif_frames():
+    images = _frames()
+    table, indices = animation._palette(images)
+    gif = animation.gif_bytes(images)
+    assert gif[:6] == b"GIF89a" and gif[13 : 13 + 768] == table.tobytes()
+    frames = _gif_frames(gif)
+    assert len(frames) == len(images)
+    for frame, expected, image in zip(frames, indices, images):
+        numpy.testing.assert_array_equal(frame, expected)
+        # the few colors are kept exactly, the transparent one as index 0
+        numpy.testing.assert_array_equal(table[frame][frame > 0], image[frame > 0, :3])
+        numpy.testing.assert_array_equal(frame == 0, image[..., 3] == 0)
+
+
+def test_apng_first_frame():
+    images = _frames()
+    png = animation.apng_bytes(images, delay=40, loops=2)
+    chunks = [t for t, _ in raster.iter_chunks(png)]
+    assert chunks == [b"IHDR", b"acTL"] + [b"fcTL", b"IDAT"] + [b"fcTL", b"fdAT"] * 2 + [b"IEND"]
+    numpy.testing.assert_array_equal(raster.read_png(png), images[0])
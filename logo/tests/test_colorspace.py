@@ -0,0 +1,112 @@
+import numpy
+import pytest
+
+from .. import colorspace
+from .. import predefined
+
+# rgb colors and their values in the other `xcolor` models, following the
+# conversions of the xcolor manual (HSB in 0-240, gray = .3r + .59g + .11b,
+# cmyk with full undercolor removal)
+XCOLOR = [
+    # rgb, HSB, gray, cmyk, HTML
+    ((1, 0, 0), (0, 240, 240), 0.3, (0, 1, 1, 0), "FF0000"),
+    ((0, 1, 0), (80, 240, 240), 0.59, (1, 0, 1, 0), "00FF00"),
+    ((0, 0, 1), (160, 240, 240), 0.11, (1, 1, 0, 0), "0000FF"),
+    ((1, 0.5, 0), (20, 240, 240), 0.595, (0, 0.5, 1, 0), "FF8000"),
+    ((0.5, 0.5, 0), (40, 240, 120), 0.445, (0, 0, 0.5, 0.5), "808000"),
+    ((0.2, 0.4, 0.6), (140, 160, 144), 0.362, (0.4, 0.2, 0, 0.4), "336699"),
+    ((1, 1, 1), (0, 0, 240), 1.0, (0, 0, 0, 0), "FFFFFF"),
+    ((0, 0, 0), (0, 0, 0), 0.0, (0, 0, 0, 1), "000000"),
+]
+
+RGB = numpy.array([c[0] for c in XCOLOR], dtype=float)
+
+
+@pytest.mark.parametrize(
+    "model, expected",
+    [
+        ("HSB", [c[1] for c in XCOLOR]),
+        ("hsb", [numpy.array(c[1]) / 240.0 for c in XCOLOR]),
+        ("gray", [[c[2]] for c in XCOLOR]),
+        ("cmyk", [c[3] for c in XCOLOR]),
+        ("RGB", RGB * 255),
+    ],
+)
+def test_from_rgb_xcolor_reference(model, expected):
+    numpy.testing.assert_allclose(colorspace.from_rgb(RGB, model), expected, atol=1e-9)
+
+
+def test_html_codes():
+    assert colorspace.convert_codes(["1, 0.5, 0"], "rgb", "HTML") == ["FF8000"]
+    codes = [c[4] for c in XCOLOR]
+    rgb = colorspace.to_rgb(colorspace.parse_codes(codes, "HTML"), "HTML")
+    assert colorspace.format_codes(colorspace.from_rgb(rgb, "HTML"), "HTML") == codes
+
+
+def test_lab_reference():
+    lab = colorspace.from_rgb([[1, 1, 1], [1, 0, 0], [0, 0, 0]], "Lab")
+    numpy.testing.assert_allclose(
+        lab, [[100, 0, 0], [53.2408, 80.0925, 67.2032], [0, 0, 0]], atol=1e-3
+    )
+
+
+@pytest.mark.parametrize("model", ["RGB", "rgb", "HTML", "hsb", "HSB", "cmyk", "Lab"])
+def test_round_trip(model):
+    rgb = numpy.random.default_rng(0).random((500, 3))
+    numpy.testing.assert_allclose(colorspace.to_rgb(colorspace.from_rgb(rgb, model), model), rgb)
+
+
+def test_gray_round_trip():
+    gray = numpy.linspace(0, 1, 11)[:, None]
+    rgb = colorspace.to_rgb(gray, "gray")
+    numpy.testing.assert_allclose(rgb, numpy.repeat(gray, 3, axis=1))
+    numpy.testing.assert_allclose(colorspace.from_rgb(rgb, "gray"), gray)
+
+
+@pytest.mark.parametrize("model", ["rgb", "hsb", "cmyk", "Lab"])
+def test_latex_colors_round_trip(model):
+    # every LaTeX defined color survives the trip through the written codes
+    codes = [c["RGB"] for c in predefined.latex_color_codes.values()]
+    there = colorspace.convert_codes(codes, "RGB", model)
+    numpy.testing.assert_allclose(
+        colorspace.parse_codes(colorspace.convert_codes(there, model, "rgb"), "rgb") * 255,
+        colorspace.parse_codes(codes, "RGB"),
+        atol=0.01,
+    )
+
+
+def test_format_codes_integer_models():
+    assert colorspace.format_codes([[20.4, 239.6, 240.2]], "HSB") == ["20, 240, 240"]
+    assert colorspace.format_codes([[-1, 127.5, 300]], "RGB") == ["0, 128, 255"]
+    assert colorspace.format_codes([[0.5, 0.25, 0.125]], "rgb") == ["0.5, 0.25, 0.125"]
+
+
+def test_parse_codes_errors():
+    with pytest.raises(RuntimeError, match="3 components"):
+        colorspace.parse_codes(["1, 2"], "RGB")
+    with pytest.raises(RuntimeError, match="not supported"):
+        colorspace.parse_codes(["1, 2, 3"], "XYZ")
+
+
+def test_latex_color_table():
+    names, rgb = colorspace.latex_color_table()
+    assert names == tuple(predefined.latex_color_codes)
+    assert rgb.shape == (len(names), 3)
+    assert not rgb.flags.writeable
+    assert ((rgb >= 0) & (rgb <= 1)).all()
+
+
+def test_themes_to_xcolor():
+    theme = {
+        "node_info": [[("red", "53.2408, 80.0925, 67.2032"), "a"], [(None, None), "b"]],
+        "color_format": "Lab",
+        "background_color": ("white", "100, 0, 0"),
+        "concept_color": None,
+    }
+    rgb_theme = {"color_format": "RGB", "background_color": ("x", "1, 2, 3")}
+    colorspace.themes_to_xcolor([theme, rgb_theme])
+    assert theme["color_format"] == "RGB"
+    assert tuple(theme["node_info"][0, 0]) == ("red", "255, 0, 0")
+    assert tuple(theme["node_info"][1, 0]) == (None, None)
+    assert theme["background_color"] == ("white", "255, 255, 255")
+    assert rgb_theme["background_color"] == ("x", "1, 2, 3")
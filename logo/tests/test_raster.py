@@ -0,0 +1,103 @@
+import numpy
+import pytest
+
+from .. import raster
+
+
+def _image(channels=4, colors=None, seed=0, shape=(13, 21)):
+    """Random image, drawn from ``colors`` random colors if given."""
+    rng = numpy.random.default_rng(seed)
+    if colors is None:
+        return rng.integers(0, 256, shape + (channels,), dtype=numpy.uint8)
+    palette = rng.integers(0, 256, (colors, channels), dtype=numpy.uint8)
+    return palette[rng.integers(0, colors, shape)]
+
+
+def _rgba(image):
+    """Expand a grayscale, RGB, or RGBA array the way `read_png` does."""
+    if image.ndim == 2:
+        image = image[..., None]
+    rgba = numpy.full(image.shape[:2] + (4,), 255, dtype=numpy.uint8)
+    if image.shape[2] == 1:
+        rgba[..., :3] = image
+    else:
+        rgba[..., : image.shape[2]] = image
+    return rgba
+
+
+@pytest.mark.parametrize("channels", [1, 3, 4])
+@pytest.mark.parametrize("filter_type", [0, 1, 2, 3, 4, "adaptive"])
+def test_write_read_round_trip(channels, filter_type):
+    image = _image(channels)
+    png = raster.write_png(image, filter_type=filter_type)
+    assert png.startswith(raster.PNG_SIGNATURE)
+    numpy.testing.assert_array_equal(raster.read_png(png), _rgba(image))
+
+
+def test_write_png_file(tmp_path):
+    image = _image()
+    fname = str(tmp_path / "image.png")
+    png = raster.write_png(image, fname)
+    with open(fname, "rb") as f:
+        assert f.read() == png
+    numpy.testing.assert_array_equal(raster.read_png(fname), image)
+
+
+@pytest.mark.parametrize(
+    "image, color_type, bit_depth",
+    [
+        # palettes at every bit depth, with and without transparency
+        (_image(colors=2), 3, 1),
+        (_image(colors=4), 3, 2),
+        (_image(colors=16), 3, 4),
+        (_image(colors=200, shape=(40, 40)), 3, 8),
+        # gray and opaque images drop the unused channels
+        (_image(2, shape=(32, 32))[..., [0, 0, 0, 1]], 4, 8),
+        (_rgba(_image(3, shape=(32, 32))), 2, 8),
+        (_image(shape=(32, 32)), 6, 8),
+    ],
+)
+def test_optimize_png_is_lossless(image, color_type, bit_depth):
+    png = raster.write_png(image, compression=0)
+    optimized, report = raster.optimize_png(png)
+    numpy.testing.assert_array_equal(raster.read_png(optimized), image)
+    assert (report["color_type"], report["bit_depth"]) == (color_type, bit_depth)
+    assert report["after"] == len(optimized) <= report["before"] == len(png)
+    assert report["saved"] == len(png) - len(optimized)
+
+
+def test_optimize_png_keeps_smaller_input():
+    png = raster.write_png(_image(colors=2))
+    optimized, _ = raster.optimize_png(png)
+    again, report = raster.optimize_png(optimized)
+    assert again == optimized
+    assert report["saved"] == 0
+
+
+def test_optimize_png_metadata():
+    png = raster.write_png(_image(3, colors=4), compression=0)
+    chunks = [c for c in raster.iter_chunks(png) if c[0] != b"IEND"]
+    chunks += [(b"pHYs", b"\x00\x00\x0b\x13" * 2 + b"\x01"), (b"tEXt", b"date:create\x002020")]
+    tagged = raster.PNG_SIGNATURE + b"".join(raster._chunk(t, b) for t, b in chunks)
+    tagged += raster._chunk(b"IEND", b"")
+
+    stripped, _ = raster.optimize_png(tagged)
+    kept, _ = raster.optimize_png(tagged, keep_chunks=(b"pHYs",))
+    assert [t for t, _ in raster.iter_chunks(stripped)] == [b"IHDR", b"PLTE", b"IDAT", b"IEND"]
+    assert [t for t, _ in raster.iter_chunks(kept)] == [
+        b"IHDR",
+        b"PLTE",
+        b"pHYs",
+        b"IDAT",
+        b"IEND",
+    ]
+    numpy.testing.assert_array_equal(raster.read_png(kept), raster.read_png(tagged))
+
+
+def test_optimize_png_file(tmp_path):
+    image = _image(colors=3, shape=(64, 64))
+    fname = str(tmp_path / "image.png")
+    raster.write_png(image, fname, compression=0)
+    report = raster.optimize_png_file(fname)
+    assert report["saved"] > 0
+    numpy.testing.assert_array_equal(raster.read_png(fname), image)
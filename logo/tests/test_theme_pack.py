@@ -0,0 +1,105 @@
+import multiprocessing
+import struct
+
+import numpy
+import pytest
+
+from .. import predefined
+from .. import theme_pack
+
+
+def _same_theme(a, b):
+    assert set(a) == set(b)
+    for key in a:
+        if key == "node_info":
+            assert [(tuple(c), t) for c, t in a[key]] == [(tuple(c), t) for c, t in b[key]]
+        else:
+            assert a[key] == b[key]
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_export_load_round_trip(tmp_path, mmap):
+    fname = str(tmp_path / "themes.logopack")
+    size = theme_pack.export_pack(fname)
+    assert size == (tmp_path / "themes.logopack").stat().st_size
+
+    pack = theme_pack.load_pack(fname, mmap=mmap)
+    assert pack.names == list(predefined.THEMES)
+    assert len(pack) == len(predefined.THEMES)
+    for name, theme in predefined.THEMES.items():
+        assert name in pack
+        _same_theme(pack[name], theme)
+    expected = {n: c["RGB"] for n, c in predefined.latex_color_codes.items()}
+    assert pack.latex_colors() == expected
+
+
+def test_custom_themes():
+    node_info = numpy.array(
+        [[("red", "1, 0, 0"), "a"], [(None, None), "b"], [("ocean", "0.1, 0.2, 0.3"), "ç"]],
+        dtype=object,
+    )
+    themes = {
+        "custom": {
+            "node_info": node_info,
+            "color_format": "rgb",
+            "background_color": ("ocean", "0.1, 0.2, 0.3"),
+            "concept_color": predefined.TRANSPARENT,
+            "text_color": ("white", "1, 1, 1"),
+            "font": "Linux Libertine",
+            "clean_up": ["aux", "log"],
+        },
+    }
+    pack = theme_pack.ThemePack(theme_pack.pack_bytes(themes, latex_colors=False))
+    _same_theme(pack["custom"], themes["custom"])
+    assert pack.n_latex == 0 and pack.latex_colors() == {}
+    # colors are stored once, and every theme lookup is a fresh copy
+    assert len(pack.rgb) == 3
+    numpy.testing.assert_array_equal(pack.rgb, [[255, 0, 0], [26, 51, 76], [255, 255, 255]])
+    pack["custom"]["node_info"][0, 1] = "changed"
+    assert pack["custom"]["node_info"][0, 1] == "a"
+
+
+def test_arrays_are_aligned_views():
+    data = theme_pack.pack_bytes()
+    buffer = numpy.frombuffer(data, dtype=numpy.uint8)
+    pack = theme_pack.ThemePack(buffer)
+    base = buffer.ctypes.data
+    for name in ("rgb", "color_strings", "theme_names", "theme_colors", "theme_text"):
+        array = getattr(pack, name)
+        assert not array.flags.owndata
+        assert (array.ctypes.data - base) % theme_pack._ALIGN == 0
+
+
+def test_errors():
+    themes = dict(predefined.THEMES)
+    odd = dict(themes[next(iter(themes))])
+    odd["node_info"] = odd["node_info"][:3]
+    with pytest.raises(RuntimeError, match="same number of nodes"):
+        theme_pack.pack_bytes(dict(themes, odd=odd))
+
+    data = theme_pack.pack_bytes(latex_colors=False)
+    with pytest.raises(RuntimeError, match="Not a theme pack"):
+        theme_pack.ThemePack(b"NOTAPACK" + data[8:])
+    start = len(theme_pack.MAGIC)
+    newer = data[:start] + struct.pack("<I", theme_pack.VERSION + 1) + data[start + 4 :]
+    with pytest.raises(RuntimeError, match="version"):
+        theme_pack.ThemePack(newer)
+
+
+def _attached_themes(name, path):
+    pack = theme_pack.attach_pack(name, path)
+    return {n: pack[n]["node_info"].tolist() for n in pack}
+
+
+def test_shared_pack():
+    with theme_pack.SharedPack() as shared:
+        with multiprocessing.Pool(1) as pool:
+            themes = pool.apply(_attached_themes, (shared.name, shared.path))
+    assert themes == {n: t["node_info"].tolist() for n, t in predefined.THEMES.items()}
+
+
+def test_command_line(tmp_path, capsys):
+    fname = str(tmp_path / "themes.logopack")
+    theme_pack.main([fname, "--no-latex-colors"])
+    assert "%d themes" % len(predefined.THEMES) in capsys.readouterr().out
+    assert theme_pack.load_pack(fname).n_latex == 0
@@ -0,0 +1,368 @@
+"""Binary, memory-mappable packs of themes and colors.
+
+Building hundreds of themes from Python dicts (through `_theme_builder`)
+at every process start is slow. A theme pack stores them in one file that
+is loaded without parsing any color code:
+
+    - a magic number, format version, and a small JSON header,
+    - a packed ``uint8`` RGB array of every color,
+    - a string table (color names and codes, node text, theme names), and
+    - a theme index of ``int32`` references into the color and string
+      tables,
+
+with every array aligned so it can be used in place from a memory map
+(or any other buffer, e.g. shared memory), without copying::
+
+    >>> import logo
+    >>> logo.export_pack("themes.logopack")
+    >>> pack = logo.load_pack("themes.logopack")
+    >>> logo.create_logo("pysal_logo", **pack["canon2020_theme_transparent"])
+
+From the command line::
+
+    $ python -m logo.theme_pack themes.logopack
+"""
+
+import argparse
+import json
+import os
+import struct
+import tempfile
+
+import numpy
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8, fall back to memory-mapped temporary files
+    shared_memory = None
+
+from .colors import color_to_rgb
+from . import predefined
+from .predefined import TRANSPARENT
+
+MAGIC = b"LOGOPACK"
+VERSION = 1
+
+# alignment of every array in the file
+_ALIGN = 64
+
+# theme entries holding a single (color name, color code) tuple
+_SINGLE_COLORS = ("background_color", "concept_color", "text_color")
+
+# theme entries stored in the index rather than the JSON extras
+THEME_KEYS = ("node_info", "color_format") + _SINGLE_COLORS
+
+
+def _pad(size):
+    return -size % _ALIGN
+
+
+class _Strings:
+    """Deduplicating string table under construction."""
+
+    def __init__(self):
+        self.index = {}
+
+    def add(self, s):
+        return self.index.setdefault(s, len(self.index))
+
+    def arrays(self):
+        encoded = [s.encode("utf-8") for s in self.index]
+        offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+        offsets[1:] = numpy.cumsum([len(e) for e in encoded])
+        return numpy.frombuffer(b"".join(encoded), dtype=numpy.uint8), offsets
+
+
+def pack_bytes(themes=None, latex_colors=True):
+    """Serialize themes (and the LaTeX color table) into a theme pack.
+
+    Parameters
+    ----------
+
+    themes : dict (Optional - Default is None)
+        Theme name to `create_logo()` keyword arguments. Defaults to
+        `logo.THEMES`. Entries other than the theme colors and
+        ``color_format`` must be JSON serializable.
+
+    latex_colors : bool (Optional - Default is True)
+        Also store every LaTeX defined color (`logo.latex_color_codes`).
+
+    Returns
+    -------
+
+    pack : bytes
+
+    """
+    themes = predefined.THEMES if themes is None else themes
+    strings = _Strings()
+    colors = {}
+    rgb = []
+
+    def _color(color, color_format):
+        if color is None or color == TRANSPARENT or color[1] is None:
+            return -1
+        key = (color[0], color[1], color_format)
+        if key not in colors:
+            colors[key] = len(colors)
+            rgb.append(color_to_rgb(color, color_format))
+        return colors[key]
+
+    if latex_colors:
+        for name, codes in predefined.latex_color_codes.items():
+            _color((name, codes["RGB"]), "RGB")
+    n_latex = len(colors)
+
+    nodes = {len(theme["node_info"]) for theme in themes.values()}
+    if len(nodes) > 1:
+        raise RuntimeError("Every theme in a pack needs the same number of nodes.")
+    n_nodes = nodes.pop() if nodes else 0
+    theme_colors = numpy.full((len(themes), n_nodes + 3), -1, dtype=numpy.int32)
+    theme_text = numpy.zeros((len(themes), n_nodes), dtype=numpy.int32)
+    theme_names = numpy.zeros((len(themes), 2), dtype=numpy.int32)
+    extras = []
+    for i, (name, theme) in enumerate(themes.items()):
+        color_format = theme.get("color_format") or "RGB"
+        theme_names[i] = strings.add(name), strings.add(color_format)
+        for j, (color, text) in enumerate(theme["node_info"]):
+            theme_colors[i, j] = _color(color, color_format)
+            theme_text[i, j] = strings.add(text)
+        for j, key in enumerate(_SINGLE_COLORS):
+            theme_colors[i, n_nodes + j] = _color(theme.get(key), color_format)
+        extras.append({k: v for k, v in theme.items() if k not in THEME_KEYS})
+
+    color_strings = numpy.zeros((len(colors), 3), dtype=numpy.int32)
+    for (name, code, color_format), j in colors.items():
+        color_strings[j] = strings.add(name), strings.add(code), strings.add(color_format)
+    blob, offsets = strings.arrays()
+
+    arrays = {
+        "rgb": numpy.array(rgb, dtype=numpy.uint8).reshape(-1, 3),
+        "color_strings": color_strings,
+        "theme_names": theme_names,
+        "theme_colors": theme_colors,
+        "theme_text": theme_text,
+        "string_offsets": offsets,
+        "string_blob": blob,
+    }
+    # array offsets are relative to the (aligned) end of the header
+    header = {"n_latex": n_latex, "extras": extras, "arrays": {}}
+    position = 0
+    for name, array in arrays.items():
+        header["arrays"][name] = [position, array.dtype.str, list(array.shape)]
+        position += array.nbytes + _pad(array.nbytes)
+    encoded = json.dumps(header).encode("utf-8")
+    preamble = MAGIC + struct.pack("<II", VERSION, len(encoded)) + encoded
+    parts = [preamble, b"\0" * _pad(len(preamble))]
+    for array in arrays.values():
+        parts += [array.tobytes(), b"\0" * _pad(array.nbytes)]
+    return b"".join(parts)
+
+
+def export_pack(fname, themes=None, latex_colors=True):
+    """Write a theme pack to a file. See `pack_bytes()`."""
+    data = pack_bytes(themes, latex_colors)
+    with open(fname, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+class ThemePack:
+    """Read-only view of a theme pack held in any buffer.
+
+    The arrays are NumPy views into the buffer, so a pack in a memory map
+    or in shared memory is used without copying. Themes are rebuilt as
+    `create_logo()` keyword arguments only when looked up.
+
+    Parameters
+    ----------
+
+    buffer : bytes, memoryview, or numpy.ndarray
+        The theme pack, e.g. from `pack_bytes()` or a memory map.
+
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        raw = numpy.frombuffer(buffer, dtype=numpy.uint8)
+        if raw[: len(MAGIC)].tobytes() != MAGIC:
+            raise RuntimeError("Not a theme pack.")
+        version, size = struct.unpack("<II", raw[len(MAGIC) : len(MAGIC) + 8].tobytes())
+        if version != VERSION:
+            raise RuntimeError("Theme pack version %d not supported." % version)
+        start = len(MAGIC) + 8
+        header = json.loads(raw[start : start + size].tobytes().decode("utf-8"))
+        start += size + _pad(start + size)
+        for name, (offset, dtype, shape) in header["arrays"].items():
+            count = int(numpy.prod(shape))
+            array = numpy.frombuffer(buffer, dtype=dtype, count=count, offset=start + offset)
+            setattr(self, name, array.reshape(shape))
+        self.n_latex = header["n_latex"]
+        self._extras = header["extras"]
+        self._strings = self._colors = None
+        self._names = {self.string(s): i for i, s in enumerate(self.theme_names[:, 0].tolist())}
+
+    def string(self, i):
+        """Entry ``i`` of the string table."""
+        if self._strings is None:
+            # decoded in one pass, indexing the arrays element by element is
+            # far slower (most of all in shared memory)
+            offsets = self.string_offsets.tolist()
+            blob = self.string_blob.tobytes()
+            self._strings = [
+                blob[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])
+            ]
+        return self._strings[i]
+
+    def color(self, j):
+        """Color ``j`` as a (color name, color code) tuple."""
+        if j < 0:
+            return TRANSPARENT
+        if self._colors is None:
+            self._colors = self.color_strings[:, :2].tolist()
+        name, code = self._colors[j]
+        return self.string(name), self.string(code)
+
+    @property
+    def names(self):
+        """Theme names, in pack order."""
+        return list(self._names)
+
+    def latex_colors(self):
+        """The LaTeX color table stored in the pack, as name to RGB code."""
+        return dict(self.color(j) for j in range(self.n_latex))
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __getitem__(self, name):
+        """A fresh theme (`create_logo()` keyword arguments)."""
+        i = self._names[name]
+        n_nodes = self.theme_text.shape[1]
+        colors, text = self.theme_colors[i].tolist(), self.theme_text[i].tolist()
+        node_info = numpy.empty((n_nodes, 2), dtype=object)
+        for j in range(n_nodes):
+            node_info[j, 0] = self.color(colors[j])
+            node_info[j, 1] = self.string(text[j])
+        theme = {"node_info": node_info, "color_format": self.string(int(self.theme_names[i, 1]))}
+        for k, key in enumerate(_SINGLE_COLORS):
+            theme[key] = self.color(colors[n_nodes + k])
+        theme.update(self._extras[i])
+        return theme
+
+
+def load_pack(fname, mmap=True):
+    """Open a theme pack file.
+
+    Parameters
+    ----------
+
+    fname : str
+        Theme pack file name.
+
+    mmap : bool (Optional - Default is True)
+        Memory-map the file (shared by every process mapping it) instead
+        of reading it.
+
+    Returns
+    -------
+
+    pack : ThemePack
+
+    """
+    if mmap:
+        buffer = numpy.memmap(fname, dtype=numpy.uint8, mode="r")
+    else:
+        with open(fname, "rb") as f:
+            buffer = f.read()
+    return ThemePack(buffer)
+
+
+class SharedPack:
+    """A theme pack placed once where every worker process can attach it.
+
+    The pack lives in `multiprocessing.shared_memory` (a memory-mapped
+    temporary file before Python 3.8). Workers attach it with
+    `attach_pack()` and read it in place, so a process pool holds a single
+    copy of the themes however many workers it has. Use it as a context
+    manager, or call `close()` to release it.
+
+    Parameters
+    ----------
+
+    themes : dict (Optional - Default is None)
+        See `pack_bytes()`.
+
+    latex_colors : bool (Optional - Default is True)
+        See `pack_bytes()`.
+
+    """
+
+    def __init__(self, themes=None, latex_colors=True):
+        data = pack_bytes(themes, latex_colors)
+        self.name = self.path = None
+        self._shm = None
+        if shared_memory is not None:
+            self._shm = shared_memory.SharedMemory(create=True, size=len(data))
+            self._shm.buf[: len(data)] = data
+            self.name = self._shm.name
+        else:
+            fd, self.path = tempfile.mkstemp(prefix="logo-", suffix=".logopack")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        elif self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_pack(name=None, path=None):
+    """Attach a `SharedPack` by its shared memory ``name`` (or ``path``).
+
+    The pack stays attached for the life of the process.
+    """
+    if name is None:
+        return load_pack(path)
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before Python 3.13 the segment is registered again, with the
+        # resource tracker that pool workers share with their creator
+        shm = shared_memory.SharedMemory(name=name)
+    pack = ThemePack(shm.buf)
+    pack._shm = shm
+    return pack
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m logo.theme_pack",
+        description="Export the predefined themes and LaTeX colors to a theme pack.",
+    )
+    parser.add_argument("fname", help="output file, e.g. themes.logopack")
+    parser.add_argument(
+        "--no-latex-colors", action="store_true", help="leave out the LaTeX color table"
+    )
+    args = parser.parse_args(argv)
+    size = export_pack(args.fname, latex_colors=not args.no_latex_colors)
+    print("%s: %d themes, %d bytes" % (args.fname, len(predefined.THEMES), size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Pre-flight validation of themes and batch jobs.
+
+Problems with a theme (a misspelled color name, a ``None`` concept color,
+the wrong number of nodes, color codes xcolor cannot read) otherwise only
+surface as a LuaTeX error after seconds of compilation. The checks here run
+in microseconds and report every problem of a theme at once. Valid color
+codes are normalized to the exact syntax xcolor expects, e.g. the float
+``"RGB"`` values of `defined_latex_colors` are rounded to integers.
+"""
+
+import difflib
+
+import numpy
+
+from . import predefined
+from .colorspace import INTEGER_MODELS, MODELS
+from .predefined import CHILD_NODES
+
+# characters with a meaning in xcolor expressions or TeX
+_RESERVED = set("!,{}\\%#$&~^")
+
+# theme entries holding a single (color name, color code) tuple
+_SINGLE_COLORS = ("background_color", "concept_color", "text_color")
+
+
+def normalize_color_code(code, color_format):
+    """Return a color code in the syntax xcolor expects for its model.
+
+    Raises
+    ------
+
+    ValueError
+        If the code cannot be parsed in the given model.
+
+    """
+    if color_format not in MODELS:
+        err_msg = "'%s' is not a supported color format (%s)."
+        raise ValueError(err_msg % (color_format, ", ".join(MODELS)))
+    code = str(code).strip()
+    if color_format == "HTML":
+        code = code.lstrip("#")
+        if len(code) != 6:
+            raise ValueError("'%s' is not a 6 digit HTML color." % code)
+        int(code, 16)
+        return code.upper()
+    values = [float(v) for v in code.split(",")]
+    if len(values) != MODELS[color_format]:
+        err_msg = "'%s' needs %d components in the '%s' model."
+        raise ValueError(err_msg % (code, MODELS[color_format], color_format))
+    if color_format in INTEGER_MODELS:
+        top = INTEGER_MODELS[color_format]
+        if not all(-0.5 < v < top + 0.5 for v in values):
+            raise ValueError("'%s' is outside 0-%d." % (code, top))
+        return ", ".join(str(int(round(v))) for v in values)
+    if color_format == "Lab":
+        if not (0 <= values[0] <= 100 and all(-200 <= v <= 200 for v in values[1:])):
+            raise ValueError("'%s' is outside L 0-100, a/b -200-200." % code)
+        return ", ".join("%g" % v for v in values)
+    if not all(-1e-9 <= v <= 1 + 1e-9 for v in values):
+        raise ValueError("'%s' is outside 0-1." % code)
+    return ", ".join("%g" % min(1.0, max(0.0, v)) for v in values)
+
+
+def _check_color(color, color_format, what, errors, allow_transparent=False):
+    """Validate and normalize a single (color name, color code) tuple."""
+    if color is None or (
+        isinstance(color, (tuple, list)) and len(color) == 2 and color[0] is None
+    ):
+        if allow_transparent:
+            return None, None
+        errors.append("%s: a color is required, got %r." % (what, color))
+        return color
+    if not isinstance(color, (tuple, list)) or len(color) != 2:
+        errors.append("%s: expected a (color name, color code) tuple, got %r." % (what, color))
+        return color
+    name, code = color
+    if not isinstance(name, str) or not name or set(name) & _RESERVED:
+        errors.append("%s: %r is not a valid xcolor color name." % (what, name))
+        return color
+    if code is None:
+        # a bare name must be a LaTeX defined color
+        if name in predefined.latex_color_codes:
+            code = predefined.latex_color_codes[name]["RGB"]
+            if color_format != "RGB":
+                errors.append("%s: '%s' needs a code in '%s'." % (what, name, color_format))
+                return color
+        else:
+            err_msg = "%s: unknown color '%s'." % (what, name)
+            close = difflib.get_close_matches(name, predefined.latex_color_codes, n=3)
+            if close:
+                err_msg += " Did you mean %s?" % ", ".join("'%s'" % c for c in close)
+            errors.append(err_msg)
+            return color
+    if color_format not in MODELS:
+        # reported once by `validate_theme()`
+        return color
+    try:
+        return name, normalize_color_code(code, color_format)
+    except ValueError as e:
+        errors.append("%s: %s" % (what, e))
+        return color
+
+
+def validate_theme(theme):
+    """Check a theme and normalize its colors.
+
+    Parameters
+    ----------
+
+    theme : dict
+        `create_logo()` keyword arguments. Color tuples may leave the code
+        as ``None`` for LaTeX defined color names.
+
+    Returns
+    -------
+
+    theme : dict
+        A copy of the theme with normalized color codes.
+
+    errors : list
+        Problems found, empty if the theme is valid.
+
+    """
+    errors = []
+    theme = dict(theme)
+    color_format = theme.get("color_format")
+    if color_format not in MODELS:
+        err_msg = "color_format: %r is not one of %s."
+        errors.append(err_msg % (color_format, ", ".join(MODELS)))
+
+    node_info = theme.get("node_info")
+    if node_info is None:
+        errors.append("node_info: missing.")
+    elif len(node_info) != CHILD_NODES:
+        err_msg = "There must be %d elements in the logo, %s were passed in."
+        errors.append(err_msg % (CHILD_NODES, len(node_info)))
+    else:
+        checked = numpy.empty((CHILD_NODES, 2), dtype=object)
+        for i, row in enumerate(node_info):
+            if len(row) != 2:
+                errors.append("node_info[%d]: expected (color, text), got %r." % (i, row))
+                continue
+            color, text = row
+            what = "node_info[%d]" % i
+            checked[i, 0] = _check_color(color, color_format, what, errors)
+            if not isinstance(text, str):
+                errors.append("%s: node text must be a string, got %r." % (what, text))
+            checked[i, 1] = text
+        theme["node_info"] = checked
+
+    for key in _SINGLE_COLORS:
+        if key in theme or key != "background_color":
+            theme[key] = _check_color(
+                theme.get(key),
+                color_format,
+                key,
+                errors,
+                allow_transparent=key == "background_color",
+            )
+    return theme, errors
+
+
+def validate_jobs(jobs):
+    """Validate the themes of batch jobs.
+
+    Parameters
+    ----------
+
+    jobs : list
+        See `logo.batch.build_jobs()`.
+
+    Returns
+    -------
+
+    checked : list
+        A ``(job, errors)`` pair per job, in order, where ``job`` carries
+        the normalized theme and ``errors`` is empty for valid jobs.
+
+    """
+    checked = []
+    for job in jobs:
+        theme, errors = validate_theme(job["kwargs"])
+        checked.append((dict(job, kwargs=theme), errors))
+    return checked